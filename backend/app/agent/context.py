@@ -0,0 +1,140 @@
+# Prompt layout: a stable, cacheable prefix plus a small per-turn suffix
+import threading
+from datetime import datetime, timedelta
+from ..config import Config
+from ..data.storage import storage
+from ..services.vehicle import VehicleService
+from .prompts import SYSTEM_PROMPT, DEALERSHIP_CONTEXT, GENERAL_OFFERS
+
+
+def _lakh(rupees):
+    """815000 -> '8.15L'"""
+    try:
+        return f"{float(rupees) / 100000:.2f}".rstrip('0').rstrip('.') + 'L'
+    except (TypeError, ValueError):
+        return '?'
+
+
+def _text(value):
+    return '' if value is None or value != value else str(value).strip()
+
+
+def render_vehicle_context(vehicles):
+    """Vehicle line-up as one compact line per model.
+
+    Output depends only on the data (models by starting price, variants by
+    price), so the prompt prefix stays byte-identical between requests
+    until the vehicles table changes.
+    """
+    models = {}
+    for vehicle in vehicles:
+        models.setdefault(_text(vehicle.get('model')), []).append(vehicle)
+
+    def price(vehicle):
+        try:
+            return float(vehicle.get('price_ex_showroom') or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    lines = ["## TATA VEHICLES (ex-showroom / on-road, L = lakh; use get_vehicle_info for details)"]
+    for model, variants in sorted(models.items(), key=lambda item: (min(price(v) for v in item[1]), item[0])):
+        variants.sort(key=lambda v: (price(v), _text(v.get('variant')), _text(v.get('fuel_type'))))
+        parts = []
+        for v in variants:
+            part = (f"{_text(v.get('variant'))} {_text(v.get('fuel_type'))} "
+                    f"{_lakh(v.get('price_ex_showroom'))}/{_lakh(v.get('price_on_road'))}")
+            if _text(v.get('mileage')):
+                part += f" {_text(v.get('mileage')).replace(' km/l', 'kmpl')}"
+            if not v.get('in_stock'):
+                part += " (out of stock)"
+            parts.append(part)
+
+        features = []
+        for v in variants:
+            for feature in _text(v.get('features')).split(','):
+                feature = feature.strip()
+                if feature and feature.lower() not in (f.lower() for f in features):
+                    features.append(feature)
+        offers = sorted({_text(v.get('current_offer')) for v in variants} - {''})
+
+        line = f"- {model}: {'; '.join(parts)}"
+        if features:
+            line += f" | {', '.join(features[:Config.PROMPT_MAX_FEATURES])}"
+        if offers:
+            line += f" | offer: {', '.join(offers)}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+class PromptContext:
+    """Builds the messages sent with each completion.
+
+    Providers cache prompts by exact prefix, so everything that is the same
+    for every call comes first and never changes between requests: the
+    persona (SYSTEM_PROMPT), the vehicle line-up rendered from the vehicles
+    table, and the dealership terms; the tool schemas are sent unchanged
+    with every request too. Per-call history follows, and the only
+    per-request text - the current date and time - is a short system
+    message appended at the end and never stored in the history.
+
+    The rendered prefix is cached and rebuilt only when the vehicles table
+    changes: writes in this process drop it through on_change, and writes
+    by other worker processes show up in storage.table_version().
+    """
+
+    _system_prompt = None
+    _version = 0
+    _table_version = None
+    _lock = threading.Lock()
+    rebuilds = 0
+
+    @classmethod
+    def system_prompt(cls):
+        prompt = cls._system_prompt
+        table_version = storage.table_version(Config.VEHICLES_FILE)
+        if prompt is None or table_version != cls._table_version:
+            version = cls._version
+            vehicles = render_vehicle_context(VehicleService.get_all())
+            dealership = DEALERSHIP_CONTEXT.format(offers='\n'.join(f"- {o}" for o in GENERAL_OFFERS))
+            prompt = f"{SYSTEM_PROMPT}\n\n{vehicles}\n\n{dealership}"
+            with cls._lock:
+                # Don't keep a render that a concurrent vehicle edit made stale
+                if cls._version == version:
+                    cls._system_prompt = prompt
+                    cls._table_version = table_version
+                    cls.rebuilds += 1
+        return prompt
+
+    @classmethod
+    def on_change(cls, filepath, before, after):
+        if filepath == Config.VEHICLES_FILE:
+            with cls._lock:
+                cls._system_prompt = None
+                cls._version += 1
+
+    @staticmethod
+    def turn_context(now=None):
+        now = now or datetime.now()
+        tomorrow = now + timedelta(days=1)
+        return {
+            "role": "system",
+            "content": (f"Now: {now:%A %d %B %Y, %H:%M}. Today is {now:%Y-%m-%d}, "
+                        f"tomorrow (kal) is {tomorrow:%Y-%m-%d}.")
+        }
+
+    @classmethod
+    def messages(cls, conversation):
+        """Request messages for a conversation: stored history plus the dynamic suffix"""
+        return [*conversation, cls.turn_context()]
+
+    @classmethod
+    def get_stats(cls):
+        prompt = cls._system_prompt
+        return {
+            'rebuilds': cls.rebuilds,
+            'prefix_chars': len(prompt) if prompt else None,
+            'prefix_tokens_estimate': len(prompt) // 4 if prompt else None
+        }
+
+
+storage.subscribe(PromptContext.on_change)
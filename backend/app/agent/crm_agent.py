@@ -1,158 +1,360 @@
 import json
+import time
 from openai import OpenAI
 from ..config import Config
-from .prompts import SYSTEM_PROMPT, VEHICLE_CONTEXT
-from .functions import AGENT_FUNCTIONS, execute_function
+from .prompts import GREETINGS
+from .context import PromptContext
+from .functions import AGENT_FUNCTIONS
+from .tool_executor import ToolExecutor
+from .replies import ReplyStrategy
+from .response_cache import ResponseCache, introduced_names
+from .lexicon import SENTIMENT, UNCLEAR, RollingScores
+from .streaming import SentenceChunker
+from .memory import ConversationStore, shrink_tool_result
+from .usage import PromptUsage, TurnUsage
 from ..services.call_manager import CallManager
+from ..services.customer import CustomerService
+from ..services.http_pool import HTTPPool
 
 
 class CRMAgent:
     def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.conversations = {}
+        # Retries happen in the pooled transport, where the circuit breaker sees them
+        self.client = OpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            http_client=HTTPPool.client('openai', timeout=60.0),
+            max_retries=0
+        )
+        self.conversations = ConversationStore(PromptContext.system_prompt)
+        self.sentiment = RollingScores()
 
     def get_conversation(self, call_id):
-        if call_id not in self.conversations:
-            self.conversations[call_id] = [
-                {"role": "system", "content": SYSTEM_PROMPT + "\n\n" + VEHICLE_CONTEXT}
-            ]
-        return self.conversations[call_id]
+        return self.conversations.get(call_id, seed=lambda: self._call_history(call_id))
+
+    def _call_history(self, call_id):
+        """Earlier turns of a call from the shared call state, for a call whose
+        previous turns another worker (or this one before a restart) handled.
+        The caller's current message is already in the transcript; the turn
+        adds it itself."""
+        call = CallManager.get_call(call_id)
+        if not call:
+            return []
+        history = [{"role": msg['role'], "content": msg['content']}
+                   for msg in call['transcript'] if msg['role'] in ('user', 'assistant')]
+        if history and history[-1]['role'] == 'user':
+            history.pop()
+        if any(msg['role'] == 'user' for msg in history) and self.sentiment.get(call_id) is None:
+            self.sentiment.update(call_id, float(call.get('sentiment_score') or 0.0))
+        return history
+
+    def _caller_names(self, call_id, phone, conversation):
+        """Names the caller may be addressed by, so their replies aren't cached"""
+        names = introduced_names(m['content'] for m in conversation if m['role'] == 'user')
+        call = CallManager.get_call(call_id)
+        if call:
+            names.add(call.get('customer_name'))
+        customer = CustomerService.get_by_phone(phone) if phone else None
+        if customer:
+            names.add(customer.get('name'))
+        return names
 
     def process_message(self, call_id, user_message, phone=None):
+        started = time.perf_counter()
         conversation = self.get_conversation(call_id)
+        turn_start = len(conversation)
         conversation.append({"role": "user", "content": user_message})
+        usage = TurnUsage()
+
+        cached, cache_version = ResponseCache.lookup(user_message)
+        if cached:
+            conversation.append({"role": "assistant", "content": cached})
+            return self._finish_turn(call_id, user_message, cached, [], False, usage, None, started,
+                                     cached_response=True)
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",  # Better quality for natural conversation
-                messages=conversation,
-                tools=AGENT_FUNCTIONS,
-                tool_choice="auto",
-                temperature=0.85,  # Higher for more natural variation
-                max_tokens=300  # Keep responses concise
-            )
+            response = self._complete(conversation, usage)
 
             assistant_message = response.choices[0].message
             functions_called = []
             takeover_requested = False
+            strategy = None
 
             if assistant_message.tool_calls:
-                tool_results = []
-                for tool_call in assistant_message.tool_calls:
-                    function_name = tool_call.function.name
-                    arguments = json.loads(tool_call.function.arguments)
-
-                    result = execute_function(function_name, arguments, call_id)
-                    functions_called.append({
-                        "name": function_name,
-                        "arguments": arguments,
-                        "result": result
-                    })
-
-                    if function_name == "request_human_takeover":
-                        takeover_requested = True
-                        CallManager.takeover(call_id, result.get("reason", "AI requested"))
-
-                    tool_results.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "content": json.dumps(result)
-                    })
-
-                    CallManager.add_function_call(call_id, function_name)
-
-                conversation.append(assistant_message)
+                calls = [(tc.id, tc.function.name, tc.function.arguments) for tc in assistant_message.tool_calls]
+                tool_results, functions_called, takeover_requested = self._execute_tool_calls(call_id, calls)
+
+                conversation.append(self._tool_call_message(assistant_message.content, calls))
                 conversation.extend(tool_results)
 
-                follow_up = self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=conversation,
-                    temperature=0.85,
-                    max_tokens=300
-                )
-                final_response = follow_up.choices[0].message.content
+                strategy, final_response = ReplyStrategy.choose(call_id, functions_called)
+                if final_response is None:
+                    follow_up = self._complete(conversation, usage, tool_choice="none")
+                    final_response = follow_up.choices[0].message.content
                 conversation.append({"role": "assistant", "content": final_response})
             else:
                 final_response = assistant_message.content
                 conversation.append({"role": "assistant", "content": final_response})
 
-            confidence = self._calculate_confidence(response, user_message)
-            sentiment = self._analyze_sentiment(user_message)
+            ResponseCache.store(user_message, final_response, functions_called, cache_version,
+                                caller_names=lambda: self._caller_names(call_id, phone, conversation))
+            return self._finish_turn(
+                call_id, user_message, final_response, functions_called,
+                takeover_requested, usage, strategy, started
+            )
+
+        except Exception as e:
+            self.conversations.rollback(call_id, turn_start)
+            return self._error_result(e)
 
-            CallManager.update_confidence(call_id, confidence)
-            CallManager.update_sentiment(call_id, sentiment)
+    def stream_message(self, call_id, user_message, phone=None):
+        """Streaming variant of process_message; yields events as the reply is generated.
 
-            return {
-                "response": final_response,
-                "functions_called": functions_called,
-                "confidence": confidence,
-                "sentiment": sentiment,
-                "takeover_requested": takeover_requested
-            }
+        - {'type': 'token', 'text'}: raw text deltas from the model
+        - {'type': 'sentence', 'text'}: complete sentences, ready for TTS
+        - {'type': 'function', 'name', 'arguments', 'result'}: each tool run
+        - {'type': 'done', ...}: last event, with the same fields process_message returns
+
+        Tool calls are handled as in process_message; the follow-up reply is
+        streamed too, or emitted at once when it is templated.
+        """
+        started = time.perf_counter()
+        conversation = self.get_conversation(call_id)
+        turn_start = len(conversation)
+        conversation.append({"role": "user", "content": user_message})
+        chunker = SentenceChunker()
+        usage = TurnUsage()
 
+        cached, cache_version = ResponseCache.lookup(user_message)
+        if cached:
+            conversation.append({"role": "assistant", "content": cached})
+            yield {"type": "token", "text": cached}
+            for sentence in chunker.feed(cached) + chunker.flush():
+                yield {"type": "sentence", "text": sentence}
+            result = self._finish_turn(call_id, user_message, cached, [], False, usage, None, started,
+                                       cached_response=True)
+            yield {"type": "done", **result}
+            return
+
+        try:
+            start = time.perf_counter()
+            stream = self._complete(conversation, usage, stream=True)
+            content = []
+            tool_calls = {}
+            yield from self._stream_deltas(stream, content, tool_calls, chunker, usage, start)
+
+            functions_called = []
+            takeover_requested = False
+            strategy = None
+            spoken = ''.join(content)
+            if tool_calls:
+                calls = [(c['id'], c['name'], c['arguments']) for _, c in sorted(tool_calls.items())]
+                conversation.append(self._tool_call_message(spoken, calls))
+                tool_results, functions_called, takeover_requested = self._execute_tool_calls(call_id, calls)
+                conversation.extend(tool_results)
+                for function in functions_called:
+                    yield {"type": "function", **function}
+
+                strategy, final_response = ReplyStrategy.choose(call_id, functions_called)
+                if final_response is None:
+                    start = time.perf_counter()
+                    follow_up = self._complete(conversation, usage, tool_choice="none", stream=True)
+                    content = []
+                    yield from self._stream_deltas(follow_up, content, None, chunker, usage, start)
+                    final_response = ''.join(content)
+                else:
+                    yield {"type": "token", "text": final_response}
+                    for sentence in chunker.feed(final_response):
+                        yield {"type": "sentence", "text": sentence}
+                spoken = f"{spoken} {final_response}".strip()
+            else:
+                final_response = spoken
+            conversation.append({"role": "assistant", "content": final_response})
+
+            for sentence in chunker.flush():
+                yield {"type": "sentence", "text": sentence}
+            # Same reply text process_message caches, without anything spoken before a tool call
+            ResponseCache.store(user_message, final_response, functions_called, cache_version,
+                                caller_names=lambda: self._caller_names(call_id, phone, conversation))
+            result = self._finish_turn(
+                call_id, user_message, spoken, functions_called, takeover_requested, usage, strategy, started
+            )
         except Exception as e:
-            error_msg = f"I apologize, I'm having some technical difficulty. Let me connect you to our team. Error: {str(e)}"
-            return {
-                "response": error_msg,
-                "functions_called": [],
-                "confidence": 0.5,
-                "sentiment": 0.0,
-                "error": str(e)
-            }
-
-    def _calculate_confidence(self, response, user_message):
+            self.conversations.rollback(call_id, turn_start)
+            result = self._error_result(e)
+            yield {"type": "sentence", "text": result["response"]}
+
+        yield {"type": "done", **result}
+
+    def _complete(self, conversation, usage, tool_choice="auto", stream=False):
+        """One chat completion over the conversation.
+
+        The tool schemas go with every request, follow-ups included (with
+        tool_choice="none"), so that both completions of a turn share the
+        cacheable prompt prefix. Usage of plain completions is added to
+        usage here; streams report theirs in a final chunk (_stream_deltas).
+        """
+        options = {}
+        if stream:
+            # The pinned SDK predates the stream_options argument
+            options = {"stream": True, "extra_body": {"stream_options": {"include_usage": True}}}
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model="gpt-4o",  # Better quality for natural conversation
+            messages=PromptContext.messages(conversation),
+            tools=AGENT_FUNCTIONS,
+            tool_choice=tool_choice,
+            temperature=0.85,  # Higher for more natural variation
+            max_tokens=300,  # Keep responses concise
+            **options
+        )
+        if not stream:
+            PromptUsage.observe(usage, response.usage, (time.perf_counter() - start) * 1000)
+        return response
+
+    @staticmethod
+    def _stream_deltas(stream, content, tool_calls, chunker, usage, start):
+        """Yield token/sentence events from a completion stream, collecting text
+        into content and tool-call fragments into tool_calls (index -> parts).
+
+        Latency to the first chunk and the usage from the final chunk are
+        recorded in PromptUsage.
+        """
+        first_chunk_ms = None
+        for chunk in stream:
+            if first_chunk_ms is None:
+                first_chunk_ms = (time.perf_counter() - start) * 1000
+            if getattr(chunk, 'usage', None):
+                PromptUsage.observe(usage, chunk.usage, first_chunk_ms, streamed=True)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                yield {"type": "token", "text": delta.content}
+                for sentence in chunker.feed(delta.content):
+                    yield {"type": "sentence", "text": sentence}
+            if tool_calls is not None and delta.tool_calls:
+                for part in delta.tool_calls:
+                    entry = tool_calls.setdefault(part.index, {"id": "", "name": "", "arguments": ""})
+                    if part.id:
+                        entry["id"] = part.id
+                    if part.function:
+                        entry["name"] += part.function.name or ""
+                        entry["arguments"] += part.function.arguments or ""
+
+    @staticmethod
+    def _tool_call_message(content, calls):
+        return {
+            "role": "assistant",
+            "content": content or None,
+            "tool_calls": [
+                {"id": id_, "type": "function", "function": {"name": name, "arguments": arguments}}
+                for id_, name, arguments in calls
+            ]
+        }
+
+    def _execute_tool_calls(self, call_id, calls):
+        """Run (tool_call_id, name, arguments_json) calls.
+
+        Returns (tool messages for the conversation, functions_called, takeover_requested).
+        """
+        parsed = [(name, json.loads(raw_arguments or "{}")) for _, name, raw_arguments in calls]
+        # Independent reads run concurrently; writes are serialized per table
+        outcomes = ToolExecutor.run(parsed, call_id)
+
+        tool_results = []
+        functions_called = []
+        takeover_requested = False
+        for (tool_call_id, _, _), (function_name, arguments), (result, elapsed_ms) in zip(calls, parsed, outcomes):
+            functions_called.append({
+                "name": function_name,
+                "arguments": arguments,
+                "result": result,
+                "duration_ms": round(elapsed_ms, 1)
+            })
+
+            if function_name == "request_human_takeover":
+                takeover_requested = True
+                CallManager.takeover(call_id, result.get("reason", "AI requested"))
+
+            tool_results.append({
+                "tool_call_id": tool_call_id,
+                "role": "tool",
+                # The full result goes to the caller; the model only needs the key fields
+                "content": json.dumps(shrink_tool_result(result), default=str, ensure_ascii=False)
+            })
+
+            CallManager.add_function_call(call_id, function_name)
+        return tool_results, functions_called, takeover_requested
+
+    def _finish_turn(self, call_id, user_message, final_response, functions_called,
+                     takeover_requested, usage, reply_strategy, started, cached_response=False):
+        """reply_strategy is None for turns without tools, else "template" or "llm";
+        cached_response marks a reply served from ResponseCache"""
+        confidence = self._calculate_confidence(reply_strategy is not None, user_message)
+        sentiment = self._analyze_sentiment(user_message)
+        call_sentiment = self.sentiment.update(call_id, sentiment)
+
+        CallManager.update_confidence(call_id, confidence)
+        CallManager.update_sentiment(call_id, call_sentiment)
+        self.conversations.compact(call_id)
+        PromptUsage.record_turn(call_id, usage)
+        if reply_strategy:
+            ReplyStrategy.record_turn(call_id, reply_strategy, (time.perf_counter() - started) * 1000)
+
+        return {
+            "response": final_response,
+            "functions_called": functions_called,
+            "confidence": confidence,
+            "sentiment": sentiment,
+            "call_sentiment": round(call_sentiment, 3),
+            "takeover_requested": takeover_requested,
+            "reply_strategy": reply_strategy,
+            "cached_response": cached_response,
+            "usage": usage.to_dict()
+        }
+
+    @staticmethod
+    def _error_result(e):
+        error_msg = f"I apologize, I'm having some technical difficulty. Let me connect you to our team. Error: {str(e)}"
+        return {
+            "response": error_msg,
+            "functions_called": [],
+            "confidence": 0.5,
+            "sentiment": 0.0,
+            "error": str(e)
+        }
+
+    def _calculate_confidence(self, used_tools, user_message):
         confidence = 0.85
-        # Hindi, English, and Marathi unclear phrases
-        unclear_phrases = [
-            "kya?", "samajh nahi", "phir se", "?", "huh", "what",
-            # Marathi unclear
-            "kay?", "samajla nahi", "parat sanga", "nahi kalala"
-        ]
-        if any(phrase in user_message.lower() for phrase in unclear_phrases):
-            confidence -= 0.2
-
-        if response.choices[0].message.tool_calls:
+        # Hindi, English, and Marathi "didn't get that" phrases, e.g. "samajh nahi", "parat sanga"
+        confidence -= min(UNCLEAR.score(user_message), 0.4)
+
+        if used_tools:
             confidence += 0.1
 
         return min(max(confidence, 0.3), 1.0)
 
     def _analyze_sentiment(self, message):
-        # Hindi, English, and Marathi sentiment words
-        negative_words = [
-            "problem", "issue", "kharab", "bura", "complaint", "angry", "upset", "galat", "bekaar", "worst",
-            # Marathi negative
-            "vait", "trasadi", "problem", "kharab", "naraz", "dukh"
-        ]
-        positive_words = [
-            "good", "great", "thanks", "dhanyavaad", "achha", "best", "happy", "excellent",
-            # Marathi positive
-            "mast", "chhan", "dhanyavaad", "khush", "uttam", "sundar", "barober"
-        ]
-
-        message_lower = message.lower()
-        neg_count = sum(1 for word in negative_words if word in message_lower)
-        pos_count = sum(1 for word in positive_words if word in message_lower)
-
-        if neg_count > pos_count:
-            return -0.5 * min(neg_count, 2)
-        elif pos_count > neg_count:
-            return 0.5 * min(pos_count, 2)
-        return 0.0
+        # Weighted Hindi, English, and Marathi sentiment terms, clamped to [-1, 1]
+        return min(max(SENTIMENT.score(message), -1.0), 1.0)
 
     def get_greeting(self):
         # More natural, conversational greetings
         import random
-        greetings = [
-            "Hello! Satis Motor se Priya bol rahi hoon. Kaise help kar sakti hoon aapki?",
-            "Haan ji, Satis Motor - Priya here! Bataiye kya kar sakti hoon aapke liye?",
-            "Good morning! Satis Motor se baat ho rahi hai. Main Priya, bataiye?",
-            "Hello ji! Satis Motor, Priya speaking. Kya help chahiye aapko?"
-        ]
-        return random.choice(greetings)
+        return random.choice(GREETINGS)
 
     def clear_conversation(self, call_id):
-        if call_id in self.conversations:
-            del self.conversations[call_id]
+        self.conversations.clear(call_id)
+        self.sentiment.clear(call_id)
 
 
 agent = CRMAgent()
+
+
+def _call_ended(call):
+    agent.clear_conversation(call['call_id'])
+    ReplyStrategy.record_call(call)
+
+
+CallManager.on_end(_call_ended)
@@ -4,6 +4,7 @@ from ..services.appointment import AppointmentService
 from ..services.complaint import ComplaintService
 from ..services.lead import LeadService
 from ..services.vehicle import VehicleService
+from .prompts import GENERAL_OFFERS
 
 
 AGENT_FUNCTIONS = [
@@ -232,6 +233,36 @@ AGENT_FUNCTIONS = [
 ]
 
 
+# What each function does to stored data. Read-only functions in one turn run
+# concurrently; mutating ones are serialized per resource (the table they write)
+FUNCTION_EFFECTS = {
+    "get_vehicle_info": {"mutates": False},
+    "check_appointment_slots": {"mutates": False},
+    "get_current_offers": {"mutates": False},
+    "get_customer_history": {"mutates": False},
+    "book_test_drive": {"mutates": True, "resource": "appointments"},
+    "book_service_appointment": {"mutates": True, "resource": "appointments"},
+    "register_complaint": {"mutates": True, "resource": "complaints"},
+    "add_lead": {"mutates": True, "resource": "leads"},
+    "request_human_takeover": {"mutates": True, "resource": "calls"},
+}
+
+# How the reply after a function is worded: "template" results are
+# structured enough to be spoken from TOOL_REPLY_TEMPLATES without a second
+# completion (replies.py); "llm" results need the model to phrase them
+FUNCTION_REPLIES = {
+    "get_vehicle_info": "llm",
+    "check_appointment_slots": "template",
+    "get_current_offers": "llm",
+    "get_customer_history": "llm",
+    "book_test_drive": "template",
+    "book_service_appointment": "template",
+    "register_complaint": "template",
+    "add_lead": "template",
+    "request_human_takeover": "template",
+}
+
+
 def execute_function(function_name, arguments, call_id=None):
     """Execute an agent function and return the result"""
 
@@ -324,12 +355,7 @@ def execute_function(function_name, arguments, call_id=None):
         return {
             "success": True,
             "offers": offers,
-            "general_offers": [
-                "Exchange Bonus: Up to ₹50,000",
-                "Corporate Discount: ₹15,000",
-                "First-time buyer: ₹10,000 off",
-                "Special Finance: 7.99% interest"
-            ]
+            "general_offers": GENERAL_OFFERS
         }
 
     elif function_name == "add_lead":
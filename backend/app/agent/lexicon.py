@@ -0,0 +1,136 @@
+# Weighted multilingual term lexicons for sentiment and confusion scoring
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from ..config import Config
+
+# Spelling folds applied to both the terms and the text, so transliteration
+# variants meet: "dhanyawaad"/"dhanyavad", "achha"/"accha", "bekaar"/"bekar",
+# "good"/"gud", "phir"/"fir", "naraz"/"naraj"
+FOLDS = [
+    (r'oo', 'u'),
+    (r'ee', 'i'),
+    (r'w', 'v'),
+    (r'ph', 'f'),
+    (r'z', 'j'),
+    (r'([a-z])\1+', r'\1'),
+]
+_FOLDS = [(re.compile(pattern), repl) for pattern, repl in FOLDS]
+
+# Letters that continue a word; Devanagari vowel signs are not \w
+_WORD_CHAR = r'[\wऀ-ॿ]'
+_EDGES = re.compile(r'^[\W_]+|[\W_]+$')
+
+
+def fold(text):
+    """Lowercased text with spelling variants folded and whitespace collapsed to single spaces"""
+    text = ' '.join(str(text or '').lower().split())
+    for pattern, repl in _FOLDS:
+        text = pattern.sub(repl, text)
+    return text
+
+
+class Lexicon:
+    """Terms (words or phrases) with weights, compiled once into one regex.
+
+    Matches respect word boundaries ("what" does not match "whatever") and
+    phrases win over the words inside them ("not happy" scores as itself,
+    not as "happy"). utterances are scored only when they are the whole
+    message, e.g. a bare "kya?".
+    """
+
+    def __init__(self, terms, utterances=None):
+        self.weights = {}
+        for term, weight in terms.items():
+            self.weights[' '.join(fold(term).split())] = weight
+        self.utterances = {fold(term).strip(): weight for term, weight in (utterances or {}).items()}
+        alternatives = sorted(self.weights, key=len, reverse=True)
+        body = '|'.join(re.escape(term) for term in alternatives)
+        self.pattern = re.compile(rf'(?<!{_WORD_CHAR})(?:{body})(?!{_WORD_CHAR})')
+
+    def matches(self, text):
+        """Matched terms in text, folded"""
+        return self.pattern.findall(fold(text))
+
+    def score(self, text):
+        """Sum of the weights of every term found in text"""
+        folded = fold(text)
+        total = sum(self.weights[match] for match in self.pattern.findall(folded))
+        return total + self.utterances.get(_EDGES.sub('', folded), 0)
+
+    def score_many(self, texts):
+        """score() for many texts at once, e.g. every stored transcript; returns a Series.
+
+        The texts are folded and scanned as one newline-joined string, and
+        each match is attributed to its text by offset, so the regex engine
+        makes a single pass however many texts there are.
+        """
+        texts = ['' if text is None or text != text else str(text) for text in texts]
+        folded = '\n'.join(' '.join(text.lower().split()) for text in texts)
+        for pattern, repl in _FOLDS:
+            folded = pattern.sub(repl, folded)
+        rows = folded.split('\n')
+        starts = np.cumsum([0] + [len(row) + 1 for row in rows[:-1]])
+        totals = np.array([self.utterances.get(_EDGES.sub('', row), 0) for row in rows], dtype=float)
+        positions = []
+        weights = []
+        for match in self.pattern.finditer(folded):
+            positions.append(match.start())
+            weights.append(self.weights[match.group()])
+        if positions:
+            np.add.at(totals, np.searchsorted(starts, positions, side='right') - 1, weights)
+        return pd.Series(totals[:len(texts)])
+
+
+SENTIMENT = Lexicon({
+    # Negative - English, Hindi, Marathi
+    "problem": -0.5, "issue": -0.5, "complaint": -0.5, "bad": -0.5, "upset": -0.5, "angry": -0.75,
+    "disappointed": -0.75, "worst": -1.0, "terrible": -1.0, "not happy": -0.75, "not good": -0.5,
+    "delay": -0.25, "late": -0.25,
+    "kharab": -0.5, "bura": -0.5, "galat": -0.5, "bekaar": -0.75, "bakwas": -0.75, "ghatiya": -1.0,
+    "pareshan": -0.5, "khush nahi": -0.75, "achha nahi": -0.5, "bilkul bekaar": -1.0,
+    "खराब": -0.5, "बेकार": -0.75, "गलत": -0.5,
+    "vait": -0.5, "trasadi": -0.5, "tras": -0.5, "naraz": -0.5, "dukh": -0.5, "chhan nahi": -0.5,
+    # Positive
+    "good": 0.5, "great": 0.75, "thanks": 0.5, "thank you": 0.5, "best": 0.75, "happy": 0.5,
+    "excellent": 1.0, "perfect": 0.75, "awesome": 0.75,
+    "dhanyavaad": 0.5, "shukriya": 0.5, "bahut achha": 0.5, "badhiya": 0.5, "bahut badhiya": 0.75, "khush": 0.5,
+    "धन्यवाद": 0.5, "शुक्रिया": 0.5,
+    "mast": 0.5, "chhan": 0.5, "uttam": 0.75, "sundar": 0.5, "barober": 0.25, "barobar": 0.25,
+})
+
+# How much each phrase suggests the caller didn't follow the agent
+UNCLEAR = Lexicon({
+    "samajh nahi": 0.2, "samjha nahi": 0.2, "samjhi nahi": 0.2, "phir se": 0.2, "dobara": 0.2,
+    "kya bola": 0.2, "kya kaha": 0.2, "huh": 0.2, "pardon": 0.2, "repeat": 0.2, "didn't get": 0.2,
+    "samajla nahi": 0.2, "parat sanga": 0.2, "nahi kalala": 0.2, "kalala nahi": 0.2, "kay mhanala": 0.2,
+}, utterances={"kya": 0.2, "what": 0.2, "kay": 0.2, "hain": 0.2, "sorry": 0.2})
+
+
+class RollingScores:
+    """Exponentially weighted per-call score (SENTIMENT_SMOOTHING is the
+    weight of the latest turn), so one polite "thanks" after three
+    complaints doesn't make the whole call look happy"""
+
+    def __init__(self):
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, call_id, value):
+        with self._lock:
+            previous = self._scores.pop(call_id, None)
+            alpha = Config.SENTIMENT_SMOOTHING
+            rolling = value if previous is None else alpha * value + (1 - alpha) * previous
+            self._scores[call_id] = rolling
+            while len(self._scores) > Config.CONVERSATION_MAX_CALLS:
+                self._scores.popitem(last=False)
+            return rolling
+
+    def get(self, call_id):
+        return self._scores.get(call_id)
+
+    def clear(self, call_id):
+        with self._lock:
+            self._scores.pop(call_id, None)
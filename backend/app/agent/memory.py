@@ -0,0 +1,186 @@
+# Bounded per-call conversation history for the agent
+import json
+import threading
+import time
+from collections import OrderedDict
+from ..config import Config
+
+# Fields worth keeping from tool results; the rest (features, image URLs,
+# timestamps, internal notes) costs tokens on every later turn
+TOOL_RESULT_FIELDS = {
+    'success', 'message', 'error', 'date', 'reason', 'takeover_requested',
+    'model', 'variant', 'fuel_type', 'price_ex_showroom', 'price_on_road', 'mileage', 'in_stock',
+    'current_offer', 'customer_id', 'name', 'phone', 'vehicle_owned', 'vehicle_reg_no', 'customer_type',
+    'appointment_id', 'type', 'vehicle_model', 'time_slot', 'status',
+    'complaint_id', 'category', 'priority', 'lead_id', 'stage'
+}
+
+
+def estimate_tokens(message):
+    """Rough token count (~4 characters per token), good enough for budgeting"""
+    content = message.get('content') or ''
+    extra = json.dumps(message['tool_calls']) if message.get('tool_calls') else ''
+    return (len(content) + len(extra)) // 4 + 4
+
+
+def shrink_tool_result(result, max_items=None):
+    """Tool result reduced to the fields the model needs to answer from it"""
+    max_items = max_items or Config.TOOL_RESULT_MAX_ITEMS
+    if isinstance(result, dict):
+        shrunk = {}
+        for key, value in result.items():
+            if isinstance(value, (list, dict)):
+                shrunk[key] = shrink_tool_result(value, max_items)
+            elif key in TOOL_RESULT_FIELDS and value is not None and value != '':
+                shrunk[key] = value
+        return shrunk
+    if isinstance(result, list):
+        items = [shrink_tool_result(item, max_items) for item in result[:max_items]]
+        if len(result) > max_items:
+            items.append(f"... {len(result) - max_items} more")
+        return items
+    return result
+
+
+def _clip(text, limit):
+    text = ' '.join(str(text or '').split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+class ConversationStore:
+    """Message history per call, kept within Config.CONVERSATION_TOKEN_BUDGET.
+
+    get() returns the live message list (system prompt first) that the agent
+    appends to during a turn. After each turn compact() folds the oldest
+    turns into a short "earlier in this call" note until the history fits
+    the budget, always keeping the latest CONVERSATION_KEEP_TURNS turns
+    verbatim. Whole turns are dropped, so an assistant tool_calls message
+    never loses its tool results. Conversations idle for longer than
+    CONVERSATION_TTL_SECONDS are evicted, as are the least recently used
+    ones beyond CONVERSATION_MAX_CALLS.
+    """
+
+    SUMMARY_PREFIX = "Earlier in this call (summary):"
+
+    def __init__(self, system_prompt):
+        # Callable, so a rebuilt prompt (e.g. after a price change) reaches
+        # ongoing calls too
+        self.system_prompt = system_prompt
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._stats = {'compactions': 0, 'turns_summarized': 0, 'evicted_idle': 0, 'evicted_lru': 0, 'cleared': 0,
+                       'seeded': 0}
+
+    def get(self, call_id, seed=None):
+        """Live message list for call_id; seed() supplies the earlier messages
+        of a call this process hasn't seen yet (e.g. served by another worker)"""
+        prompt = self.system_prompt()
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep > 60:
+                self._sweep(now)
+            entry = self._conversations.get(call_id)
+            if entry is None:
+                history = seed() if seed else []
+                entry = {'messages': [{"role": "system", "content": prompt}] + history, 'summary': ''}
+                self._stats['seeded'] += bool(history)
+                self._conversations[call_id] = entry
+                while len(self._conversations) > Config.CONVERSATION_MAX_CALLS:
+                    self._conversations.popitem(last=False)
+                    self._stats['evicted_lru'] += 1
+            self._conversations.move_to_end(call_id)
+            entry['messages'][0]['content'] = prompt
+            entry['last_used'] = now
+            return entry['messages']
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        idle = [call_id for call_id, entry in self._conversations.items()
+                if now - entry['last_used'] > Config.CONVERSATION_TTL_SECONDS]
+        for call_id in idle:
+            del self._conversations[call_id]
+        self._stats['evicted_idle'] += len(idle)
+
+    def rollback(self, call_id, length):
+        """Drop messages added after length, e.g. by a turn that failed half-way
+        and would otherwise leave tool calls without results"""
+        with self._lock:
+            entry = self._conversations.get(call_id)
+            if entry is not None:
+                del entry['messages'][length:]
+
+    def clear(self, call_id):
+        with self._lock:
+            if self._conversations.pop(call_id, None) is not None:
+                self._stats['cleared'] += 1
+
+    @staticmethod
+    def _turns(messages):
+        """Split history (after the system messages) into turns starting at each user message"""
+        turns = []
+        for message in messages:
+            if message['role'] == 'user' or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    @staticmethod
+    def _summarize(turn):
+        parts = []
+        for message in turn:
+            if message['role'] == 'user':
+                parts.append(f"Customer: {_clip(message['content'], 120)}")
+            elif message['role'] == 'assistant' and message.get('tool_calls'):
+                names = ', '.join(call['function']['name'] for call in message['tool_calls'])
+                parts.append(f"[used {names}]")
+            elif message['role'] == 'assistant' and message.get('content'):
+                parts.append(f"Agent: {_clip(message['content'], 120)}")
+        return ' '.join(parts)
+
+    def compact(self, call_id):
+        """Fold the oldest turns into the summary until the history fits the budget"""
+        with self._lock:
+            entry = self._conversations.get(call_id)
+            if entry is None:
+                return
+            messages = entry['messages']
+            head = 2 if len(messages) > 1 and messages[1]['role'] == 'system' else 1
+            turns = self._turns(messages[head:])
+            budget = Config.CONVERSATION_TOKEN_BUDGET
+            tokens = sum(estimate_tokens(m) for turn in turns for m in turn)
+            dropped = 0
+            while tokens > budget and len(turns) - dropped > Config.CONVERSATION_KEEP_TURNS:
+                turn = turns[dropped]
+                tokens -= sum(estimate_tokens(m) for m in turn)
+                summary = self._summarize(turn)
+                entry['summary'] = f"{entry['summary']} {summary}".strip() if summary else entry['summary']
+                dropped += 1
+            if not dropped:
+                return
+
+            # Keep the newest part of the summary if it outgrows its own cap
+            limit = Config.CONVERSATION_SUMMARY_CHARS
+            if len(entry['summary']) > limit:
+                entry['summary'] = '...' + entry['summary'][-(limit - 3):]
+            kept = [m for turn in turns[dropped:] for m in turn]
+            summary = [{"role": "system", "content": f"{self.SUMMARY_PREFIX} {entry['summary']}"}] if entry['summary'] else []
+            messages[:] = [messages[0], *summary, *kept]
+            self._stats['compactions'] += 1
+            self._stats['turns_summarized'] += dropped
+
+    def get_stats(self):
+        with self._lock:
+            histories = [entry['messages'] for entry in self._conversations.values()]
+            tokens = [sum(estimate_tokens(m) for m in messages[1:]) for messages in histories]
+            return {
+                'conversations': len(histories),
+                'messages': sum(len(messages) for messages in histories),
+                'history_tokens': sum(tokens),
+                'largest_history_tokens': max(tokens) if tokens else 0,
+                'approx_bytes': sum(
+                    len(json.dumps(messages[1:], default=str, ensure_ascii=False)) for messages in histories
+                ),
+                'token_budget': Config.CONVERSATION_TOKEN_BUDGET,
+                **self._stats
+            }
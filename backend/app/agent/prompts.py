@@ -93,37 +93,17 @@ In Marathi: "Budget cha prashna ahe na? Bagha Punch 6 lakh pasun suru hota, full
 
 Remember: You're a professional dealership executive. Be warm and friendly, but maintain business boundaries."""
 
-VEHICLE_CONTEXT = """## TATA VEHICLES - KNOW YOUR STUFF
-
-### HOT SELLERS
-**Nexon** (SUV King)
-- 8-15 lakh range, petrol/diesel/EV options
-- "5 star safety hai, looks bhi solid hai"
-- EV version: 465km range, 14.5L se start
-
-**Punch** (City Champion)
-- 6-10 lakh, perfect for city driving
-- "Compact hai par feel SUV jaisi hai"
-- EV version bhi aa gaya hai
-
-**Harrier** (Premium Feel)
-- 15-26 lakh, diesel powerhouse
-- "Full loaded hai - panoramic sunroof, ADAS sab milta hai"
-
-**Safari** (Family SUV)
-- 16-27 lakh, 6/7 seater
-- "Long trips ke liye perfect, space bhi hai comfort bhi"
-
-### BUDGET OPTIONS
-**Tiago** - 5.65L se, hatchback, CNG bhi
-**Tigor** - 6.3L se, sedan, CNG available
-**Altroz** - 6.7L se, premium hatch, 5-star safety
-
-### CURRENT OFFERS
-- Exchange pe 50k tak extra
-- Corporate discount 15k
-- First time buyer 10k off
-- Finance 7.99% interest
+# The vehicle line-up itself is rendered from the vehicles table by
+# PromptContext (context.py); these are the dealership-wide terms around it
+GENERAL_OFFERS = [
+    "Exchange Bonus: Up to ₹50,000",
+    "Corporate Discount: ₹15,000",
+    "First-time buyer: ₹10,000 off",
+    "Special Finance: 7.99% interest"
+]
+
+DEALERSHIP_CONTEXT = """### GENERAL OFFERS (on top of model offers)
+{offers}
 
 ### SERVICE
 - Regular service: 3.5-5.5k
@@ -131,3 +111,33 @@ VEHICLE_CONTEXT = """## TATA VEHICLES - KNOW YOUR STUFF
 - AMC package: 8k/year
 
 Note: Mention prices casually, don't recite like a brochure!"""
+
+# Fixed lines the agent speaks word for word; their audio is pre-warmed into
+# the TTS cache by prewarm_tts.py
+GREETINGS = [
+    "Hello! Satis Motor se Priya bol rahi hoon. Kaise help kar sakti hoon aapki?",
+    "Haan ji, Satis Motor - Priya here! Bataiye kya kar sakti hoon aapke liye?",
+    "Good morning! Satis Motor se baat ho rahi hai. Main Priya, bataiye?",
+    "Hello ji! Satis Motor, Priya speaking. Kya help chahiye aapko?"
+]
+
+TAKEOVER_MESSAGE = "Sir, ek second, main aapko hamare senior executive se connect kar raha hoon..."
+
+# Replies rendered straight from a tool's structured result instead of a
+# second completion (see replies.py). {day} is aaj/kal or a date, {time} and
+# {slots} are spoken slot start times like "10 AM"
+TOOL_REPLY_TEMPLATES = {
+    "check_appointment_slots": "Ji, {day} {count} slots khaali hain, jaise {slots}. Aapko kaunsa time suit karega?",
+    "check_appointment_slots.one": "Ji, {day} sirf ek slot khaali hai, {slots}. Woh chalega aapko?",
+    "check_appointment_slots.none": "Sorry ji, {day} ke saare slots full hain. Koi aur din dekh lein?",
+    "book_test_drive": "Done ji! {model} ki test drive {day} {time} ke liye book ho gayi hai. Aur kuch help chahiye?",
+    "book_service_appointment": "Ho gaya ji, aapki service appointment {day} {time} ke liye book ho gayi hai. Aur kuch?",
+    "register_complaint": ("Sorry ji, aapko yeh problem hui. Maine complaint register kar di hai, "
+                           "hamari team 24 ghante ke andar aapse contact karegi."),
+    "add_lead": "Thank you ji, maine aapki details note kar li hain. Hamari team aapse jaldi contact karegi.",
+    "request_human_takeover": TAKEOVER_MESSAGE
+}
+
+FIXED_PHRASES = GREETINGS + [
+    TAKEOVER_MESSAGE, TOOL_REPLY_TEMPLATES["register_complaint"], TOOL_REPLY_TEMPLATES["add_lead"]
+]
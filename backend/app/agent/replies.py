@@ -0,0 +1,149 @@
+# Reply strategy after tool calls: templated fast path vs. LLM follow-up
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from ..config import Config
+from ..services.metrics import LatencyHistogram
+from .functions import FUNCTION_REPLIES
+from .prompts import TOOL_REPLY_TEMPLATES
+
+
+def spoken_day(date):
+    """'2026-10-19' -> 'kal' (tomorrow), 'aaj', or '20 October'"""
+    try:
+        day = datetime.strptime(str(date), '%Y-%m-%d').date()
+    except ValueError:
+        return str(date or '')
+    today = datetime.now().date()
+    if day == today:
+        return 'aaj'
+    if day == today + timedelta(days=1):
+        return 'kal'
+    return f"{day.day} {day:%B}"
+
+
+def spoken_time(slot):
+    """'02:00 PM - 03:00 PM' -> '2 PM'"""
+    start = str(slot or '').split('-')[0].strip()
+    try:
+        time = datetime.strptime(start, '%I:%M %p')
+    except ValueError:
+        return start
+    hour = time.strftime('%I').lstrip('0')
+    return f"{hour}:{time:%M} {time:%p}" if time.minute else f"{hour} {time:%p}"
+
+
+def _join(items):
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} aur {items[-1]}"
+
+
+def render_reply(name, arguments, result):
+    """Templated reply for one function result, or None when it needs the LLM"""
+    if FUNCTION_REPLIES.get(name) != "template" or not result.get("success"):
+        return None
+
+    if name == "check_appointment_slots":
+        slots = result.get("available_slots") or []
+        day = spoken_day(result.get("date"))
+        if not slots:
+            return TOOL_REPLY_TEMPLATES["check_appointment_slots.none"].format(day=day)
+        spoken = _join([spoken_time(slot) for slot in slots[:3]])
+        key = "check_appointment_slots.one" if len(slots) == 1 else "check_appointment_slots"
+        return TOOL_REPLY_TEMPLATES[key].format(day=day, count=len(slots), slots=spoken)
+
+    return TOOL_REPLY_TEMPLATES[name].format(
+        day=spoken_day(arguments.get("date")),
+        time=spoken_time(arguments.get("time_slot")),
+        model=arguments.get("vehicle_model") or "aapki car"
+    )
+
+
+class ReplyStrategy:
+    """Decides how a turn that ran tools is answered, and compares the two ways.
+
+    When every function of a turn has a "template" strategy
+    (FUNCTION_REPLIES) and succeeded, the reply is rendered from
+    TOOL_REPLY_TEMPLATES and the second completion is skipped; anything
+    else - vehicle info, offers, a failed booking - goes back to the model.
+
+    Calls are split into two arms for an A/B comparison: a stable hash of
+    the call id puts TEMPLATED_REPLY_SHARE of calls in the "template" arm
+    and the rest in the "llm" arm, which always asks the model. Tool-turn
+    latency is recorded per arm, and so are call outcomes when calls end.
+    """
+
+    _lock = threading.Lock()
+    _arms = {}
+
+    @staticmethod
+    def arm(call_id):
+        share = Config.TEMPLATED_REPLY_SHARE
+        if share >= 1:
+            return "template"
+        if share <= 0:
+            return "llm"
+        bucket = int(hashlib.sha256(str(call_id).encode()).hexdigest()[:8], 16) / 0x100000000
+        return "template" if bucket < share else "llm"
+
+    @classmethod
+    def choose(cls, call_id, functions_called):
+        """(strategy, reply): ("template", text) for the fast path, ("llm", None) otherwise"""
+        if cls.arm(call_id) != "template":
+            return "llm", None
+        replies = []
+        handover = []
+        for function in functions_called:
+            reply = render_reply(function["name"], function["arguments"], function["result"])
+            if reply is None:
+                return "llm", None
+            # The transfer line is said last, right before the handover
+            (handover if function["name"] == "request_human_takeover" else replies).append(reply)
+        return "template", ' '.join(replies + handover[:1])
+
+    @classmethod
+    def _stats(cls, arm):
+        stats = cls._arms.get(arm)
+        if stats is None:
+            stats = cls._arms[arm] = {
+                'tool_turns': 0, 'fast_path_turns': 0, 'turn_latency': LatencyHistogram(),
+                'calls': 0, 'outcomes': {}, 'takeovers': 0, 'sentiment_total': 0.0, 'duration_total': 0
+            }
+        return stats
+
+    @classmethod
+    def record_turn(cls, call_id, strategy, elapsed_ms):
+        with cls._lock:
+            stats = cls._stats(cls.arm(call_id))
+            stats['tool_turns'] += 1
+            stats['fast_path_turns'] += strategy == "template"
+            stats['turn_latency'].observe(elapsed_ms)
+
+    @classmethod
+    def record_call(cls, call):
+        """Count an ended call's outcome in its arm"""
+        with cls._lock:
+            stats = cls._stats(cls.arm(call['call_id']))
+            outcome = call.get('outcome') or 'unknown'
+            stats['calls'] += 1
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+            stats['takeovers'] += call.get('handled_by') == 'ai_then_human'
+            stats['sentiment_total'] += float(call.get('sentiment_score') or 0)
+            stats['duration_total'] += int(call.get('duration_seconds') or 0)
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            arms = {}
+            for arm, stats in sorted(cls._arms.items()):
+                calls = stats['calls']
+                arms[arm] = {
+                    'tool_turns': stats['tool_turns'],
+                    'fast_path_turns': stats['fast_path_turns'],
+                    'turn_latency': stats['turn_latency'].to_dict(),
+                    'calls': calls,
+                    'outcomes': dict(stats['outcomes']),
+                    'takeover_rate': round(stats['takeovers'] / calls, 3) if calls else None,
+                    'avg_sentiment': round(stats['sentiment_total'] / calls, 3) if calls else None,
+                    'avg_duration_seconds': round(stats['duration_total'] / calls, 1) if calls else None
+                }
+            return {'templated_share': Config.TEMPLATED_REPLY_SHARE, 'arms': arms}
@@ -0,0 +1,281 @@
+# Opt-in cache of agent replies to FAQ-style questions
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from ..config import Config
+from ..data.storage import storage
+from ..services.vehicle import VehicleService
+
+# Spelling variants (Hinglish, Marathi, English) folded onto one token
+SYNONYMS = {
+    'price': ('price', 'prices', 'pricing', 'keemat', 'kimat', 'kimmat', 'daam', 'dam', 'rate', 'cost',
+              'onroad', 'exshowroom'),
+    'offer': ('offer', 'offers', 'discount', 'discounts', 'scheme', 'schemes', 'deal', 'deals', 'sasta'),
+    'timing': ('timing', 'timings', 'hours', 'khulta', 'khulte', 'open', 'band', 'close', 'closing', 'baje'),
+    'address': ('address', 'location', 'kahan', 'kaha', 'kuthe', 'showroom', 'dealership', 'pata'),
+    'mileage': ('mileage', 'average', 'kmpl', 'range'),
+    'feature': ('feature', 'features', 'sunroof', 'safety', 'airbags', 'adas', 'specs', 'specification'),
+    'service': ('service', 'servicing', 'amc', 'warranty'),
+    'ev': ('ev', 'electric', 'bijli'),
+    'variant': ('variant', 'variants', 'model', 'models', 'option', 'options'),
+}
+_CANONICAL = {word: canonical for canonical, words in SYNONYMS.items() for word in words}
+
+# Topics whose answer depends on the model: only cached when the question
+# names one, since "price kya hai?" means whatever model the call is about.
+# The rest are the same for every caller and cached either way
+MODEL_TOPICS = {'price', 'mileage', 'feature', 'variant', 'ev'}
+GENERAL_TOPICS = {'offer', 'timing', 'address', 'service'}
+
+# "How much": a price question unless it asks how much of something else
+# ("mileage kitna hai")
+HOW_MUCH = {'kitna', 'kitne', 'kitni', 'kiti', 'kitana'}
+
+# Filler that doesn't change what is being asked
+STOPWORDS = {
+    'ka', 'ki', 'ke', 'ko', 'kya', 'hai', 'hain', 'he', 'ho', 'ji', 'haan', 'acha', 'achha', 'ok', 'okay',
+    'please', 'plz', 'bhai', 'sir', 'madam', 'mam', 'bhaiya', 'batao', 'bataiye', 'bataye', 'bata', 'do', 'dijiye',
+    'the', 'is', 'are', 'a', 'an', 'of', 'for', 'what', 'whats', 'tell', 'me', 'about', 'in', 'on', 'and',
+    'aur', 'bhi', 'toh', 'to', 'mein', 'se', 'par', 'abhi', 'current', 'currently', 'wala', 'wali',
+    'aahe', 'ahe', 'kay', 'sanga', 'na', 'hota', 'mhanje', 'pan', 'la', 'chi', 'cha', 'che',
+    'koi', 'kuch', 'kab', 'milta', 'milega', 'milegi', 'chal', 'raha', 'rahi', 'any', 'there',
+}
+
+# Questions with these are about the caller or a moment in time, never served from cache
+PERSONAL_WORDS = {
+    'mera', 'meri', 'mere', 'mujhe', 'my', 'mine', 'main', 'hum', 'hamara', 'hamari', 'maza', 'majhi', 'maze',
+    'mala', 'amhala', 'booking', 'appointment', 'complaint', 'book', 'cancel', 'reschedule',
+    'aaj', 'kal', 'parso', 'today', 'tomorrow', 'udya', 'uska', 'uski', 'iska', 'iski', 'woh', 'ye', 'yeh', 'that', 'it'
+}
+
+# Words that mark a Marathi question, so Hinglish answers aren't served to it
+MARATHI_WORDS = {'aahe', 'ahe', 'kay', 'kiti', 'sanga', 'kuthe', 'mala', 'tumhi', 'tumhala', 'kasa', 'kashi', 'pahije'}
+
+_WORD = re.compile(r"[a-z0-9ऀ-ॿ]+")
+
+# A caller giving their name: "mera naam Amit hai", "main Amit bol raha hoon",
+# "my name is Amit", "maza nav Amit"
+_INTRODUCTION = re.compile(
+    r"(?:mera naam|my name is|this is|naam hai|maza nav|majhe nav|main|mai|me)\s+([a-z]{3,})(?:\s+(?:hai|hoon|hu|bol|here|aahe))",
+    re.IGNORECASE
+)
+# Words in call records that aren't a person's name
+_NOT_NAMES = {'unknown', 'demo', 'customer', 'caller', 'test'}
+
+
+def introduced_names(texts):
+    """Names callers gave for themselves in texts"""
+    return {match.lower() for text in texts for match in _INTRODUCTION.findall(str(text or ''))}
+
+
+def _mentions_name(reply, names):
+    words = set(_WORD.findall(str(reply or '').lower()))
+    for name in names:
+        for part in _WORD.findall(str(name or '').lower()):
+            if len(part) >= 3 and part not in _NOT_NAMES and part in words:
+                return True
+    return False
+
+
+def _trigrams(tokens):
+    grams = Counter()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _cosine(a, b, norm_a, norm_b):
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (norm_a * norm_b)
+
+
+class ResponseCache:
+    """Recent answers to stand-alone FAQ questions ("Nexon ka price kya hai",
+    showroom timings, current offers), reused for near-identical questions.
+
+    Questions are normalized - lowercased, spelling variants and Hinglish,
+    Marathi and English synonyms folded together (SYNONYMS), filler dropped
+    - and compared by character-trigram cosine similarity. Entries are
+    bucketed by language and by the vehicle models a question names, so
+    "Nexon price" never matches "Harrier price". Only questions about a
+    known topic are eligible: model-specific topics (MODEL_TOPICS) only when
+    the question names the model, and none that mention the caller, a
+    booking or a relative date (PERSONAL_WORDS) or contain digits.
+
+    Only replies produced without tools, or with read-only tools that are
+    the same for every caller (FAQ_FUNCTIONS), are stored, and only when
+    they stand on the question alone: no models beyond the ones asked
+    about (tool arguments included) and no caller names.
+
+    Every entry is dropped when the vehicles table changes, since prices
+    and offers live there: on this process's writes through on_change, and
+    on other workers' writes when lookup() sees storage.table_version()
+    move. Disabled unless RESPONSE_CACHE_ENABLED is set.
+    """
+
+    # Read-only functions whose results are the same for every caller
+    FAQ_FUNCTIONS = {'get_vehicle_info', 'get_current_offers'}
+
+    _entries = OrderedDict()  # (language, models, normalized question) -> entry
+    _models = None
+    _version = 0
+    _table_version = None
+    _lock = threading.Lock()
+    _counters = {'lookups': 0, 'hits': 0, 'misses': 0, 'ineligible': 0, 'stores': 0, 'invalidations': 0}
+
+    @classmethod
+    def _known_models(cls):
+        models = cls._models
+        if models is None:
+            names = {' '.join(cls.normalize(model)) for model in VehicleService.get_models_list()}
+            # Longest first, so "nexon ev" wins over "nexon"
+            models = cls._models = sorted((name for name in names if name), key=len, reverse=True)
+        return models
+
+    @staticmethod
+    def normalize(text):
+        """Tokens of text with synonyms folded and filler removed"""
+        words = _WORD.findall(str(text or '').lower())
+        tokens = [_CANONICAL.get(word, word) for word in words if word not in STOPWORDS]
+        if any(token in SYNONYMS for token in tokens):
+            return [token for token in tokens if token not in HOW_MUCH]
+        return ['price' if token in HOW_MUCH else token for token in tokens]
+
+    @classmethod
+    def key(cls, message):
+        """(bucket, tokens) for a cacheable question, or None"""
+        words = _WORD.findall(str(message or '').lower())
+        if not words or any(word.isdigit() or word in PERSONAL_WORDS for word in words):
+            return None
+        tokens = cls.normalize(message)
+        topics = set(tokens) & set(SYNONYMS)
+        if not topics:
+            return None
+        models = cls.models_in(tokens)
+        if not models and not topics <= GENERAL_TOPICS:
+            # "price kya hai?" / "EV ka range" - about a model named earlier in the call
+            return None
+        language = 'mr' if MARATHI_WORDS & set(words) else 'hi'
+        return (language, models), tokens
+
+    @classmethod
+    def models_in(cls, tokens):
+        """Known models named in normalized tokens, most specific names only"""
+        text = f" {' '.join(tokens)} "
+        models = {model for model in cls._known_models() if f" {model} " in text}
+        # "nexon ev" also contains "nexon"; keep only the most specific names
+        return tuple(sorted(m for m in models if not any(m != other and m in other for other in models)))
+
+    @classmethod
+    def lookup(cls, message):
+        """(reply, version): a cached reply or None, plus the version store() needs"""
+        if not Config.RESPONSE_CACHE_ENABLED:
+            return None, None
+        table_version = storage.table_version(Config.VEHICLES_FILE)
+        if table_version != cls._table_version:
+            if cls._table_version is not None:
+                cls.invalidate()
+            cls._table_version = table_version
+        version = cls._version
+        key = cls.key(message)
+        with cls._lock:
+            cls._counters['lookups'] += 1
+            if key is None:
+                cls._counters['ineligible'] += 1
+                return None, version
+            bucket, tokens = key
+            grams = _trigrams(tokens)
+            norm = math.sqrt(sum(n * n for n in grams.values()))
+            now = time.monotonic()
+            best, best_score = None, 0.0
+            for entry_key, entry in cls._entries.items():
+                if entry_key[0] != bucket or now - entry['stored_at'] > Config.RESPONSE_CACHE_TTL_SECONDS:
+                    continue
+                score = _cosine(grams, entry['grams'], norm, entry['norm'])
+                if score > best_score:
+                    best, best_score = entry_key, score
+            if best is None or best_score < Config.RESPONSE_CACHE_SIMILARITY:
+                cls._counters['misses'] += 1
+                return None, version
+            entry = cls._entries[best]
+            entry['hits'] += 1
+            cls._entries.move_to_end(best)
+            cls._counters['hits'] += 1
+            return entry['reply'], version
+
+    @classmethod
+    def store(cls, message, reply, functions_called, version, caller_names=None):
+        """Remember reply if the turn is eligible and no vehicle data changed since lookup().
+
+        caller_names() gives the names the caller is known by; only called for
+        replies that are otherwise cacheable.
+        """
+        if not Config.RESPONSE_CACHE_ENABLED or version is None or not reply:
+            return False
+        if any(function['name'] not in cls.FAQ_FUNCTIONS or not function['result'].get('success')
+               for function in functions_called):
+            return False
+        key = cls.key(message)
+        if key is None:
+            return False
+        bucket, tokens = key
+        models = set(bucket[1])
+        # A reply or lookup about other models than asked leans on earlier turns
+        if not set(cls.models_in(cls.normalize(reply))) <= models:
+            return False
+        for function in functions_called:
+            for value in function['arguments'].values():
+                named = cls.models_in(cls.normalize(value)) if isinstance(value, str) else ()
+                if not set(named) <= models:
+                    return False
+        if caller_names and _mentions_name(reply, caller_names()):
+            return False
+        grams = _trigrams(tokens)
+        with cls._lock:
+            if version != cls._version:
+                return False
+            cls._entries[(bucket, ' '.join(tokens))] = {
+                'reply': reply,
+                'grams': grams,
+                'norm': math.sqrt(sum(n * n for n in grams.values())),
+                'stored_at': time.monotonic(),
+                'hits': 0
+            }
+            cls._entries.move_to_end((bucket, ' '.join(tokens)))
+            while len(cls._entries) > Config.RESPONSE_CACHE_MAX_ENTRIES:
+                cls._entries.popitem(last=False)
+            cls._counters['stores'] += 1
+        return True
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._models = None
+            cls._version += 1
+            cls._counters['invalidations'] += 1
+
+    @classmethod
+    def on_change(cls, filepath, before, after):
+        if filepath == Config.VEHICLES_FILE:
+            cls.invalidate()
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            answered = cls._counters['hits'] + cls._counters['misses']
+            return {
+                'enabled': Config.RESPONSE_CACHE_ENABLED,
+                'entries': len(cls._entries),
+                'hit_ratio': round(cls._counters['hits'] / answered, 3) if answered else None,
+                **cls._counters
+            }
+
+
+storage.subscribe(ResponseCache.on_change)
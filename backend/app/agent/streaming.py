@@ -0,0 +1,48 @@
+# Sentence chunking for streamed replies
+import re
+
+# Sentence end: ., !, ? or the Devanagari danda, followed by whitespace
+_SENTENCE_END = re.compile(r'[.!?।]+["\')\]]*\s+|\n+')
+# Abbreviations that end in a period without ending the sentence
+_ABBREVIATIONS = ('rs.', 'mr.', 'mrs.', 'dr.', 'no.', 'approx.', 'st.', 'ltd.', 'pvt.', 'ji.')
+
+
+class SentenceChunker:
+    """Turns a stream of LLM tokens into sentence-sized chunks for TTS.
+
+    feed() buffers tokens and returns every sentence completed so far;
+    flush() returns whatever is left at the end of the stream. Pieces shorter
+    than min_chars are held back and joined with the next sentence, so TTS
+    isn't asked for a single "Ji." at a time, and a run-on sentence is cut at
+    a comma once it passes max_chars so the first audio isn't delayed.
+    """
+
+    def __init__(self, min_chars=20, max_chars=200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ''
+
+    def feed(self, text):
+        self._buffer += text
+        chunks = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            end = match.end()
+            candidate = self._buffer[start:end].strip()
+            if candidate.lower().endswith(_ABBREVIATIONS) or len(candidate) < self.min_chars:
+                continue
+            chunks.append(candidate)
+            start = end
+        self._buffer = self._buffer[start:]
+
+        if len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(', ', 0, self.max_chars)
+            if cut > self.min_chars:
+                chunks.append(self._buffer[:cut + 1].strip())
+                self._buffer = self._buffer[cut + 2:]
+        return chunks
+
+    def flush(self):
+        rest = self._buffer.strip()
+        self._buffer = ''
+        return [rest] if rest else []
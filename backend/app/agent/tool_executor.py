@@ -0,0 +1,136 @@
+# Concurrent execution of one turn's tool calls
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..config import Config
+from ..services.metrics import LatencyHistogram
+from .functions import FUNCTION_EFFECTS, execute_function
+
+
+class ToolExecutor:
+    """Runs the tool calls of one model response, e.g. get_vehicle_info for
+    two models plus get_current_offers.
+
+    Read-only functions (FUNCTION_EFFECTS) run concurrently on a shared pool
+    of TOOL_MAX_PARALLEL threads. Mutating functions for the same resource
+    run one at a time, in the order the model asked for them, under a lock
+    per resource that is also held against writes from other calls;
+    different resources proceed in parallel. Results come back in call
+    order, and latency is recorded per function.
+    """
+
+    _executor = None
+    _lock = threading.Lock()
+    _resource_locks = {}
+    _latency = {}
+    _errors = {}
+    _batches = {'parallel_batches': 0, 'saved_ms': 0.0}
+
+    @staticmethod
+    def effects(name):
+        # Unknown functions are treated as writes to be safe
+        return FUNCTION_EFFECTS.get(name, {"mutates": True, "resource": name})
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=Config.TOOL_MAX_PARALLEL, thread_name_prefix='tool'
+                    )
+        return cls._executor
+
+    @classmethod
+    def _resource_lock(cls, resource):
+        with cls._lock:
+            return cls._resource_locks.setdefault(resource, threading.Lock())
+
+    @classmethod
+    def _record(cls, name, elapsed_ms, failed):
+        with cls._lock:
+            cls._latency.setdefault(name, LatencyHistogram()).observe(elapsed_ms)
+            if failed:
+                cls._errors[name] = cls._errors.get(name, 0) + 1
+
+    @classmethod
+    def _run_group(cls, resource, calls, call_id):
+        """Run (name, arguments) calls in order, holding resource's lock if any;
+        returns [(result, elapsed_ms)]"""
+        lock = cls._resource_lock(resource) if resource else None
+        if lock:
+            lock.acquire()
+        try:
+            outcomes = []
+            for name, arguments in calls:
+                start = time.perf_counter()
+                failed = True
+                try:
+                    result = execute_function(name, arguments, call_id)
+                    failed = False
+                finally:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    cls._record(name, elapsed_ms, failed)
+                outcomes.append((result, elapsed_ms))
+            return outcomes
+        finally:
+            if lock:
+                lock.release()
+
+    @classmethod
+    def run(cls, calls, call_id=None):
+        """Execute [(name, arguments)]; returns [(result, elapsed_ms)] in the same order.
+
+        An exception from any function is raised once the others have finished.
+        """
+        groups = []
+        by_resource = {}
+        for index, (name, _) in enumerate(calls):
+            effects = cls.effects(name)
+            if not effects["mutates"]:
+                groups.append((None, [index]))
+            elif effects["resource"] in by_resource:
+                by_resource[effects["resource"]].append(index)
+            else:
+                by_resource[effects["resource"]] = [index]
+                groups.append((effects["resource"], by_resource[effects["resource"]]))
+
+        if len(groups) == 1:
+            resource, indexes = groups[0]
+            return cls._run_group(resource, [calls[i] for i in indexes], call_id)
+
+        start = time.perf_counter()
+        pool = cls._pool()
+        futures = [
+            (indexes, pool.submit(cls._run_group, resource, [calls[i] for i in indexes], call_id))
+            for resource, indexes in groups
+        ]
+        outcomes = [None] * len(calls)
+        error = None
+        for indexes, future in futures:
+            try:
+                for index, outcome in zip(indexes, future.result()):
+                    outcomes[index] = outcome
+            except Exception as e:
+                error = error or e
+        if error:
+            raise error
+
+        wall_ms = (time.perf_counter() - start) * 1000
+        with cls._lock:
+            cls._batches['parallel_batches'] += 1
+            cls._batches['saved_ms'] += max(0.0, sum(ms for _, ms in outcomes) - wall_ms)
+        return outcomes
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            return {
+                'max_parallel': Config.TOOL_MAX_PARALLEL,
+                'parallel_batches': cls._batches['parallel_batches'],
+                'saved_ms': round(cls._batches['saved_ms'], 1),
+                'functions': {
+                    name: {**histogram.to_dict(), 'errors': cls._errors.get(name, 0)}
+                    for name, histogram in sorted(cls._latency.items())
+                }
+            }
@@ -0,0 +1,98 @@
+# Prompt token accounting for LLM completions
+import threading
+from collections import deque
+from ..services.metrics import LatencyHistogram
+
+
+def _field(obj, name):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def read_usage(usage):
+    """(prompt, cached, completion) tokens from a response's usage block.
+
+    cached_tokens sits in prompt_tokens_details, which the pinned SDK does
+    not model, so it arrives as an extra attribute or a plain dict.
+    """
+    details = _field(usage, 'prompt_tokens_details')
+    return (
+        _field(usage, 'prompt_tokens') or 0,
+        _field(details, 'cached_tokens') or 0,
+        _field(usage, 'completion_tokens') or 0
+    )
+
+
+class TurnUsage:
+    """Token totals for the completions of one turn"""
+
+    def __init__(self):
+        self.completions = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, usage):
+        prompt, cached, completion = read_usage(usage)
+        self.completions += 1
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        self.completion_tokens += completion
+        return cached
+
+    def to_dict(self):
+        return {
+            'completions': self.completions,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_ratio': round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None
+        }
+
+
+class PromptUsage:
+    """Process-wide prompt token and latency accounting.
+
+    Latency is time to the response for plain completions and to the first
+    chunk for streamed ones, split by whether the provider served part of
+    the prompt from its cache - the gap between the two is what the stable
+    prompt prefix buys.
+    """
+
+    _lock = threading.Lock()
+    _totals = TurnUsage()
+    _turns = 0
+    _recent = deque(maxlen=50)
+    _latency = {}
+
+    @classmethod
+    def observe(cls, turn, usage, elapsed_ms, streamed=False):
+        """Add one completion's usage to turn and record its latency"""
+        cached = turn.add(usage)
+        key = f"{'stream' if streamed else 'complete'}_{'cached' if cached else 'uncached'}"
+        with cls._lock:
+            cls._latency.setdefault(key, LatencyHistogram()).observe(elapsed_ms)
+
+    @classmethod
+    def record_turn(cls, call_id, turn):
+        with cls._lock:
+            cls._turns += 1
+            cls._totals.completions += turn.completions
+            cls._totals.prompt_tokens += turn.prompt_tokens
+            cls._totals.cached_tokens += turn.cached_tokens
+            cls._totals.completion_tokens += turn.completion_tokens
+            cls._recent.append({'call_id': call_id, **turn.to_dict()})
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            return {
+                'turns': cls._turns,
+                **cls._totals.to_dict(),
+                'avg_prompt_tokens_per_turn': round(cls._totals.prompt_tokens / cls._turns) if cls._turns else None,
+                'latency': {key: histogram.to_dict() for key, histogram in sorted(cls._latency.items())},
+                'recent_turns': list(cls._recent)[-10:]
+            }
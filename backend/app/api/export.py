@@ -0,0 +1,157 @@
+# Streaming table exports
+import csv
+import io
+import json
+import math
+from flask import Response, request, jsonify, stream_with_context
+from ..config import Config
+from ..data.storage import storage, TABLES
+from .query import QueryError, parse_list_query
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def _plain(value):
+    """A row value as something json/csv/arrow can take (missing -> None)"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(chunks, fields):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({f: _plain(row.get(f)) for f in fields}, default=str, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def _csv(chunks, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows([_plain(row.get(f)) for f in fields] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _Drain:
+    """Write-only file object whose contents are handed out as they are written"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_type(pa, values):
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return pa.bool_()
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return pa.int64()
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_value(value, arrow_type, pa):
+    if value is None:
+        return None
+    if arrow_type == pa.string():
+        return str(value)
+    try:
+        return bool(value) if arrow_type == pa.bool_() else (
+            int(value) if arrow_type == pa.int64() else float(value)
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def _parquet(chunks, fields, pa, pq):
+    # Column types are fixed by the first chunk; later values that don't fit
+    # a numeric column are written as null rather than failing mid-stream
+    sink = _Drain()
+    writer = None
+    schema = None
+    for rows in chunks:
+        columns = {f: [_plain(row.get(f)) for row in rows] for f in fields}
+        if writer is None:
+            schema = pa.schema([(f, _arrow_type(pa, columns[f])) for f in fields])
+            writer = pq.ParquetWriter(sink, schema)
+        arrays = [
+            pa.array([_arrow_value(v, field.type, pa) for v in columns[field.name]], type=field.type)
+            for field in schema
+        ]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.take()
+    if writer is None:
+        schema = pa.schema([(f, pa.string()) for f in fields])
+        writer = pq.ParquetWriter(sink, schema)
+    writer.close()
+    yield sink.take()
+
+
+def export_response(table):
+    """Stream one of the storage TABLES as ndjson (default), csv or parquet.
+
+    Rows are read and encoded Config.EXPORT_CHUNK_ROWS at a time, so memory
+    stays flat whatever the table size. Column filters and `fields=` work as
+    on the list endpoints; columns follow the table's *_COLUMNS schema.
+    """
+    filepath, columns = TABLES[table]
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}'; use ndjson, csv or parquet"}), 400
+    try:
+        query = parse_list_query(request.args, columns)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = query['fields'] or list(columns)
+
+    chunks = storage.iter_rows(filepath, columns, query['filters'], Config.EXPORT_CHUNK_ROWS)
+    if fmt == 'ndjson':
+        body = _ndjson(chunks, fields)
+    elif fmt == 'csv':
+        body = _csv(chunks, fields)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow)'}), 501
+        body = _parquet(chunks, fields, pa, pq)
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{table}.{extension}"'}
+    )
@@ -0,0 +1,28 @@
+# Bulk import endpoints
+from flask import request, jsonify
+from ..services.bulk_import import BulkImporter, BulkImportError
+
+
+def import_response(entity):
+    """Import an uploaded CSV/XLSX/NDJSON file into entity.
+
+    The file is sent as multipart field `file` (format taken from its
+    extension) or as the raw request body with `?format=`. `?dry_run=true`
+    validates and reports without writing.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        data = upload.read()
+        fmt = request.args.get('format') or BulkImporter.detect_format(upload.filename)
+    else:
+        data = request.get_data()
+        fmt = request.args.get('format', '')
+    if not data:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    try:
+        report = BulkImporter.import_file(entity, data, fmt.lower(), dry_run=dry_run)
+    except BulkImportError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report)
@@ -0,0 +1,136 @@
+# Common query layer for list endpoints
+import base64
+import binascii
+import json
+import math
+from flask import request, jsonify
+from ..config import Config
+from ..data.storage import storage, TABLES
+
+# Query parameters with a meaning of their own; any other parameter named
+# after a table column is an equality filter, and the rest are ignored.
+RESERVED_PARAMS = ('limit', 'after', 'fields', 'sort')
+
+
+class QueryError(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, id_value):
+    if isinstance(sort_value, float) and math.isnan(sort_value):
+        sort_value = None
+    raw = json.dumps([sort_value, id_value], default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        sort_value, id_value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise QueryError('Invalid cursor')
+    return sort_value, id_value
+
+
+def _filter_values(value):
+    """A query-string value plus the typed values it may be stored as"""
+    values = [value]
+    lowered = value.lower()
+    if lowered in ('true', 'false'):
+        values.append(lowered == 'true')
+    else:
+        try:
+            number = float(value)
+            values.append(int(number) if number.is_integer() else number)
+        except ValueError:
+            pass
+    return values
+
+
+def parse_list_query(args, columns):
+    """Turn request args into keyword arguments for storage.query_rows"""
+    limit = args.get('limit')
+    after = args.get('after')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise QueryError('limit must be an integer')
+        if limit < 1:
+            raise QueryError('limit must be positive')
+        limit = min(limit, Config.LIST_MAX_LIMIT)
+    elif after is not None:
+        limit = Config.LIST_DEFAULT_LIMIT
+
+    sort = args.get('sort')
+    descending = False
+    if sort:
+        descending = sort.startswith('-')
+        sort = sort.lstrip('-')
+        if sort not in columns:
+            raise QueryError(f"Cannot sort by unknown field '{sort}'")
+    else:
+        sort = None
+
+    fields = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise QueryError(f"Unknown fields: {', '.join(unknown)}")
+
+    filters = {
+        column: _filter_values(args[column])
+        for column in columns if column in args and column not in RESERVED_PARAMS
+    }
+
+    return {
+        'filters': filters,
+        'sort': sort,
+        'descending': descending,
+        'after': decode_cursor(after) if after else None,
+        'limit': limit,
+        'fields': fields
+    }
+
+
+def list_response(table):
+    """Serve a list endpoint for one of the storage TABLES from the request args.
+
+    Without `limit`/`after` this returns every matching row as a plain JSON
+    list (the endpoints' original shape). With them it returns
+    {'items': [...], 'next': cursor},
+    where `next` is passed back as `after` for the following page and is
+    null on the last one. Pages are keyset-based, so they stay stable while
+    rows are added and cost the same wherever they start.
+    """
+    filepath, columns = TABLES[table]
+    try:
+        query = parse_list_query(request.args, columns)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    limit = query['limit']
+    paginated = limit is not None
+    if paginated and query['sort'] is None:
+        # Keyset pages need a total order; ids are time-sortable
+        query['sort'] = columns[0]
+    try:
+        rows = storage.query_rows(
+            filepath, columns, query['filters'], query['sort'], query['descending'],
+            query['after'], limit + 1 if paginated else None, query['fields']
+        )
+    except TypeError:
+        # A cursor of another type than the sort column, or a column of mixed types
+        return jsonify({'error': f"Cannot sort or page by '{query['sort']}': values are not comparable"}), 400
+
+    next_cursor = None
+    if paginated and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.get(query['sort']), last.get(columns[0]))
+    if query['fields']:
+        rows = [{field: row.get(field) for field in query['fields']} for row in rows]
+
+    if not paginated:
+        return jsonify(rows)
+    return jsonify({'items': rows, 'next': next_cursor})
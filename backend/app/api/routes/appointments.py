@@ -1,4 +1,6 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..query import list_response
 from ...services.appointment import AppointmentService
 
 appointments_bp = Blueprint('appointments', __name__)
@@ -6,16 +8,12 @@ appointments_bp = Blueprint('appointments', __name__)
 
 @appointments_bp.route('/', methods=['GET'])
 def get_appointments():
-    date = request.args.get('date')
-    customer_id = request.args.get('customer_id')
-
-    if date:
-        appointments = AppointmentService.get_by_date(date)
-    elif customer_id:
-        appointments = AppointmentService.get_by_customer(customer_id)
-    else:
-        appointments = AppointmentService.get_all()
-    return jsonify(appointments)
+    return list_response('appointments')
+
+
+@appointments_bp.route('/export', methods=['GET'])
+def export_appointments():
+    return export_response('appointments')
 
 
 @appointments_bp.route('/<appointment_id>', methods=['GET'])
@@ -1,4 +1,6 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..query import list_response
 from ...services.call_manager import CallManager
 
 calls_bp = Blueprint('calls', __name__)
@@ -18,10 +20,21 @@ def get_active_call(call_id):
     return jsonify({'error': 'Call not found'}), 404
 
 
+@calls_bp.route('/events', methods=['GET'])
+def get_call_events():
+    after = request.args.get('after', 0, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    return jsonify(CallManager.get_events(after, limit))
+
+
 @calls_bp.route('/logs', methods=['GET'])
 def get_call_logs():
-    logs = CallManager.get_call_logs()
-    return jsonify(logs)
+    return list_response('call_logs')
+
+
+@calls_bp.route('/export', methods=['GET'])
+def export_call_logs():
+    return export_response('call_logs')
 
 
 @calls_bp.route('/logs/<call_id>', methods=['GET'])
@@ -34,6 +47,15 @@ def get_call_log(call_id):
 
 @calls_bp.route('/transcript/<call_id>', methods=['GET'])
 def get_transcript(call_id):
+    """Plain-text transcript; with start= and/or limit=, that range of messages as JSON"""
+    if 'start' in request.args or 'limit' in request.args:
+        messages = CallManager.get_transcript_messages(
+            call_id, request.args.get('start', 0, type=int), request.args.get('limit', type=int)
+        )
+        if messages is not None:
+            return jsonify({'call_id': call_id, 'messages': messages})
+        return jsonify({'error': 'Transcript not found'}), 404
+
     transcript = CallManager.get_transcript(call_id)
     if transcript:
         return jsonify({'call_id': call_id, 'transcript': transcript})
@@ -1,4 +1,6 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..query import list_response
 from ...services.complaint import ComplaintService
 
 complaints_bp = Blueprint('complaints', __name__)
@@ -6,16 +8,12 @@ complaints_bp = Blueprint('complaints', __name__)
 
 @complaints_bp.route('/', methods=['GET'])
 def get_complaints():
-    status = request.args.get('status')
-    customer_id = request.args.get('customer_id')
-
-    if status:
-        complaints = ComplaintService.get_by_status(status)
-    elif customer_id:
-        complaints = ComplaintService.get_by_customer(customer_id)
-    else:
-        complaints = ComplaintService.get_all()
-    return jsonify(complaints)
+    return list_response('complaints')
+
+
+@complaints_bp.route('/export', methods=['GET'])
+def export_complaints():
+    return export_response('complaints')
 
 
 @complaints_bp.route('/open', methods=['GET'])
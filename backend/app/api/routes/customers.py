@@ -1,4 +1,7 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..imports import import_response
+from ..query import list_response
 from ...services.customer import CustomerService
 
 customers_bp = Blueprint('customers', __name__)
@@ -8,10 +11,18 @@ customers_bp = Blueprint('customers', __name__)
 def get_customers():
     search = request.args.get('search', '')
     if search:
-        customers = CustomerService.search(search)
-    else:
-        customers = CustomerService.get_all()
-    return jsonify(customers)
+        return jsonify(CustomerService.search(search))
+    return list_response('customers')
+
+
+@customers_bp.route('/export', methods=['GET'])
+def export_customers():
+    return export_response('customers')
+
+
+@customers_bp.route('/import', methods=['POST'])
+def import_customers():
+    return import_response('customers')
 
 
 @customers_bp.route('/<customer_id>', methods=['GET'])
@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from ...services.call_manager import CallManager
 from ...agent.crm_agent import agent
+from ...agent.prompts import TAKEOVER_MESSAGE
 
 demo_bp = Blueprint('demo', __name__)
 
@@ -28,30 +30,25 @@ def start_demo_call():
     })
 
 
-@demo_bp.route('/message', methods=['POST'])
-def send_message():
-    """Send a message in the demo call and get AI response"""
-    data = request.json
-    call_id = data.get('call_id')
-    message = data.get('message')
-
+def validate_turn(call_id, message):
+    """The active call for an AI turn, or (None, error payload, status)"""
     if not call_id or not message:
-        return jsonify({'error': 'call_id and message are required'}), 400
+        return None, {'error': 'call_id and message are required'}, 400
 
     call = CallManager.get_call(call_id)
     if not call:
-        return jsonify({'error': 'Call not found or ended'}), 404
+        return None, {'error': 'Call not found or ended'}, 404
 
     if call.get('status') == 'takeover':
-        return jsonify({
+        return None, {
             'error': 'Call is in takeover mode. Human agent is handling.',
             'takeover': True
-        }), 400
+        }, 400
+    return call, None, None
 
-    CallManager.add_message(call_id, 'user', message)
-
-    result = agent.process_message(call_id, message, call.get('phone'))
 
+def record_turn(call_id, result):
+    """Add the agent's reply to the transcript and note the model discussed"""
     CallManager.add_message(call_id, 'assistant', result['response'])
 
     if result.get('functions_called'):
@@ -61,17 +58,78 @@ def send_message():
                 if model:
                     CallManager.update_context(call_id, {'model_discussed': model})
 
-    updated_call = CallManager.get_call(call_id)
-
-    return jsonify({
+    return {
         'success': True,
         'response': result['response'],
         'functions_called': result.get('functions_called', []),
         'confidence': result.get('confidence', 0.85),
         'sentiment': result.get('sentiment', 0.0),
         'takeover_requested': result.get('takeover_requested', False),
-        'call': updated_call
-    })
+        'reply_strategy': result.get('reply_strategy'),
+        'cached_response': result.get('cached_response', False),
+        'usage': result.get('usage'),
+        'call': CallManager.get_call(call_id)
+    }
+
+
+def stream_turn(call, message):
+    """Run an AI turn with agent.stream_message, yielding (event, payload) pairs.
+
+    Ends with ('done', <same payload as /message>) once the transcript is updated.
+    """
+    call_id = call['call_id']
+    CallManager.add_message(call_id, 'user', message)
+    for event in agent.stream_message(call_id, message, call.get('phone')):
+        kind = event.pop('type')
+        if kind == 'done':
+            yield 'done', record_turn(call_id, event)
+        else:
+            yield kind, event
+
+
+@demo_bp.route('/message', methods=['POST'])
+def send_message():
+    """Send a message in the demo call and get AI response"""
+    data = request.json
+    call_id = data.get('call_id')
+    message = data.get('message')
+
+    call, error, status = validate_turn(call_id, message)
+    if error:
+        return jsonify(error), status
+
+    CallManager.add_message(call_id, 'user', message)
+
+    result = agent.process_message(call_id, message, call.get('phone'))
+
+    return jsonify(record_turn(call_id, result))
+
+
+@demo_bp.route('/message/stream', methods=['POST'])
+def stream_message():
+    """Like /message, but streams the reply as Server-Sent Events.
+
+    Events: `token` (text deltas), `sentence` (complete sentences to hand to
+    TTS right away), `function` (tool results) and finally `done` with the
+    same payload /message returns.
+    """
+    data = request.json or {}
+    call_id = data.get('call_id')
+    message = data.get('message')
+
+    call, error, status = validate_turn(call_id, message)
+    if error:
+        return jsonify(error), status
+
+    def events():
+        for kind, payload in stream_turn(call, message):
+            yield f"event: {kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @demo_bp.route('/takeover', methods=['POST'])
@@ -87,7 +145,7 @@ def takeover_demo_call():
     success = CallManager.takeover(call_id, reason)
 
     if success:
-        takeover_message = "Sir, ek second, main aapko hamare senior executive se connect kar raha hoon..."
+        takeover_message = TAKEOVER_MESSAGE
         CallManager.add_message(call_id, 'assistant', takeover_message)
 
         call = CallManager.get_call(call_id)
@@ -133,10 +191,7 @@ def end_demo_call():
     if not call_id:
         return jsonify({'error': 'call_id is required'}), 400
 
-    agent.clear_conversation(call_id)
-
     call = CallManager.end_call(call_id, outcome)
-
     if call:
         return jsonify({
             'success': True,
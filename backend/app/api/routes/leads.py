@@ -1,4 +1,7 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..imports import import_response
+from ..query import list_response
 from ...services.lead import LeadService
 
 leads_bp = Blueprint('leads', __name__)
@@ -9,13 +12,19 @@ def get_leads():
     stage = request.args.get('stage')
     active_only = request.args.get('active', 'false').lower() == 'true'
 
-    if stage:
-        leads = LeadService.get_by_stage(stage)
-    elif active_only:
-        leads = LeadService.get_active_leads()
-    else:
-        leads = LeadService.get_all()
-    return jsonify(leads)
+    if active_only and not stage:
+        return jsonify(LeadService.get_active_leads())
+    return list_response('leads')
+
+
+@leads_bp.route('/export', methods=['GET'])
+def export_leads():
+    return export_response('leads')
+
+
+@leads_bp.route('/import', methods=['POST'])
+def import_leads():
+    return import_response('leads')
 
 
 @leads_bp.route('/pipeline', methods=['GET'])
@@ -0,0 +1,58 @@
+import os
+from flask import Blueprint, request, jsonify
+from ...data.table_cache import TableCache
+from ...data.storage import storage
+from ...data.workers import WorkerPool
+from ...data.call_state import call_store
+from ...data.transcripts import transcripts
+from ...services.aggregation import TableStats
+from ...services.call_finalizer import CallFinalizer
+from ...services.call_updates import CallUpdates
+from ...services.dashboard import DashboardView
+from ...services.http_pool import HTTPPool
+from ...agent.tool_executor import ToolExecutor
+from ...agent.context import PromptContext
+from ...agent.usage import PromptUsage
+from ...agent.replies import ReplyStrategy
+from ...agent.response_cache import ResponseCache
+from ...agent.crm_agent import agent
+from ...config import Config
+
+system_bp = Blueprint('system', __name__)
+
+
+@system_bp.route('/stats', methods=['GET'])
+def get_system_stats():
+    return jsonify({
+        'storage': storage.get_stats(),
+        'table_cache': TableCache.get_stats(),
+        'table_stats': TableStats.get_stats(),
+        'dashboard': DashboardView.get_stats(),
+        'upstreams': HTTPPool.get_stats(),
+        'workers': WorkerPool.get_stats(),
+        'tools': ToolExecutor.get_stats(),
+        'conversations': agent.conversations.get_stats(),
+        'prompt': PromptContext.get_stats(),
+        'llm_usage': PromptUsage.get_stats(),
+        'replies': ReplyStrategy.get_stats(),
+        'response_cache': ResponseCache.get_stats(),
+        'call_state': call_store.get_stats(),
+        'call_updates': CallUpdates.get_stats(),
+        'transcripts': transcripts.get_stats(),
+        'finalizer': CallFinalizer.get_stats()
+    })
+
+
+@system_bp.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """Drop cached tables, e.g. after bulk-editing a workbook by hand"""
+    data = request.json or {}
+    table = data.get('table')
+    if table:
+        TableCache.invalidate(os.path.join(Config.DATA_DIR, f"{table}.xlsx"))
+    else:
+        TableCache.invalidate()
+    # Live counters may have missed the edit too; re-seed them on next use
+    TableStats.reset()
+    DashboardView.mark_dirty()
+    return jsonify({'success': True})
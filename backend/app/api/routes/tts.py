@@ -1,10 +1,25 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from ...services.tts import TTSService
+from ...services.tts_cache import TTSCache
+from ...services.http_pool import HTTPPool
 from ...config import Config
 
 tts_bp = Blueprint('tts', __name__)
 
 
+def resolve_api_key():
+    """Re-check API key at request time (in case env wasn't loaded at import)"""
+    api_key = Config.ELEVENLABS_API_KEY
+    if not api_key:
+        # Try loading directly from env
+        import os
+        api_key = os.getenv('elevenlabs_api_key') or os.getenv('ELEVENLABS_API_KEY')
+        if api_key:
+            Config.ELEVENLABS_API_KEY = api_key
+            print(f"[TTS] Loaded API key from env directly")
+    return api_key
+
+
 @tts_bp.route('/speak', methods=['POST'])
 def text_to_speech():
     """Convert text to speech using ElevenLabs"""
@@ -15,17 +30,7 @@ def text_to_speech():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    # Re-check API key at request time (in case env wasn't loaded at import)
-    api_key = Config.ELEVENLABS_API_KEY
-    if not api_key:
-        # Try loading directly from env
-        import os
-        api_key = os.getenv('elevenlabs_api_key') or os.getenv('ELEVENLABS_API_KEY')
-        if api_key:
-            Config.ELEVENLABS_API_KEY = api_key
-            print(f"[TTS] Loaded API key from env directly")
-
-    if not api_key:
+    if not resolve_api_key():
         print(f"[TTS] API key not found!")
         return jsonify({
             'error': 'ElevenLabs API key not configured',
@@ -58,6 +63,64 @@ def text_to_speech():
         }), 500
 
 
+@tts_bp.route('/stream', methods=['POST'])
+def stream_speech():
+    """Pipelined text to speech: the text is split into sentences that are
+    synthesized concurrently, and their MP3 audio is streamed back in order
+    (chunked), so playback can start after the first sentence.
+
+    If the first sentence fails the response is a 502 JSON error; a later
+    failure aborts the chunked response rather than leaving a silent gap.
+    """
+    data = request.get_json() or {}
+    text = data.get('text', '')
+    voice = data.get('voice', 'rachel')
+
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+
+    if not resolve_api_key():
+        return jsonify({
+            'error': 'ElevenLabs API key not configured',
+            'fallback': True
+        }), 503
+
+    sentences = TTSService.split_sentences(text)
+    if not sentences:
+        return jsonify({'error': 'No text provided'}), 400
+    print(f"[TTS] Streaming {len(sentences)} sentences for: {text[:50]}...")
+
+    chunks = TTSService.stream_speech(sentences, voice)
+    # Headers go out with the first sentence, so its failure still gets a status
+    first = next(chunks)
+    if first['audio'] is None:
+        chunks.close()
+        return jsonify({
+            'error': 'Failed to generate speech',
+            'details': first['error'],
+            'fallback': True
+        }), 502
+
+    def audio():
+        yield first['audio']
+        for chunk in chunks:
+            if chunk['audio'] is None:
+                # Too late for a status: cut the response off so the client's
+                # read fails instead of the sentence being silently skipped
+                raise RuntimeError(f"TTS sentence {chunk['index']} failed: {chunk['error']}")
+            yield chunk['audio']
+
+    return Response(
+        stream_with_context(audio()),
+        mimetype='audio/mpeg',
+        headers={
+            'Content-Disposition': 'inline',
+            'Cache-Control': 'no-cache',
+            'X-TTS-Sentences': str(len(sentences))
+        }
+    )
+
+
 @tts_bp.route('/voices', methods=['GET'])
 def get_voices():
     """Get available voices"""
@@ -73,5 +136,7 @@ def get_status():
     """Check if ElevenLabs TTS is available"""
     return jsonify({
         'available': bool(Config.ELEVENLABS_API_KEY),
-        'message': 'ElevenLabs configured' if Config.ELEVENLABS_API_KEY else 'ElevenLabs API key not set'
+        'message': 'ElevenLabs configured' if Config.ELEVENLABS_API_KEY else 'ElevenLabs API key not set',
+        'cache': TTSCache.get_stats(),
+        'upstream': HTTPPool.get_stats().get('elevenlabs')
     })
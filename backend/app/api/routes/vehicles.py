@@ -1,4 +1,7 @@
 from flask import Blueprint, request, jsonify
+from ..export import export_response
+from ..imports import import_response
+from ..query import list_response
 from ...services.vehicle import VehicleService
 
 vehicles_bp = Blueprint('vehicles', __name__)
@@ -8,17 +11,23 @@ vehicles_bp = Blueprint('vehicles', __name__)
 def get_vehicles():
     search = request.args.get('search')
     fuel_type = request.args.get('fuel_type')
-    in_stock = request.args.get('in_stock')
 
     if search:
-        vehicles = VehicleService.search(search)
-    elif fuel_type:
-        vehicles = VehicleService.get_by_fuel_type(fuel_type)
-    elif in_stock and in_stock.lower() == 'true':
-        vehicles = VehicleService.get_in_stock()
-    else:
-        vehicles = VehicleService.get_all()
-    return jsonify(vehicles)
+        return jsonify(VehicleService.search(search))
+    if fuel_type:
+        # Matched case-insensitively, unlike the exact column filters
+        return jsonify(VehicleService.get_by_fuel_type(fuel_type))
+    return list_response('vehicles')
+
+
+@vehicles_bp.route('/export', methods=['GET'])
+def export_vehicles():
+    return export_response('vehicles')
+
+
+@vehicles_bp.route('/import', methods=['POST'])
+def import_vehicles():
+    return import_response('vehicles')
 
 
 @vehicles_bp.route('/<vehicle_id>', methods=['GET'])
@@ -43,6 +43,142 @@ class Config:
     SERVICE_HISTORY_FILE = os.path.join(DATA_DIR, 'service_history.xlsx')
     CALL_LOGS_FILE = os.path.join(DATA_DIR, 'call_logs.xlsx')
     TRANSCRIPTS_DIR = os.path.join(DATA_DIR, 'transcripts')
+    # Transcript files are fsynced at most this often while a call is going
+    # (and always when it ends); at most TRANSCRIPT_OPEN_FILES stay open
+    TRANSCRIPT_FSYNC_SECONDS = float(os.getenv('TRANSCRIPT_FSYNC_SECONDS', '2'))
+    TRANSCRIPT_OPEN_FILES = int(os.getenv('TRANSCRIPT_OPEN_FILES', '256'))
+
+    # Ended calls are finalized (call log, transcript, customer counts) in the
+    # background, FINALIZE_BATCH_SIZE at a time, at least every FINALIZE_INTERVAL
+    # seconds. A claimed batch that isn't finished within FINALIZE_LEASE_SECONDS
+    # is retried; past FINALIZE_MAX_PENDING queued calls, ending a call waits
+    # for a batch to be finalized. A call that fails FINALIZE_MAX_ATTEMPTS
+    # times is parked (kept aside with its error) instead of retried again
+    FINALIZE_BATCH_SIZE = int(os.getenv('FINALIZE_BATCH_SIZE', '50'))
+    FINALIZE_INTERVAL = float(os.getenv('FINALIZE_INTERVAL', '1'))
+    FINALIZE_LEASE_SECONDS = float(os.getenv('FINALIZE_LEASE_SECONDS', '60'))
+    FINALIZE_MAX_PENDING = int(os.getenv('FINALIZE_MAX_PENDING', '500'))
+    FINALIZE_MAX_ATTEMPTS = int(os.getenv('FINALIZE_MAX_ATTEMPTS', '5'))
+
+    # 'sqlite' keeps the tables in SQLITE_FILE; 'excel' reads/writes the .xlsx files directly
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+    SQLITE_FILE = os.getenv('SQLITE_FILE') or os.path.join(DATA_DIR, 'crm.db')
+
+    # Where active calls live: 'sqlite' shares them (in CALL_STATE_FILE) between
+    # worker processes and across restarts, 'memory' keeps them in this process.
+    # Calls idle for CALL_STATE_TTL_SECONDS are ended as 'abandoned'; the
+    # newest CALL_EVENTS_RETAIN call events are kept for /api/calls/events
+    CALL_STATE_BACKEND = os.getenv('CALL_STATE_BACKEND', 'sqlite').lower()
+    CALL_STATE_FILE = os.getenv('CALL_STATE_FILE') or os.path.join(DATA_DIR, 'call_state.db')
+    CALL_STATE_TTL_SECONDS = int(os.getenv('CALL_STATE_TTL_SECONDS', '3600'))
+    CALL_EVENTS_RETAIN = int(os.getenv('CALL_EVENTS_RETAIN', '10000'))
+
+    # Pin the node bits of generated record IDs (0-16777215), one distinct
+    # value per worker process; unset, each process picks 24 random bits.
+    # Leave it unset when workers are forked from a preloaded app, since
+    # they all inherit the same environment
+    ID_NODE = os.getenv('ID_NODE')
+
+    # Excel tables journal their mutations and fold them into the workbook
+    # after this many operations or seconds, whichever comes first
+    EXCEL_JOURNAL_COMPACT_OPS = int(os.getenv('EXCEL_JOURNAL_COMPACT_OPS', '200'))
+    EXCEL_JOURNAL_COMPACT_SECONDS = float(os.getenv('EXCEL_JOURNAL_COMPACT_SECONDS', '30'))
+
+    # Keep dashboard counters live from storage writes instead of re-aggregating
+    # each request; they are re-seeded after INCREMENTAL_STATS_TTL seconds so
+    # writes from other processes show up
+    INCREMENTAL_STATS = os.getenv('INCREMENTAL_STATS', 'true').lower() == 'true'
+    INCREMENTAL_STATS_TTL = float(os.getenv('INCREMENTAL_STATS_TTL', '300'))
+
+    # Dashboard deltas are pushed over Socket.IO at most this often; the view is
+    # rebuilt at least every DASHBOARD_REFRESH_SECONDS regardless of writes
+    DASHBOARD_PUSH_INTERVAL = float(os.getenv('DASHBOARD_PUSH_INTERVAL', '1'))
+    DASHBOARD_REFRESH_SECONDS = float(os.getenv('DASHBOARD_REFRESH_SECONDS', '60'))
+
+    # Page sizes for list endpoints called with ?limit= / ?after=; a list
+    # requested without them returns every row
+    LIST_DEFAULT_LIMIT = int(os.getenv('LIST_DEFAULT_LIMIT', '100'))
+    LIST_MAX_LIMIT = int(os.getenv('LIST_MAX_LIMIT', '1000'))
+
+    # Rows read and encoded per chunk by the streaming /export endpoints
+    EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '1000'))
+
+    # ElevenLabs endpoint (point at a local fake server for testing) and how
+    # many sentences of one call are synthesized at once by the pipelined
+    # speech path. The shared synthesis pool is sized for TTS_CONCURRENT_CALLS
+    # calls doing that at the same time; keep HTTP_POOL_MAX_CONNECTIONS at
+    # least TTS_MAX_PARALLEL * TTS_CONCURRENT_CALLS
+    ELEVENLABS_API_URL = os.getenv('ELEVENLABS_API_URL', 'https://api.elevenlabs.io/v1')
+    TTS_MAX_PARALLEL = int(os.getenv('TTS_MAX_PARALLEL', '3'))
+    TTS_CONCURRENT_CALLS = int(os.getenv('TTS_CONCURRENT_CALLS', '6'))
+
+    # Synthesized audio cache: an in-memory LRU in front of MP3 files on disk,
+    # each bounded in bytes
+    TTS_CACHE_ENABLED = os.getenv('TTS_CACHE_ENABLED', 'true').lower() == 'true'
+    TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR') or os.path.join(DATA_DIR, 'tts_cache')
+    TTS_CACHE_MEMORY_BYTES = int(os.getenv('TTS_CACHE_MEMORY_MB', '32')) * 1024 * 1024
+    TTS_CACHE_DISK_BYTES = int(os.getenv('TTS_CACHE_DISK_MB', '512')) * 1024 * 1024
+
+    # Shared keep-alive HTTP clients for ElevenLabs and OpenAI: pool limits,
+    # retries with jittered backoff, and the circuit breaker that fails fast
+    # after repeated upstream errors
+    HTTP2 = os.getenv('HTTP2', 'true').lower() == 'true'
+    HTTP_POOL_MAX_CONNECTIONS = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS', '20'))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.getenv('HTTP_POOL_MAX_KEEPALIVE', '10'))
+    HTTP_POOL_KEEPALIVE_SECONDS = float(os.getenv('HTTP_POOL_KEEPALIVE_SECONDS', '60'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '2'))
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.25'))
+    HTTP_RETRY_MAX_DELAY = float(os.getenv('HTTP_RETRY_MAX_DELAY', '4'))
+    HTTP_CIRCUIT_FAILURES = int(os.getenv('HTTP_CIRCUIT_FAILURES', '5'))
+    HTTP_CIRCUIT_COOLDOWN = float(os.getenv('HTTP_CIRCUIT_COOLDOWN', '30'))
+
+    # Socket.IO server mode. With eventlet, run.py monkey-patches sockets so
+    # LLM/TTS requests yield to other calls, and workbook parsing/writing runs
+    # on WORKER_POOL_SIZE OS threads (see data/workers.py)
+    ASYNC_MODE = os.getenv('ASYNC_MODE', 'eventlet')
+    WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', '4'))
+
+    # Message queue shared by several server processes (e.g. redis://host:6379/0,
+    # needs the redis package), so live call updates emitted in one process
+    # reach Socket.IO clients connected to any of them. Dashboard deltas skip
+    # the queue: each process pushes its own view to its own clients. Empty
+    # runs a single process without a queue
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+
+    # Read-only tool calls from one model response run this many at a time
+    TOOL_MAX_PARALLEL = int(os.getenv('TOOL_MAX_PARALLEL', '4'))
+
+    # Agent conversation memory: history beyond the token budget is folded
+    # into a short summary (the last CONVERSATION_KEEP_TURNS turns stay
+    # verbatim), list-valued tool results keep TOOL_RESULT_MAX_ITEMS entries,
+    # and idle conversations are dropped after CONVERSATION_TTL_SECONDS
+    CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '3000'))
+    CONVERSATION_KEEP_TURNS = int(os.getenv('CONVERSATION_KEEP_TURNS', '2'))
+    CONVERSATION_SUMMARY_CHARS = int(os.getenv('CONVERSATION_SUMMARY_CHARS', '1500'))
+    CONVERSATION_TTL_SECONDS = int(os.getenv('CONVERSATION_TTL_SECONDS', '1800'))
+    CONVERSATION_MAX_CALLS = int(os.getenv('CONVERSATION_MAX_CALLS', '1000'))
+    TOOL_RESULT_MAX_ITEMS = int(os.getenv('TOOL_RESULT_MAX_ITEMS', '8'))
+
+    # Features listed per model in the generated vehicle context of the
+    # system prompt (the full list is a get_vehicle_info call away)
+    PROMPT_MAX_FEATURES = int(os.getenv('PROMPT_MAX_FEATURES', '4'))
+
+    # Share of calls whose tool results that need no phrasing (slots,
+    # bookings, takeover) are answered from a template instead of a second
+    # completion; the other calls form the "llm" arm of the A/B comparison
+    TEMPLATED_REPLY_SHARE = float(os.getenv('TEMPLATED_REPLY_SHARE', '1.0'))
+
+    # Opt-in reuse of agent replies to near-identical FAQ questions (prices,
+    # offers, timings) across calls; entries are dropped on any vehicle edit
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.85'))
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '500'))
+
+    # Weight of the latest turn in a call's rolling sentiment score (the
+    # sentiment_score saved with the call log)
+    SENTIMENT_SMOOTHING = float(os.getenv('SENTIMENT_SMOOTHING', '0.5'))
 
     DEALERSHIP_NAME = "Satis Motor"
     DEALERSHIP_ADDRESS = "MG Road, Pune"
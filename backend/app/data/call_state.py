@@ -0,0 +1,522 @@
+# State of in-flight calls, shared by every worker process
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from ..config import Config
+from .workers import begin_immediate, sqlite_timeout, thread_local
+
+
+def _without_transcript(call):
+    return {key: value for key, value in call.items() if key != 'transcript'}
+
+
+class CallStateStore:
+    """Where CallManager keeps active calls (a dict per call, transcript and
+    context included).
+
+    update() and append_message() are the only ways to change a stored
+    call: they apply a function to the call atomically, so two workers
+    appending to the same transcript never lose a message. Calls handed out
+    are copies; changing them doesn't change the store. Every change can
+    also append an event
+    ({seq, call_id, type, data, at}) to a feed that other workers or
+    clients read with events_since(). Calls not updated for TTL seconds
+    are reported by expired() so CallManager can close them as abandoned.
+
+    Ended calls move, in the same step, to a finalization queue that
+    CallFinalizer drains (claim_finished / ack_finished); with the SQLite
+    store that queue survives restarts.
+    """
+
+    name = None
+
+    def add(self, call, event='started'):
+        raise NotImplementedError
+
+    def get(self, call_id):
+        """A copy of the call, transcript included, or None"""
+        raise NotImplementedError
+
+    def list(self):
+        """Copies of the active calls, transcripts included"""
+        raise NotImplementedError
+
+    def count(self):
+        return len(self.list())
+
+    def update(self, call_id, fn, event=None):
+        """Apply fn(call) atomically; returns (a copy of the call, fn's result),
+        or (None, None) if there is no such call. With event, appends
+        {type: event, data: result} unless fn returned None (nothing changed).
+
+        fn must leave the transcript alone (the SQLite store doesn't load it
+        for an update), and the call returned doesn't include it; messages
+        are added with append_message()."""
+        raise NotImplementedError
+
+    def append_message(self, call_id, fn, event='message'):
+        """Atomically append the message fn(call) returns to the call's
+        transcript (fn, as for update, must not rely on it); returns
+        (the message's position in the transcript, the message), or
+        (None, None) if there is no such call. With event, appends
+        {type: event, data: {**message, 'i': position}}"""
+        raise NotImplementedError
+
+    def remove(self, call_id, event='ended'):
+        """Atomically take a call out of the store; returns it, or None if
+        it was already gone (e.g. ended by another worker)"""
+        raise NotImplementedError
+
+    def finish(self, call_id, fn, event='ended'):
+        """Atomically take a call out of the active calls, apply fn(call) and
+        queue it for finalization; returns it, or None if it was already gone
+        (e.g. ended by another worker)"""
+        raise NotImplementedError
+
+    def claim_finished(self, limit, lease_seconds):
+        """Up to limit queued calls nobody else holds, held for lease_seconds;
+        unacknowledged calls become claimable again when the lease runs out.
+        Each call has finalize_attempts (times claimed) and finalize_done
+        (steps recorded by mark_finished)"""
+        raise NotImplementedError
+
+    def mark_finished(self, call_ids, step):
+        """Record that step of finalization is done for these queued calls,
+        so a retry skips it"""
+        raise NotImplementedError
+
+    def ack_finished(self, call_ids):
+        """Drop finalized calls from the queue"""
+        raise NotImplementedError
+
+    def park_finished(self, call_id, error):
+        """Move a call that keeps failing finalization out of the queue"""
+        raise NotImplementedError
+
+    def count_finished(self):
+        raise NotImplementedError
+
+    def parked(self, limit=20):
+        """Parked calls, newest first: {call_id, error, attempts, parked_at}"""
+        raise NotImplementedError
+
+    def count_parked(self):
+        raise NotImplementedError
+
+    def expired(self, ttl):
+        """Ids of calls not updated for ttl seconds"""
+        raise NotImplementedError
+
+    def version(self):
+        """A value that changes whenever a call is added, changed or ended, by any worker"""
+        raise NotImplementedError
+
+    def events_since(self, seq=0, limit=100):
+        raise NotImplementedError
+
+    def get_stats(self):
+        return {'backend': self.name, 'active_calls': self.count(), 'finalize_queue': self.count_finished(),
+                'parked': self.count_parked()}
+
+
+class MemoryCallStore(CallStateStore):
+    """Calls in this process only; lost on restart. For a single worker"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._calls = OrderedDict()
+        self._updated = {}
+        self._events = deque(maxlen=Config.CALL_EVENTS_RETAIN)
+        self._finished = OrderedDict()  # call_id -> {call, claimed_until, attempts, done}
+        self._parked = OrderedDict()
+        self._seq = 0
+        self._lock = threading.RLock()
+
+    def _event(self, call_id, event_type, data):
+        self._seq += 1
+        self._events.append({'seq': self._seq, 'call_id': call_id, 'type': event_type,
+                             'data': data, 'at': time.time()})
+
+    def add(self, call, event='started'):
+        with self._lock:
+            self._calls[call['call_id']] = copy.deepcopy(call)
+            self._updated[call['call_id']] = time.time()
+            if event:
+                self._event(call['call_id'], event, None)
+
+    def get(self, call_id):
+        with self._lock:
+            call = self._calls.get(call_id)
+            return copy.deepcopy(call) if call is not None else None
+
+    def list(self):
+        with self._lock:
+            return copy.deepcopy(list(self._calls.values()))
+
+    def count(self):
+        return len(self._calls)
+
+    def update(self, call_id, fn, event=None):
+        with self._lock:
+            call = self._calls.get(call_id)
+            if call is None:
+                return None, None
+            result = fn(call)
+            self._updated[call_id] = time.time()
+            if event and result is not None:
+                self._event(call_id, event, result)
+            return copy.deepcopy(_without_transcript(call)), result
+
+    def append_message(self, call_id, fn, event='message'):
+        with self._lock:
+            call = self._calls.get(call_id)
+            if call is None:
+                return None, None
+            message = fn(call)
+            call['transcript'].append(message)
+            index = len(call['transcript']) - 1
+            self._updated[call_id] = time.time()
+            if event:
+                self._event(call_id, event, {**message, 'i': index})
+            return index, copy.deepcopy(message)
+
+    def remove(self, call_id, event='ended'):
+        with self._lock:
+            call = self._calls.pop(call_id, None)
+            self._updated.pop(call_id, None)
+            if call is not None and event:
+                self._event(call_id, event, None)
+            return call
+
+    def finish(self, call_id, fn, event='ended'):
+        with self._lock:
+            call = self.remove(call_id, event)
+            if call is not None:
+                fn(call)
+                self._finished[call_id] = {'call': call, 'claimed_until': 0.0, 'attempts': 0, 'done': []}
+                call = copy.deepcopy(call)
+            return call
+
+    def claim_finished(self, limit, lease_seconds):
+        now = time.time()
+        with self._lock:
+            claimed = []
+            for entry in self._finished.values():
+                if entry['claimed_until'] <= now:
+                    entry['claimed_until'] = now + lease_seconds
+                    entry['attempts'] += 1
+                    claimed.append({**entry['call'], 'finalize_attempts': entry['attempts'],
+                                    'finalize_done': list(entry['done'])})
+                    if len(claimed) >= limit:
+                        break
+            return claimed
+
+    def mark_finished(self, call_ids, step):
+        with self._lock:
+            for call_id in call_ids:
+                entry = self._finished.get(call_id)
+                if entry and step not in entry['done']:
+                    entry['done'].append(step)
+
+    def ack_finished(self, call_ids):
+        with self._lock:
+            for call_id in call_ids:
+                self._finished.pop(call_id, None)
+
+    def park_finished(self, call_id, error):
+        with self._lock:
+            entry = self._finished.pop(call_id, None)
+            if entry:
+                self._parked[call_id] = {'call_id': call_id, 'error': error, 'attempts': entry['attempts'],
+                                         'parked_at': time.time()}
+
+    def count_finished(self):
+        return len(self._finished)
+
+    def parked(self, limit=20):
+        with self._lock:
+            return list(reversed(self._parked.values()))[:limit]
+
+    def count_parked(self):
+        return len(self._parked)
+
+    def version(self):
+        return self._seq
+
+    def expired(self, ttl):
+        cutoff = time.time() - ttl
+        with self._lock:
+            return [call_id for call_id, updated in self._updated.items() if updated < cutoff]
+
+    def events_since(self, seq=0, limit=100):
+        with self._lock:
+            return [event for event in self._events if event['seq'] > seq][:limit]
+
+
+class SQLiteCallStore(CallStateStore):
+    """Calls in a SQLite database (WAL mode) shared by every worker on the
+    host, so calls survive restarts and any worker can serve any call.
+
+    Each call is one JSON row without its transcript, and each transcript
+    message a row of call_messages, so adding a message doesn't rewrite the
+    call and other changes don't rewrite the transcript. update() and
+    append_message() run read-modify-write inside a BEGIN IMMEDIATE
+    transaction, which serializes writers to the same file across processes.
+    Calls in the finalization queue are kept without their transcript. Events are rows of an append-only table with an
+    autoincrement seq, trimmed to the newest CALL_EVENTS_RETAIN.
+
+    Waiting for another process's write lock (up to LOCK_WAIT_SECONDS)
+    doesn't block the eventlet hub; see workers.begin_immediate.
+    """
+
+    name = 'sqlite'
+    LOCK_WAIT_SECONDS = 30
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = thread_local()
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=sqlite_timeout(self.LOCK_WAIT_SECONDS),
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS active_calls '
+                         '(call_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS active_calls_updated ON active_calls (updated_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS call_messages '
+                         '(call_id TEXT NOT NULL, i INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (call_id, i))')
+            conn.execute('CREATE TABLE IF NOT EXISTS call_events (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'call_id TEXT NOT NULL, type TEXT NOT NULL, data TEXT, at REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS finished_calls (call_id TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                         'queued_at REAL NOT NULL, claimed_until REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0)')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(finished_calls)')}
+            if 'done' not in columns:
+                conn.execute("ALTER TABLE finished_calls ADD COLUMN done TEXT NOT NULL DEFAULT ''")
+            conn.execute('CREATE TABLE IF NOT EXISTS parked_calls (call_id TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                         'error TEXT, attempts INTEGER NOT NULL, parked_at REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connect()
+        begin_immediate(conn, self.LOCK_WAIT_SECONDS)
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _event(conn, call_id, event_type, data):
+        conn.execute('INSERT INTO call_events (call_id, type, data, at) VALUES (?, ?, ?, ?)',
+                     (call_id, event_type, json.dumps(data, default=str) if data is not None else None, time.time()))
+
+    @staticmethod
+    def _with_transcript(conn, call_id, call):
+        """call with its transcript messages attached (calls stored before
+        messages had their own table keep theirs inline, ahead of these)"""
+        rows = conn.execute('SELECT data FROM call_messages WHERE call_id = ? ORDER BY i', (call_id,)).fetchall()
+        call['transcript'] = call.get('transcript', []) + [json.loads(row[0]) for row in rows]
+        return call
+
+    def add(self, call, event='started'):
+        def work(conn):
+            conn.execute('INSERT OR REPLACE INTO active_calls (call_id, data, updated_at) VALUES (?, ?, ?)',
+                         (call['call_id'], json.dumps(_without_transcript(call), default=str), time.time()))
+            conn.execute('DELETE FROM call_messages WHERE call_id = ?', (call['call_id'],))
+            conn.executemany('INSERT INTO call_messages (call_id, i, data) VALUES (?, ?, ?)',
+                             [(call['call_id'], i, json.dumps(message, default=str))
+                              for i, message in enumerate(call.get('transcript') or [])])
+            if event:
+                self._event(conn, call['call_id'], event, None)
+        self._transaction(work)
+
+    def get(self, call_id):
+        conn = self._connect()
+        row = conn.execute('SELECT data FROM active_calls WHERE call_id = ?', (call_id,)).fetchone()
+        return self._with_transcript(conn, call_id, json.loads(row[0])) if row else None
+
+    def list(self):
+        conn = self._connect()
+        rows = conn.execute('SELECT call_id, data FROM active_calls ORDER BY rowid').fetchall()
+        messages = {}
+        for call_id, data in conn.execute('SELECT call_id, data FROM call_messages ORDER BY call_id, i'):
+            messages.setdefault(call_id, []).append(json.loads(data))
+        calls = []
+        for call_id, data in rows:
+            call = json.loads(data)
+            call['transcript'] = call.get('transcript', []) + messages.get(call_id, [])
+            calls.append(call)
+        return calls
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM active_calls').fetchone()[0]
+
+    def update(self, call_id, fn, event=None):
+        def work(conn):
+            row = conn.execute('SELECT data FROM active_calls WHERE call_id = ?', (call_id,)).fetchone()
+            if row is None:
+                return None, None
+            call = json.loads(row[0])
+            result = fn(call)
+            conn.execute('UPDATE active_calls SET data = ?, updated_at = ? WHERE call_id = ?',
+                         (json.dumps(call, default=str), time.time(), call_id))
+            if event and result is not None:
+                self._event(conn, call_id, event, result)
+            return _without_transcript(call), result
+        return self._transaction(work)
+
+    def append_message(self, call_id, fn, event='message'):
+        def work(conn):
+            row = conn.execute('SELECT data FROM active_calls WHERE call_id = ?', (call_id,)).fetchone()
+            if row is None:
+                return None, None
+            call = json.loads(row[0])
+            stored = conn.execute('SELECT COUNT(*) FROM call_messages WHERE call_id = ?', (call_id,)).fetchone()[0]
+            index = len(call.pop('transcript', ())) + stored
+            message = fn(call)
+            conn.execute('INSERT INTO call_messages (call_id, i, data) VALUES (?, ?, ?)',
+                         (call_id, index, json.dumps(message, default=str)))
+            conn.execute('UPDATE active_calls SET updated_at = ? WHERE call_id = ?', (time.time(), call_id))
+            if event:
+                self._event(conn, call_id, event, {**message, 'i': index})
+            return index, message
+        return self._transaction(work)
+
+    def remove(self, call_id, event='ended'):
+        def work(conn):
+            row = conn.execute('SELECT data FROM active_calls WHERE call_id = ?', (call_id,)).fetchone()
+            if row is None:
+                return None
+            call = self._with_transcript(conn, call_id, json.loads(row[0]))
+            conn.execute('DELETE FROM active_calls WHERE call_id = ?', (call_id,))
+            conn.execute('DELETE FROM call_messages WHERE call_id = ?', (call_id,))
+            if event:
+                self._event(conn, call_id, event, None)
+            return call
+        return self._transaction(work)
+
+    def finish(self, call_id, fn, event='ended'):
+        def work(conn):
+            row = conn.execute('SELECT data FROM active_calls WHERE call_id = ?', (call_id,)).fetchone()
+            if row is None:
+                return None
+            call = self._with_transcript(conn, call_id, json.loads(row[0]))
+            fn(call)
+            conn.execute('DELETE FROM active_calls WHERE call_id = ?', (call_id,))
+            conn.execute('DELETE FROM call_messages WHERE call_id = ?', (call_id,))
+            conn.execute('INSERT OR REPLACE INTO finished_calls (call_id, data, queued_at) VALUES (?, ?, ?)',
+                         (call_id, json.dumps(_without_transcript(call), default=str), time.time()))
+            if event:
+                self._event(conn, call_id, event, None)
+            return call
+        return self._transaction(work)
+
+    def claim_finished(self, limit, lease_seconds):
+        def work(conn):
+            now = time.time()
+            rows = conn.execute(
+                'SELECT call_id, data, attempts, done FROM finished_calls '
+                'WHERE claimed_until <= ? ORDER BY queued_at LIMIT ?',
+                (now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE finished_calls SET claimed_until = ?, attempts = attempts + 1 WHERE call_id = ?',
+                [(now + lease_seconds, call_id) for call_id, _, _, _ in rows]
+            )
+            return [
+                {**json.loads(data), 'finalize_attempts': attempts + 1, 'finalize_done': done.split()}
+                for _, data, attempts, done in rows
+            ]
+        return self._transaction(work)
+
+    def mark_finished(self, call_ids, step):
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE finished_calls SET done = done || ? || ' ' WHERE call_id = ? AND ' ' || done NOT LIKE ?",
+            [(step, call_id, f'% {step} %') for call_id in call_ids]
+        ))
+
+    def ack_finished(self, call_ids):
+        self._transaction(lambda conn: conn.executemany('DELETE FROM finished_calls WHERE call_id = ?',
+                                                        [(call_id,) for call_id in call_ids]))
+
+    def park_finished(self, call_id, error):
+        def work(conn):
+            row = conn.execute('SELECT data, attempts FROM finished_calls WHERE call_id = ?', (call_id,)).fetchone()
+            if row is None:
+                return
+            conn.execute('INSERT OR REPLACE INTO parked_calls (call_id, data, error, attempts, parked_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (call_id, row[0], error, row[1], time.time()))
+            conn.execute('DELETE FROM finished_calls WHERE call_id = ?', (call_id,))
+        self._transaction(work)
+
+    def count_finished(self):
+        return self._connect().execute('SELECT COUNT(*) FROM finished_calls').fetchone()[0]
+
+    def parked(self, limit=20):
+        rows = self._connect().execute(
+            'SELECT call_id, error, attempts, parked_at FROM parked_calls ORDER BY parked_at DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [{'call_id': call_id, 'error': error, 'attempts': attempts, 'parked_at': parked_at}
+                for call_id, error, attempts, parked_at in rows]
+
+    def count_parked(self):
+        return self._connect().execute('SELECT COUNT(*) FROM parked_calls').fetchone()[0]
+
+    def expired(self, ttl):
+        rows = self._connect().execute(
+            'SELECT call_id FROM active_calls WHERE updated_at < ?', (time.time() - ttl,)
+        ).fetchall()
+        self._trim_events()
+        return [row[0] for row in rows]
+
+    def version(self):
+        return self._connect().execute('SELECT MAX(seq) FROM call_events').fetchone()[0] or 0
+
+    def _trim_events(self):
+        self._transaction(lambda conn: conn.execute(
+            'DELETE FROM call_events WHERE seq <= (SELECT MAX(seq) FROM call_events) - ?',
+            (Config.CALL_EVENTS_RETAIN,)
+        ))
+
+    def events_since(self, seq=0, limit=100):
+        rows = self._connect().execute(
+            'SELECT seq, call_id, type, data, at FROM call_events WHERE seq > ? ORDER BY seq LIMIT ?',
+            (seq, limit)
+        ).fetchall()
+        return [
+            {'seq': s, 'call_id': call_id, 'type': event_type,
+             'data': json.loads(data) if data is not None else None, 'at': at}
+            for s, call_id, event_type, data, at in rows
+        ]
+
+    def get_stats(self):
+        conn = self._connect()
+        last_seq = conn.execute('SELECT MAX(seq) FROM call_events').fetchone()[0]
+        return {'backend': self.name, 'active_calls': self.count(), 'finalize_queue': self.count_finished(),
+                'parked': self.count_parked(), 'last_event_seq': last_seq or 0}
+
+
+def create_call_store(name=None):
+    name = name or Config.CALL_STATE_BACKEND
+    if name == 'memory':
+        return MemoryCallStore()
+    if name == 'sqlite':
+        return SQLiteCallStore(Config.CALL_STATE_FILE)
+    raise ValueError(f"Unknown call state backend: {name}")
+
+
+call_store = create_call_store()
@@ -1,10 +1,39 @@
 import pandas as pd
 import os
-from datetime import datetime
+import tempfile
 from ..config import Config
+from .table_cache import TableCache
+from .journal import TableJournal, JournalCompactor
+from .table_index import SortedView, TableIndex
+from .ids import IdGenerator
+from .workers import WorkerPool
+
+
+def table_name(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
 
 
 class ExcelHandler:
+    """Reads and mutates the .xlsx tables.
+
+    Mutations are not written to the workbook directly: each one is appended
+    to the table's fsync'd journal (see TableJournal) and applied to the
+    cached DataFrame. JournalCompactor folds the journal back into the
+    workbook every EXCEL_JOURNAL_COMPACT_OPS operations or
+    EXCEL_JOURNAL_COMPACT_SECONDS seconds, recording the last folded journal
+    sequence number on a small JOURNAL_SHEET next to the data.
+    """
+
+    JOURNAL_SHEET = '_journal'
+
+    # abspath -> (frame, TableIndex) for the latest cached frame of each table
+    _indexes = {}
+    # (abspath, sort column, id column) -> (TableCache generation, SortedView)
+    _views = {}
+    # abspath -> how many times write_excel replaced the table, so a compaction
+    # can tell the table was replaced while its snapshot was being written
+    _replacements = {}
+
     @staticmethod
     def ensure_file_exists(filepath, columns):
         if not os.path.exists(filepath):
@@ -13,63 +42,349 @@ class ExcelHandler:
             df.to_excel(filepath, index=False)
         return filepath
 
+    @staticmethod
+    def _read_workbook(filepath):
+        """Parse a workbook; returns (data, last journal seq folded into it)"""
+        # openpyxl parsing is CPU-bound; keep it off the eventlet hub
+        sheets = WorkerPool.run(pd.read_excel, filepath, sheet_name=None)
+        checkpoint = 0
+        meta = sheets.pop(ExcelHandler.JOURNAL_SHEET, None)
+        if meta is not None and len(meta) > 0:
+            checkpoint = int(meta['seq'].iloc[0])
+        df = next(iter(sheets.values())) if sheets else pd.DataFrame()
+        return df, checkpoint
+
+    @staticmethod
+    def _write_workbook_tmp(filepath, df, checkpoint):
+        """Write df to a temp workbook beside filepath; returns the temp path"""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        root, ext = os.path.splitext(filepath)
+        # Unique per writer: a compaction writes its snapshot outside the
+        # table lock, so write_excel may be writing one at the same time
+        fd, tmp_path = tempfile.mkstemp(suffix=f".tmp{ext}", prefix=f"{os.path.basename(root)}.",
+                                        dir=os.path.dirname(filepath))
+        os.close(fd)
+
+        def write():
+            with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+                df.to_excel(writer, index=False)
+                pd.DataFrame({'seq': [checkpoint]}).to_excel(
+                    writer, sheet_name=ExcelHandler.JOURNAL_SHEET, index=False
+                )
+
+        WorkerPool.run(write)
+        return tmp_path
+
+    @staticmethod
+    def _write_workbook(filepath, df, checkpoint):
+        os.replace(ExcelHandler._write_workbook_tmp(filepath, df, checkpoint), filepath)
+
+    @staticmethod
+    def _load(filepath):
+        """Current table contents (workbook + journal). Call with the table lock held"""
+        df = TableCache.get(filepath)
+        if df is None:
+            base, checkpoint = ExcelHandler._read_workbook(filepath)
+            df = TableJournal.replay(filepath, base, checkpoint)
+            TableCache.put(filepath, df)
+        return df
+
+    @staticmethod
+    def _index_for(filepath, df):
+        """The TableIndex for df, building it if df was (re)loaded since last use"""
+        key = os.path.abspath(filepath)
+        entry = ExcelHandler._indexes.get(key)
+        if entry is not None and entry[0] is df:
+            return entry[1]
+        columns = list(df.columns[:1]) + TABLE_INDEXES.get(table_name(filepath), [])
+        index = TableIndex(df, columns)
+        ExcelHandler._indexes[key] = (df, index)
+        return index
+
+    @staticmethod
+    def _view_for(filepath, df, sort, id_column):
+        """The SortedView of df by sort, rebuilt once the table has changed since it was made"""
+        key = (os.path.abspath(filepath), sort, id_column)
+        generation = TableCache.generation(filepath)
+        entry = ExcelHandler._views.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        view = SortedView(df, sort, id_column)
+        ExcelHandler._views[key] = (generation, view)
+        return view
+
+    @staticmethod
+    def _lookup(filepath, df, column, value):
+        """Row labels where column == value, via the table's index when there is one"""
+        labels = ExcelHandler._index_for(filepath, df).lookup(column, value)
+        if labels is None:
+            labels = list(df.index[df[column] == value])
+        return labels
+
     @staticmethod
     def read_excel(filepath, columns=None):
         if not os.path.exists(filepath):
-            if columns:
-                ExcelHandler.ensure_file_exists(filepath, columns)
-            return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
-        df = pd.read_excel(filepath)
-        return df
+            if not columns:
+                return pd.DataFrame()
+            ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            # Callers are free to mutate what they get back, so never hand out
+            # the cached frame itself
+            return ExcelHandler._load(filepath).copy()
 
     @staticmethod
     def write_excel(filepath, df):
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        df.to_excel(filepath, index=False)
+        """Replace the whole table, superseding any journaled mutations"""
+        with TableJournal.lock(filepath):
+            ExcelHandler._write_workbook(filepath, df, TableJournal.last_seq(filepath))
+            TableJournal.truncate(filepath)
+            key = os.path.abspath(filepath)
+            ExcelHandler._replacements[key] = ExcelHandler._replacements.get(key, 0) + 1
+            ExcelHandler._indexes.pop(key, None)
+            TableCache.put(filepath, df.copy())
+
+    @staticmethod
+    def _mutate(filepath, columns, entry):
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            index = ExcelHandler._index_for(filepath, df)
+            entry = TableJournal.append(filepath, entry)
+            df = TableJournal.apply(df, entry, index)
+            ExcelHandler._indexes[os.path.abspath(filepath)] = (df, index)
+            TableCache.put(filepath, df)
+        JournalCompactor.ensure_started(ExcelHandler.compact, Config.EXCEL_JOURNAL_COMPACT_SECONDS)
+        if TableJournal.pending(filepath) >= Config.EXCEL_JOURNAL_COMPACT_OPS:
+            JournalCompactor.wake()
+
+    @staticmethod
+    def compact(filepath):
+        """Fold a table's journal into its workbook; returns entries folded"""
+        key = os.path.abspath(filepath)
+        with TableJournal.lock(filepath):
+            replacements = ExcelHandler._replacements.get(key, 0)
+            df = ExcelHandler._load(filepath)
+            ExcelHandler._index_for(filepath, df)
+            checkpoint = TableJournal.last_seq(filepath)
+            folded = TableJournal.pending(filepath)
+            if folded == 0:
+                # Only entries a crash left behind after they were already
+                # written to the workbook
+                TableJournal.truncate(filepath, checkpoint)
+                return 0
+            df = df.copy()
+
+        # The slow workbook write happens outside the lock so mutations keep
+        # flowing into the journal meanwhile
+        tmp_path = ExcelHandler._write_workbook_tmp(filepath, df, checkpoint)
+
+        with TableJournal.lock(filepath):
+            latest = ExcelHandler._indexes.get(key)
+            if latest is None or ExcelHandler._replacements.get(key, 0) != replacements:
+                # write_excel replaced the whole table in the meantime (even if
+                # later mutations have registered a new index since)
+                os.remove(tmp_path)
+                return 0
+            os.replace(tmp_path, filepath)
+            # Every mutation re-registers its result, so this is the frame
+            # with everything journaled since the snapshot; re-cache it under
+            # the new workbook's signature instead of re-parsing
+            current = latest[0]
+            TableJournal.truncate(filepath, checkpoint)
+            TableCache.put(filepath, current)
+            TableJournal.compactions += 1
+        return folded
+
+    @staticmethod
+    def recover_journals():
+        """Fold journals left behind by a previous process into their workbooks"""
+        for filepath in TableJournal.journaled_tables(Config.DATA_DIR):
+            if not os.path.exists(filepath):
+                continue
+            folded = ExcelHandler.compact(filepath)
+            if folded:
+                print(f"[Journal] Recovered {folded} entries into {os.path.basename(filepath)}")
 
     @staticmethod
     def append_row(filepath, row_data, columns):
-        df = ExcelHandler.read_excel(filepath, columns)
-        new_row = pd.DataFrame([row_data])
-        df = pd.concat([df, new_row], ignore_index=True)
-        ExcelHandler.write_excel(filepath, df)
+        ExcelHandler._mutate(filepath, columns, {'op': 'append', 'row': row_data})
         return row_data
 
     @staticmethod
-    def update_row(filepath, id_column, id_value, update_data, columns):
-        df = ExcelHandler.read_excel(filepath, columns)
-        mask = df[id_column] == id_value
-        if mask.any():
-            for key, value in update_data.items():
-                df.loc[mask, key] = value
+    def append_rows(filepath, rows, columns):
+        """Append a batch with a single workbook rewrite instead of one journal entry per row"""
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            added = pd.DataFrame(rows)
+            df = pd.concat([df, added], ignore_index=True) if len(df) else added.reindex(
+                columns=list(dict.fromkeys(list(df.columns) + list(added.columns)))
+            )
             ExcelHandler.write_excel(filepath, df)
-            return True
-        return False
+        return len(rows)
+
+    @staticmethod
+    def update_row(filepath, id_column, id_value, update_data, columns):
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            if not ExcelHandler._lookup(filepath, df, id_column, id_value):
+                return False
+            ExcelHandler._mutate(filepath, columns, {
+                'op': 'update', 'id_column': id_column, 'id_value': id_value, 'data': update_data
+            })
+        return True
 
     @staticmethod
     def delete_row(filepath, id_column, id_value, columns):
-        df = ExcelHandler.read_excel(filepath, columns)
-        df = df[df[id_column] != id_value]
-        ExcelHandler.write_excel(filepath, df)
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            if not ExcelHandler._lookup(filepath, df, id_column, id_value):
+                return
+            ExcelHandler._mutate(filepath, columns, {
+                'op': 'delete', 'id_column': id_column, 'id_value': id_value
+            })
 
     @staticmethod
     def get_by_id(filepath, id_column, id_value, columns):
-        df = ExcelHandler.read_excel(filepath, columns)
-        result = df[df[id_column] == id_value]
-        if len(result) > 0:
-            return result.iloc[0].to_dict()
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            labels = ExcelHandler._lookup(filepath, df, id_column, id_value)
+            if labels:
+                return df.loc[labels[0]].to_dict()
         return None
 
+    @staticmethod
+    def find_rows(filepath, column, value, columns):
+        """All rows where column == value, in table order"""
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            labels = ExcelHandler._lookup(filepath, df, column, value)
+            return df.loc[labels].to_dict('records')
+
+    @staticmethod
+    def group_counts(filepath, columns, keys, sum_columns=()):
+        """One groupby pass over the cached table (see StorageBackend.group_counts)"""
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            if len(df) == 0:
+                return []
+            missing = pd.Series(float('nan'), index=df.index, dtype=object)
+            frame = {}
+            for i, (column, prefix_len) in enumerate(keys):
+                values = df[column] if column in df.columns else missing
+                if prefix_len:
+                    values = values.where(values.isna(), values.astype(str).str.slice(0, prefix_len))
+                frame[f'k{i}'] = values
+            for i, column in enumerate(sum_columns):
+                frame[f's{i}'] = pd.to_numeric(df[column], errors='coerce') if column in df.columns else missing
+            frame['_n'] = 1
+            grouped = pd.DataFrame(frame, index=df.index)
+
+        aggregations = {'n': ('_n', 'size')}
+        for i in range(len(sum_columns)):
+            aggregations[f'sum{i}'] = (f's{i}', 'sum')
+            aggregations[f'count{i}'] = (f's{i}', 'count')
+        key_columns = [f'k{i}' for i in range(len(keys))]
+        if not key_columns:
+            # Group everything together so there is a single result row
+            key_columns = ['_all']
+            grouped['_all'] = 0
+        result = grouped.groupby(key_columns, dropna=False).agg(**aggregations)
+        groups = []
+        for key, row in result.iterrows():
+            key = key if isinstance(key, tuple) else (key,)
+            groups.append((
+                tuple(None if pd.isna(k) else k for k in key[:len(keys)]), int(row['n']),
+                [float(row[f'sum{i}']) for i in range(len(sum_columns))],
+                [int(row[f'count{i}']) for i in range(len(sum_columns))]
+            ))
+        return groups
+
+    @staticmethod
+    def _filter(filepath, df, filters):
+        """Rows of df matching every column -> accepted values filter"""
+        if not filters:
+            return df
+        # Narrow by indexed filters first so the rest only touches matches
+        index = ExcelHandler._index_for(filepath, df)
+        labels = None
+        scanned = {}
+        for column, values in filters.items():
+            if column not in df.columns:
+                return df.iloc[0:0]
+            if column not in index.columns:
+                scanned[column] = values
+                continue
+            matched = set()
+            for value in values:
+                matched.update(index.lookup(column, value))
+            labels = matched if labels is None else labels & matched
+        page = df if labels is None else df.loc[sorted(labels)]
+        for column, values in scanned.items():
+            page = page[page[column].isin(values)]
+        return page
+
+    @staticmethod
+    def query_rows(filepath, columns, filters=None, sort=None, descending=False,
+                   after=None, limit=None, fields=None):
+        """One page of the cached table (see StorageBackend.query_rows)"""
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            df = ExcelHandler._load(filepath)
+            id_column = columns[0] if columns else df.columns[0]
+
+            if sort is not None or after is not None:
+                sort = sort or id_column
+                labels = ExcelHandler._filter(filepath, df, filters).index if filters else None
+                view = ExcelHandler._view_for(filepath, df, sort, id_column)
+                page = view.page(labels, after, descending, limit)
+            else:
+                page = ExcelHandler._filter(filepath, df, filters)
+                if limit is not None:
+                    page = page.head(limit)
+            if fields:
+                wanted = set(fields) | {sort, id_column}
+                page = page[[c for c in page.columns if c in wanted]]
+            return page.to_dict('records')
+
+    @staticmethod
+    def iter_rows(filepath, columns, filters=None, chunk_size=1000):
+        """Chunks of the table as it was when iteration started (see StorageBackend.iter_rows)"""
+        ExcelHandler.ensure_file_exists(filepath, columns)
+        with TableJournal.lock(filepath):
+            # Appends and deletes build a new frame, so holding on to this one
+            # gives a stable view without copying the whole table
+            df = ExcelHandler._filter(filepath, ExcelHandler._load(filepath), filters)
+        for start in range(0, len(df), chunk_size):
+            with TableJournal.lock(filepath):
+                chunk = df.iloc[start:start + chunk_size].to_dict('records')
+            yield chunk
+
     @staticmethod
     def generate_id(prefix):
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        return f"{prefix}-{timestamp}"
+        return IdGenerator.generate(prefix)
+
+
+# Secondary indexes per table (the first schema column, the id, is always
+# indexed). Used for equality lookups by both storage backends.
+TABLE_INDEXES = {
+    'customers': ['phone'],
+    'leads': ['phone', 'stage'],
+    'appointments': ['customer_id', 'date'],
+    'complaints': ['customer_id', 'status'],
+    'call_logs': ['customer_id', 'phone'],
+}
 
 
 CUSTOMER_COLUMNS = [
     'customer_id', 'name', 'phone', 'email', 'address',
     'preferred_language', 'vehicle_owned', 'vehicle_reg_no',
-    'purchase_date', 'total_calls', 'last_call_date',
+    'purchase_date', 'total_calls', 'last_call_date', 'last_call_id',
     'customer_type', 'notes', 'created_at'
 ]
 
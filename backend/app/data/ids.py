@@ -0,0 +1,61 @@
+# Record ID generation
+import itertools
+import os
+import time
+from ..config import Config
+
+
+class IdGenerator:
+    """Time-sortable, collision-free record IDs: PREFIX-<ms><node><seq>.
+
+    - ms:   11 hex digits of milliseconds since the Unix epoch
+    - node: 6 hex digits identifying the process (Config.ID_NODE, or 24
+            random bits from os.urandom) so workers never collide
+    - seq:  6 hex digits from a per-process counter that starts at a random
+            offset
+
+    IDs are fixed width, so they sort by creation time as plain strings. The
+    counter is an itertools.count, whose next() is atomic under the GIL, so
+    generation needs no lock. A process forked from one that already made
+    IDs (e.g. workers of a preloading server) picks a new node and counter
+    offset instead of inheriting its parent's.
+    """
+
+    _counter = None
+    _node = None
+    # (millisecond, its hex rendering) for the most recent millisecond seen
+    _last_ms = (-1, '')
+
+    @classmethod
+    def _seed(cls):
+        if Config.ID_NODE:
+            cls._node = int(Config.ID_NODE) & 0xFFFFFF
+        else:
+            cls._node = int.from_bytes(os.urandom(3), 'big')
+        cls._counter = itertools.count(int.from_bytes(os.urandom(3), 'big'))
+        cls._last_ms = (-1, '')
+
+    @classmethod
+    def _reseed_after_fork(cls):
+        if cls._node is not None:
+            cls._seed()
+
+    @classmethod
+    def node(cls):
+        if cls._node is None:
+            cls._seed()
+        return cls._node
+
+    @classmethod
+    def generate(cls, prefix):
+        ms = time.time_ns() // 1_000_000
+        last_ms, ms_hex = cls._last_ms
+        if ms != last_ms:
+            ms_hex = f"{ms:011X}{cls.node():06X}"
+            cls._last_ms = (ms, ms_hex)
+        seq = next(cls._counter) & 0xFFFFFF
+        return f"{prefix}-{ms_hex}{seq:06X}"
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=IdGenerator._reseed_after_fork)
@@ -0,0 +1,236 @@
+# Write-ahead journal for Excel tables
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class TableJournal:
+    """Append-only, fsync'd JSONL journal of row mutations per workbook.
+
+    Every entry carries a per-table sequence number. When the journal is
+    folded into the workbook, the highest folded sequence number is stored
+    alongside the data (see ExcelHandler.JOURNAL_SHEET), so replaying after a
+    crash mid-compaction never applies an entry twice.
+    """
+
+    _state = {}
+    _state_lock = threading.Lock()
+    compactions = 0
+
+    @staticmethod
+    def path_for(filepath):
+        return f"{filepath}.journal.jsonl"
+
+    @classmethod
+    def _table(cls, filepath):
+        key = os.path.abspath(filepath)
+        with cls._state_lock:
+            state = cls._state.get(key)
+            if state is None:
+                state = {'lock': threading.RLock(), 'seq': 0, 'pending': 0, 'loaded': False}
+                cls._state[key] = state
+        if not state['loaded']:
+            with state['lock']:
+                if not state['loaded']:
+                    entries = cls._read_entries(filepath)
+                    state['seq'] = max((e['seq'] for e in entries), default=0)
+                    state['pending'] = len(entries)
+                    state['loaded'] = True
+        return state
+
+    @classmethod
+    def lock(cls, filepath):
+        """Per-table lock that serializes mutations, replay and compaction"""
+        return cls._table(filepath)['lock']
+
+    @classmethod
+    def _read_entries(cls, filepath, after_seq=0):
+        path = cls.path_for(filepath)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; it was never acknowledged
+                    break
+                if entry['seq'] > after_seq:
+                    entries.append(entry)
+        return entries
+
+    @classmethod
+    def append(cls, filepath, entry):
+        """Durably record one mutation; returns the entry with its sequence number"""
+        state = cls._table(filepath)
+        with state['lock']:
+            entry = dict(entry, seq=state['seq'] + 1, ts=time.time())
+            line = json.dumps(entry, default=_json_default, ensure_ascii=False)
+            with open(cls.path_for(filepath), 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            state['seq'] = entry['seq']
+            state['pending'] += 1
+        return entry
+
+    @staticmethod
+    def apply(df, entry, index=None):
+        """Apply one entry to df, keeping row labels stable and `index` in step"""
+        op = entry['op']
+        if op == 'append':
+            label = df.index.max() + 1 if len(df) else 0
+            df = pd.concat([df, pd.DataFrame([entry['row']], index=[label])])
+            if index is not None:
+                index.add(label, entry['row'])
+            return df
+
+        labels = None
+        if index is not None:
+            labels = index.lookup(entry['id_column'], entry['id_value'])
+        if labels is None:
+            labels = list(df.index[df[entry['id_column']] == entry['id_value']])
+        if not labels:
+            return df
+
+        if op == 'update':
+            reindex = index is not None and any(key in index.columns for key in entry['data'])
+            old_rows = {label: df.loc[label].to_dict() for label in labels} if reindex else {}
+            for key, value in entry['data'].items():
+                df.loc[labels, key] = value
+            for label, old_row in old_rows.items():
+                index.remove(label, old_row)
+                index.add(label, df.loc[label].to_dict())
+            return df
+        if op == 'delete':
+            if index is not None:
+                for label in labels:
+                    index.remove(label, df.loc[label].to_dict())
+            return df.drop(index=labels)
+        raise ValueError(f"Unknown journal op: {op}")
+
+    @classmethod
+    def replay(cls, filepath, df, checkpoint=0):
+        """Apply every journal entry newer than checkpoint on top of df"""
+        state = cls._table(filepath)
+        with state['lock']:
+            entries = cls._read_entries(filepath, after_seq=checkpoint)
+            for entry in entries:
+                df = cls.apply(df, entry)
+            state['seq'] = max(state['seq'], checkpoint, entries[-1]['seq'] if entries else 0)
+            state['pending'] = len(entries)
+        return df
+
+    @classmethod
+    def last_seq(cls, filepath):
+        return cls._table(filepath)['seq']
+
+    @classmethod
+    def pending(cls, filepath):
+        return cls._table(filepath)['pending']
+
+    @classmethod
+    def truncate(cls, filepath, upto_seq=None):
+        """Drop entries already folded into the workbook (all of them if upto_seq is None)"""
+        state = cls._table(filepath)
+        path = cls.path_for(filepath)
+        with state['lock']:
+            remaining = [] if upto_seq is None else cls._read_entries(filepath, after_seq=upto_seq)
+            if not remaining:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for entry in remaining:
+                        f.write(json.dumps(entry, default=_json_default, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            state['pending'] = len(remaining)
+
+    @classmethod
+    def journaled_tables(cls, data_dir):
+        """Workbook paths that still have a journal on disk"""
+        suffix = '.journal.jsonl'
+        if not os.path.isdir(data_dir):
+            return []
+        return [
+            os.path.join(data_dir, name[:-len(suffix)])
+            for name in os.listdir(data_dir) if name.endswith(suffix)
+        ]
+
+    @classmethod
+    def get_stats(cls):
+        with cls._state_lock:
+            pending = {
+                os.path.basename(key): state['pending']
+                for key, state in cls._state.items() if state['pending']
+            }
+        return {
+            'pending_entries': pending,
+            'compactions': cls.compactions,
+            'compactor_running': JournalCompactor.is_running()
+        }
+
+
+class JournalCompactor:
+    """Background thread that folds journals into their workbooks.
+
+    Wakes every `interval` seconds, or early when a table signals that it has
+    reached the op threshold, and compacts every table with pending entries.
+    """
+
+    _thread = None
+    _wake = threading.Event()
+    _start_lock = threading.Lock()
+
+    @classmethod
+    def ensure_started(cls, compact_fn, interval):
+        if cls._thread is not None:
+            return
+        with cls._start_lock:
+            if cls._thread is not None:
+                return
+            cls._thread = threading.Thread(
+                target=cls._run, args=(compact_fn, interval),
+                name='journal-compactor', daemon=True
+            )
+            cls._thread.start()
+
+    @classmethod
+    def wake(cls):
+        cls._wake.set()
+
+    @classmethod
+    def is_running(cls):
+        return cls._thread is not None and cls._thread.is_alive()
+
+    @classmethod
+    def _run(cls, compact_fn, interval):
+        while True:
+            cls._wake.wait(interval)
+            cls._wake.clear()
+            with TableJournal._state_lock:
+                tables = [key for key, state in TableJournal._state.items() if state['pending']]
+            for filepath in tables:
+                try:
+                    compact_fn(filepath)
+                except Exception as e:
+                    print(f"[Journal] Compaction of {os.path.basename(filepath)} failed: {e}")
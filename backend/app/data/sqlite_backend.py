@@ -0,0 +1,372 @@
+# SQLite storage backend
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from .excel_handler import ExcelHandler, TABLE_INDEXES
+from .storage import StorageBackend, table_name
+from .workers import begin_immediate, sqlite_timeout, thread_local
+
+
+def _to_sql_value(value):
+    """Coerce pandas/numpy values into something sqlite3 can bind"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SQLiteBackend(StorageBackend):
+    """Keeps every table in one SQLite database in WAL mode.
+
+    Single-row writes are O(log n) instead of a full workbook rewrite, and
+    readers never block the writer. The Excel workbooks remain the
+    import/export format: a table that doesn't exist yet is created from its
+    schema and loaded from its .xlsx file on first use (see also
+    migrate_excel.py for an explicit re-import or export).
+
+    Writes take the write lock up front (BEGIN IMMEDIATE) and wait up to
+    LOCK_WAIT_SECONDS for it without blocking the eventlet hub; see
+    workers.begin_immediate.
+    """
+
+    name = 'sqlite'
+    LOCK_WAIT_SECONDS = 30
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.db_path = db_path
+        self._local = thread_local()
+        self._schema_lock = threading.Lock()
+        self._columns = {}
+        # table -> writes this process committed, to tell them from other processes'
+        self._own_writes = {}
+        self._own_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=sqlite_timeout(self.LOCK_WAIT_SECONDS),
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS _table_versions '
+                             '(name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self, table=None):
+        """A write transaction: commits on success, rolls back on error, and
+        bumps table's version in _table_versions"""
+        conn = self._connect()
+        begin_immediate(conn, self.LOCK_WAIT_SECONDS)
+        with conn:
+            yield conn
+            if table is not None:
+                conn.execute('INSERT INTO _table_versions (name, version) VALUES (?, 1) '
+                             'ON CONFLICT(name) DO UPDATE SET version = version + 1', (table,))
+                with self._own_lock:
+                    self._own_writes[table] = self._own_writes.get(table, 0) + 1
+
+    def table_version(self, filepath):
+        """Writes to the table committed by other processes (see StorageBackend.table_version)"""
+        table = table_name(filepath)
+        row = self._connect().execute('SELECT version FROM _table_versions WHERE name = ?', (table,)).fetchone()
+        with self._own_lock:
+            return (row[0] if row else 0) - self._own_writes.get(table, 0)
+
+    def _table_columns(self, conn, table):
+        rows = conn.execute(f'PRAGMA table_info({_quote(table)})').fetchall()
+        return [row[1] for row in rows]
+
+    def _ensure_table(self, filepath, columns):
+        """Create the table (importing its workbook) if needed; return its columns"""
+        table = table_name(filepath)
+        known = self._columns.get(table)
+        if known is not None:
+            return table, known
+
+        with self._schema_lock:
+            conn = self._connect()
+            existing = self._table_columns(conn, table)
+            if existing:
+                # Columns added to the schema since the table was created
+                added = [c for c in columns or [] if c not in existing]
+                with self._write(table if added else None) as conn:
+                    for column in added:
+                        conn.execute(f'ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}')
+                    self._create_indexes(conn, table, existing + added)
+                existing = existing + added
+                self._columns[table] = existing
+                return table, existing
+
+            df = None
+            if os.path.exists(filepath):
+                df = ExcelHandler.read_excel(filepath)
+            table_columns = list(columns or [])
+            if df is not None:
+                table_columns += [c for c in df.columns if c not in table_columns]
+            if not table_columns:
+                raise ValueError(f"No schema for table {table}")
+
+            with self._write(table) as conn:
+                self._create_table(conn, table, table_columns)
+                if df is not None and len(df) > 0:
+                    self._insert_frame(conn, table, df)
+                    print(f"[Storage] Imported {len(df)} rows into {table} from {os.path.basename(filepath)}")
+            self._columns[table] = table_columns
+            return table, table_columns
+
+    def _create_table(self, conn, table, columns):
+        column_defs = ', '.join(_quote(c) for c in columns)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {_quote(table)} ({column_defs})')
+        self._create_indexes(conn, table, columns)
+
+    def _create_indexes(self, conn, table, columns):
+        # The id column gets a plain (non-unique) index too: the Excel tables
+        # never enforced uniqueness and legacy data can contain duplicates.
+        for column in [columns[0]] + TABLE_INDEXES.get(table, []):
+            if column not in columns:
+                continue
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{table}_{column}")} '
+                f'ON {_quote(table)} ({_quote(column)})'
+            )
+
+    def _insert_rows(self, conn, table, table_columns, rows):
+        placeholders = ', '.join('?' for _ in table_columns)
+        column_list = ', '.join(_quote(c) for c in table_columns)
+        conn.executemany(
+            f'INSERT INTO {_quote(table)} ({column_list}) VALUES ({placeholders})',
+            [[_to_sql_value(row.get(c)) for c in table_columns] for row in rows]
+        )
+
+    def _insert_frame(self, conn, table, df):
+        self._insert_rows(conn, table, list(df.columns), df.to_dict('records'))
+
+    def read_table(self, filepath, columns=None):
+        table, table_columns = self._ensure_table(filepath, columns)
+        column_list = ', '.join(_quote(c) for c in table_columns)
+        return pd.read_sql_query(
+            f'SELECT {column_list} FROM {_quote(table)} ORDER BY rowid', self._connect()
+        )
+
+    def _replace_table(self, filepath, df, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        with self._write(table) as conn:
+            conn.execute(f'DELETE FROM {_quote(table)}')
+            self._insert_rows(conn, table, table_columns, df.to_dict('records'))
+
+    def _append_row(self, filepath, row_data, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        with self._write(table) as conn:
+            self._insert_rows(conn, table, table_columns, [row_data])
+        return row_data
+
+    def _append_rows(self, filepath, rows, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        with self._write(table) as conn:
+            self._insert_rows(conn, table, table_columns, rows)
+
+    def _update_row(self, filepath, id_column, id_value, update_data, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        # Unknown keys are dropped rather than growing the schema on the fly
+        updates = {k: v for k, v in update_data.items() if k in table_columns}
+        conn = self._connect()
+        if not updates:
+            row = conn.execute(
+                f'SELECT 1 FROM {_quote(table)} WHERE {_quote(id_column)} = ? LIMIT 1',
+                (_to_sql_value(id_value),)
+            ).fetchone()
+            return row is not None
+        assignments = ', '.join(f'{_quote(k)} = ?' for k in updates)
+        with self._write(table) as conn:
+            cursor = conn.execute(
+                f'UPDATE {_quote(table)} SET {assignments} WHERE {_quote(id_column)} = ?',
+                [_to_sql_value(v) for v in updates.values()] + [_to_sql_value(id_value)]
+            )
+        return cursor.rowcount > 0
+
+    def _delete_row(self, filepath, id_column, id_value, columns):
+        table, _ = self._ensure_table(filepath, columns)
+        with self._write(table) as conn:
+            conn.execute(
+                f'DELETE FROM {_quote(table)} WHERE {_quote(id_column)} = ?',
+                (_to_sql_value(id_value),)
+            )
+
+    def get_by_id(self, filepath, id_column, id_value, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        column_list = ', '.join(_quote(c) for c in table_columns)
+        row = self._connect().execute(
+            f'SELECT {column_list} FROM {_quote(table)} '
+            f'WHERE {_quote(id_column)} = ? ORDER BY rowid LIMIT 1',
+            (_to_sql_value(id_value),)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(table_columns, row))
+
+    def find_rows(self, filepath, column, value, columns):
+        table, table_columns = self._ensure_table(filepath, columns)
+        if column not in table_columns:
+            return []
+        column_list = ', '.join(_quote(c) for c in table_columns)
+        cursor = self._connect().execute(
+            f'SELECT {column_list} FROM {_quote(table)} WHERE {_quote(column)} = ? ORDER BY rowid',
+            (_to_sql_value(value),)
+        )
+        return [dict(zip(table_columns, row)) for row in cursor.fetchall()]
+
+    def group_counts(self, filepath, columns, keys, sum_columns=()):
+        table, table_columns = self._ensure_table(filepath, columns)
+        key_exprs = []
+        for column, prefix_len in keys:
+            if column not in table_columns:
+                key_exprs.append('NULL')
+            elif prefix_len:
+                key_exprs.append(f'substr({_quote(column)}, 1, {int(prefix_len)})')
+            else:
+                key_exprs.append(_quote(column))
+        aggregates = ['COUNT(*)']
+        for column in sum_columns:
+            if column in table_columns:
+                aggregates += [f'TOTAL({_quote(column)})', f'COUNT({_quote(column)})']
+            else:
+                aggregates += ['0.0', '0']
+        sql = f'SELECT {", ".join(key_exprs + aggregates)} FROM {_quote(table)}'
+        if key_exprs:
+            sql += ' GROUP BY ' + ', '.join(str(i + 1) for i in range(len(key_exprs)))
+        groups = []
+        for row in self._connect().execute(sql).fetchall():
+            values = row[len(key_exprs):]
+            if values[0] == 0:
+                continue
+            groups.append((
+                tuple(row[:len(key_exprs)]), values[0],
+                [values[1 + 2 * i] for i in range(len(sum_columns))],
+                [values[2 + 2 * i] for i in range(len(sum_columns))]
+            ))
+        return groups
+
+    @staticmethod
+    def _after_clause(sort, id_column, after, descending):
+        """WHERE clause for rows after the keyset cursor, matching SQLite's NULL ordering"""
+        op = '<' if descending else '>'
+        s, i = _quote(sort), _quote(id_column)
+        after_value, after_id = (_to_sql_value(v) for v in after)
+        if sort == id_column:
+            return f'{i} {op} ?', [after_id]
+        # NULLs sort first ascending and last descending
+        if after_value is None:
+            clause = f'({s} IS NULL AND {i} {op} ?)'
+            return (clause if descending else f'({clause} OR {s} IS NOT NULL)'), [after_id]
+        clause = f'({s} {op} ? OR ({s} = ? AND {i} {op} ?))'
+        return (f'({clause} OR {s} IS NULL)' if descending else clause), [after_value, after_value, after_id]
+
+    def query_rows(self, filepath, columns, filters=None, sort=None, descending=False,
+                   after=None, limit=None, fields=None):
+        table, table_columns = self._ensure_table(filepath, columns)
+        id_column = table_columns[0]
+        where, params = [], []
+        for column, values in (filters or {}).items():
+            if column not in table_columns:
+                return []
+            where.append(f'{_quote(column)} IN ({", ".join("?" for _ in values)})')
+            params += [_to_sql_value(v) for v in values]
+
+        if sort is None and after is None:
+            order = 'rowid'
+        else:
+            sort = sort or id_column
+            if after is not None:
+                clause, clause_params = self._after_clause(sort, id_column, after, descending)
+                where.append(clause)
+                params += clause_params
+            direction = 'DESC' if descending else 'ASC'
+            keys = [sort] if sort == id_column else [sort, id_column]
+            order = ', '.join(f'{_quote(k)} {direction}' for k in keys)
+
+        selected = table_columns
+        if fields:
+            wanted = set(fields) | {sort, id_column}
+            selected = [c for c in table_columns if c in wanted]
+        sql = f'SELECT {", ".join(_quote(c) for c in selected)} FROM {_quote(table)}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {order}'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        cursor = self._connect().execute(sql, params)
+        return [dict(zip(selected, row)) for row in cursor.fetchall()]
+
+    def iter_rows(self, filepath, columns, filters=None, chunk_size=1000):
+        table, table_columns = self._ensure_table(filepath, columns)
+        where, params = [], []
+        for column, values in (filters or {}).items():
+            if column not in table_columns:
+                return
+            where.append(f'{_quote(column)} IN ({", ".join("?" for _ in values)})')
+            params += [_to_sql_value(v) for v in values]
+        column_list = ', '.join(_quote(c) for c in table_columns)
+        sql = f'SELECT rowid, {column_list} FROM {_quote(table)} WHERE rowid > ?'
+        if where:
+            sql += ' AND ' + ' AND '.join(where)
+        sql += f' ORDER BY rowid LIMIT {int(chunk_size)}'
+
+        # Each chunk is its own short query keyed on rowid, so no read
+        # transaction stays open while the client drains the response
+        last_rowid = 0
+        while True:
+            rows = self._connect().execute(sql, [last_rowid] + params).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [dict(zip(table_columns, row[1:])) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    def import_excel(self, filepath, columns):
+        """Reload a table from its workbook, replacing its current rows"""
+        table = table_name(filepath)
+        conn = self._connect()
+        with self._schema_lock:
+            with self._write(table) as conn:
+                conn.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+            self._columns.pop(table, None)
+        self._ensure_table(filepath, columns)
+        return conn.execute(f'SELECT COUNT(*) FROM {_quote(table)}').fetchone()[0]
+
+    def export_excel(self, filepath, columns):
+        """Write a table back out as a workbook; returns the number of rows"""
+        df = self.read_table(filepath, columns)
+        ExcelHandler.write_excel(filepath, df)
+        return len(df)
+
+    def get_stats(self):
+        conn = self._connect()
+        counts = {
+            table: conn.execute(f'SELECT COUNT(*) FROM {_quote(table)}').fetchone()[0]
+            for table in list(self._columns)
+        }
+        return {
+            'backend': self.name,
+            'database': os.path.basename(self.db_path),
+            'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+            'row_counts': counts
+        }
@@ -0,0 +1,229 @@
+# Storage backends
+import os
+import threading
+from ..config import Config
+from .journal import TableJournal
+from .excel_handler import (
+    ExcelHandler, table_name, CUSTOMER_COLUMNS, APPOINTMENT_COLUMNS, COMPLAINT_COLUMNS,
+    LEAD_COLUMNS, VEHICLE_COLUMNS, SERVICE_HISTORY_COLUMNS, CALL_LOG_COLUMNS
+)
+
+
+# Every table the CRM knows about, keyed by table name. Tables are addressed
+# by their Excel path throughout the services, so the path doubles as the
+# table identity for non-Excel backends and as the import/export location.
+TABLES = {
+    'customers': (Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS),
+    'appointments': (Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS),
+    'complaints': (Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS),
+    'leads': (Config.LEADS_FILE, LEAD_COLUMNS),
+    'vehicles': (Config.VEHICLES_FILE, VEHICLE_COLUMNS),
+    'service_history': (Config.SERVICE_HISTORY_FILE, SERVICE_HISTORY_COLUMNS),
+    'call_logs': (Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS),
+}
+
+
+class StorageBackend:
+    """Interface the services use to read and mutate CRM tables.
+
+    Method signatures mirror ExcelHandler so a table is always addressed by
+    its Excel path plus its *_COLUMNS schema; the first schema column is the
+    primary key. Backends implement the underscored mutation methods; the
+    public ones also notify change listeners (see subscribe()).
+    """
+
+    name = None
+
+    def __init__(self):
+        self._listeners = []
+        self._change_locks = {}
+        self._change_locks_lock = threading.Lock()
+
+    def change_lock(self, filepath):
+        """Lock held across each write to the table and its notification.
+
+        Holding it while reading gives a view of the table that no
+        notification of this process is still on its way for, e.g. to seed
+        state that listeners then keep current.
+        """
+        path = os.path.abspath(filepath)
+        with self._change_locks_lock:
+            lock = self._change_locks.get(path)
+            if lock is None:
+                lock = self._change_locks[path] = threading.RLock()
+            return lock
+
+    def subscribe(self, listener):
+        """Register listener(filepath, before_rows, after_rows) for every change.
+
+        before_rows/after_rows are lists of row dicts: an append has no
+        before rows, a delete no after rows. A whole-table replace is
+        signalled with before_rows=None.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, filepath, before, after):
+        for listener in self._listeners:
+            listener(filepath, before, after)
+
+    def table_version(self, filepath):
+        """A value that changes when another process writes the table.
+
+        Writes made by this process reach subscribe() listeners; compare
+        this to tell whether something derived from the table is still
+        current in a multi-worker setup. The Excel backend is only written
+        by one process, so its tables never change elsewhere.
+        """
+        return 0
+
+    def read_table(self, filepath, columns=None):
+        raise NotImplementedError
+
+    def replace_table(self, filepath, df, columns):
+        """Replace every row of a table with the contents of df"""
+        with self.change_lock(filepath):
+            self._replace_table(filepath, df, columns)
+            self._notify(filepath, None, None)
+
+    def append_row(self, filepath, row_data, columns):
+        with self.change_lock(filepath):
+            row = self._append_row(filepath, row_data, columns)
+            self._notify(filepath, [], [row_data])
+        return row
+
+    def append_rows(self, filepath, rows, columns):
+        """Append many rows as one batch (one transaction / one workbook write)"""
+        if not rows:
+            return 0
+        with self.change_lock(filepath):
+            self._append_rows(filepath, rows, columns)
+            self._notify(filepath, [], rows)
+        return len(rows)
+
+    def update_row(self, filepath, id_column, id_value, update_data, columns):
+        with self.change_lock(filepath):
+            before = self.find_rows(filepath, id_column, id_value, columns) if self._listeners else []
+            updated = self._update_row(filepath, id_column, id_value, update_data, columns)
+            if updated and self._listeners:
+                self._notify(filepath, before, [dict(row, **update_data) for row in before])
+        return updated
+
+    def delete_row(self, filepath, id_column, id_value, columns):
+        with self.change_lock(filepath):
+            before = self.find_rows(filepath, id_column, id_value, columns) if self._listeners else []
+            self._delete_row(filepath, id_column, id_value, columns)
+            if before:
+                self._notify(filepath, before, [])
+
+    def get_by_id(self, filepath, id_column, id_value, columns):
+        raise NotImplementedError
+
+    def find_rows(self, filepath, column, value, columns):
+        """Rows where column == value, as records in table order.
+
+        Served from an index for the id column and the columns declared in
+        TABLE_INDEXES; other columns fall back to a scan.
+        """
+        raise NotImplementedError
+
+    def group_counts(self, filepath, columns, keys, sum_columns=()):
+        """Row counts per distinct combination of keys, in one pass over the table.
+
+        keys is a list of (column, prefix_len) pairs; prefix_len groups by the
+        first N characters of the value (e.g. 10 for the day of an ISO
+        timestamp) and is None for the plain value. Returns a list of
+        (key_values, count, sums, non_null_counts), where sums and
+        non_null_counts line up with sum_columns.
+        """
+        raise NotImplementedError
+
+    def query_rows(self, filepath, columns, filters=None, sort=None, descending=False,
+                   after=None, limit=None, fields=None):
+        """One page of rows, for list endpoints.
+
+        filters maps column -> list of accepted values (equality, ANDed
+        across columns). Rows are ordered by (sort, id column), with missing
+        sort values first when ascending; with neither sort nor after the
+        table order is kept. after is the (sort_value, id_value) of the last
+        row already seen (keyset pagination). fields limits the returned
+        columns; the sort and id columns are always included.
+        """
+        raise NotImplementedError
+
+    def iter_rows(self, filepath, columns, filters=None, chunk_size=1000):
+        """Yield the table (optionally filtered as in query_rows) in table order,
+        as lists of at most chunk_size row dicts, without materializing it
+        """
+        raise NotImplementedError
+
+    def get_stats(self):
+        return {'backend': self.name}
+
+
+class ExcelBackend(StorageBackend):
+    """Keeps the .xlsx workbooks as the system of record (writes are journaled)"""
+
+    name = 'excel'
+
+    def __init__(self):
+        super().__init__()
+        ExcelHandler.recover_journals()
+
+    def read_table(self, filepath, columns=None):
+        return ExcelHandler.read_excel(filepath, columns)
+
+    def _replace_table(self, filepath, df, columns):
+        ExcelHandler.write_excel(filepath, df)
+
+    def _append_row(self, filepath, row_data, columns):
+        return ExcelHandler.append_row(filepath, row_data, columns)
+
+    def _append_rows(self, filepath, rows, columns):
+        ExcelHandler.append_rows(filepath, rows, columns)
+
+    def _update_row(self, filepath, id_column, id_value, update_data, columns):
+        return ExcelHandler.update_row(filepath, id_column, id_value, update_data, columns)
+
+    def _delete_row(self, filepath, id_column, id_value, columns):
+        ExcelHandler.delete_row(filepath, id_column, id_value, columns)
+
+    def get_by_id(self, filepath, id_column, id_value, columns):
+        return ExcelHandler.get_by_id(filepath, id_column, id_value, columns)
+
+    def find_rows(self, filepath, column, value, columns):
+        return ExcelHandler.find_rows(filepath, column, value, columns)
+
+    def group_counts(self, filepath, columns, keys, sum_columns=()):
+        return ExcelHandler.group_counts(filepath, columns, keys, sum_columns)
+
+    def query_rows(self, filepath, columns, filters=None, sort=None, descending=False,
+                   after=None, limit=None, fields=None):
+        return ExcelHandler.query_rows(
+            filepath, columns, filters, sort, descending, after, limit, fields
+        )
+
+    def iter_rows(self, filepath, columns, filters=None, chunk_size=1000):
+        return ExcelHandler.iter_rows(filepath, columns, filters, chunk_size)
+
+    def get_stats(self):
+        return {
+            'backend': self.name,
+            'journal': TableJournal.get_stats(),
+            'indexes': {
+                os.path.basename(key): index.get_stats()
+                for key, (_, index) in list(ExcelHandler._indexes.items())
+            }
+        }
+
+
+def create_backend(name=None):
+    name = name or Config.STORAGE_BACKEND
+    if name == 'excel':
+        return ExcelBackend()
+    if name == 'sqlite':
+        from .sqlite_backend import SQLiteBackend
+        return SQLiteBackend(Config.SQLITE_FILE)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+storage = create_backend()
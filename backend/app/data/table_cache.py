@@ -0,0 +1,92 @@
+# Process-wide cache of parsed tables
+import os
+import threading
+
+
+class TableCache:
+    """Holds parsed DataFrames keyed by file path.
+
+    An entry is only served while the file's mtime and size still match the
+    values recorded when it was cached, so edits made outside the process
+    (e.g. someone opening the workbook in Excel) are picked up on next read.
+    Every put or invalidation bumps the table's generation(), so structures
+    derived from a cached frame can tell when it has changed, including in
+    place.
+    """
+
+    _entries = {}
+    _generations = {}
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+    invalidations = 0
+
+    @staticmethod
+    def _key(filepath):
+        return os.path.abspath(filepath)
+
+    @staticmethod
+    def _signature(filepath):
+        stat = os.stat(filepath)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def get(cls, filepath):
+        key = cls._key(filepath)
+        try:
+            signature = cls._signature(key)
+        except FileNotFoundError:
+            signature = None
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None and signature is not None and entry[0] == signature:
+                cls.hits += 1
+                return entry[1]
+            if entry is not None:
+                del cls._entries[key]
+                cls._generations[key] = cls._generations.get(key, 0) + 1
+                cls.invalidations += 1
+            cls.misses += 1
+        return None
+
+    @classmethod
+    def put(cls, filepath, df):
+        key = cls._key(filepath)
+        try:
+            signature = cls._signature(key)
+        except FileNotFoundError:
+            return
+        with cls._lock:
+            cls._entries[key] = (signature, df)
+            cls._generations[key] = cls._generations.get(key, 0) + 1
+
+    @classmethod
+    def generation(cls, filepath):
+        return cls._generations.get(cls._key(filepath), 0)
+
+    @classmethod
+    def invalidate(cls, filepath=None):
+        """Drop one cached table, or every table when no path is given"""
+        with cls._lock:
+            if filepath is None:
+                cls.invalidations += len(cls._entries)
+                for key in cls._entries:
+                    cls._generations[key] = cls._generations.get(key, 0) + 1
+                cls._entries.clear()
+            elif cls._entries.pop(cls._key(filepath), None) is not None:
+                key = cls._key(filepath)
+                cls._generations[key] = cls._generations.get(key, 0) + 1
+                cls.invalidations += 1
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            lookups = cls.hits + cls.misses
+            return {
+                'tables': [os.path.basename(key) for key in cls._entries],
+                'hits': cls.hits,
+                'misses': cls.misses,
+                'invalidations': cls.invalidations,
+                'hit_ratio': round(cls.hits / lookups, 4) if lookups else 0.0
+            }
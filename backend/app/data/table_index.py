@@ -0,0 +1,113 @@
+# Hash indexes and sorted views over cached tables
+import numpy as np
+import pandas as pd
+
+
+class TableIndex:
+    """Secondary hash indexes for one cached DataFrame: column -> value -> row labels.
+
+    Built once when a table is loaded and then kept in step with every
+    append/update/delete, so equality lookups on indexed columns don't scan
+    the frame. Missing values (NaN) are never indexed, matching `df[col] ==
+    value`, which never matches them either.
+    """
+
+    def __init__(self, df, columns):
+        self.columns = [c for c in dict.fromkeys(columns) if c in df.columns]
+        self._maps = {}
+        for column in self.columns:
+            mapping = {}
+            for label, value in zip(df.index, df[column]):
+                if not pd.isna(value):
+                    mapping.setdefault(value, []).append(label)
+            self._maps[column] = mapping
+
+    def lookup(self, column, value):
+        """Row labels (in table order) where column == value, or None if not indexed"""
+        mapping = self._maps.get(column)
+        if mapping is None:
+            return None
+        try:
+            return sorted(mapping.get(value, ()))
+        except TypeError:
+            # Unhashable lookup value can't match any indexed cell
+            return []
+
+    def add(self, label, row):
+        for column, mapping in self._maps.items():
+            value = row.get(column)
+            if value is not None and not pd.isna(value):
+                mapping.setdefault(value, []).append(label)
+
+    def remove(self, label, row):
+        for column, mapping in self._maps.items():
+            value = row.get(column)
+            if value is None or pd.isna(value):
+                continue
+            labels = mapping.get(value)
+            if labels and label in labels:
+                labels.remove(label)
+                if not labels:
+                    del mapping[value]
+
+    def get_stats(self):
+        return {column: len(mapping) for column, mapping in self._maps.items()}
+
+
+class SortedView:
+    """A cached table ordered by (sort column, id column), for keyset pages.
+
+    Rows are held in ascending order with missing sort values first;
+    descending pages walk it backwards, which puts them last. The cursor of
+    a page is found with a binary search (searchsorted) over the
+    (value, id) keys, so a page costs O(log n + page size) once the view is
+    built. Built from one table generation (see TableCache.generation) and
+    rebuilt after the next write.
+    """
+
+    def __init__(self, df, sort, id_column):
+        keys = [sort] if sort == id_column else [sort, id_column]
+        self.frame = df.sort_values(keys, na_position='first', kind='mergesort')
+        values = self.frame[sort]
+        self.missing = int(values.isna().sum())
+        ids = self.frame[id_column].to_numpy(dtype=object)
+        self._missing_ids = ids[:self.missing]
+        present = values.to_numpy(dtype=object)[self.missing:]
+        if sort == id_column:
+            self._keys = present
+        else:
+            self._keys = pd.Series(list(zip(present, ids[self.missing:])), dtype=object).to_numpy()
+        self._single = sort == id_column
+
+    def _key(self, after_value, after_id):
+        # Boxed so numpy compares the tuple as one value instead of unpacking it
+        key = np.empty(1, dtype=object)
+        key[0] = after_id if self._single else (after_value, after_id)
+        return key
+
+    def _position(self, after, side, mask=None):
+        """Position in frame (or in frame[mask]) of the cursor `after`"""
+        after_value, after_id = after
+        missing_ids, keys = self._missing_ids, self._keys
+        if mask is not None:
+            missing_ids, keys = missing_ids[mask[:self.missing]], keys[mask[self.missing:]]
+        if after_value is None:
+            return int(np.searchsorted(missing_ids, after_id, side=side))
+        return len(missing_ids) + int(np.searchsorted(keys, self._key(after_value, after_id), side=side)[0])
+
+    def page(self, labels=None, after=None, descending=False, limit=None):
+        """Rows after the cursor in (sort, id) order, limited to labels if given.
+
+        Raises TypeError if the cursor can't be compared with the column's
+        values; list endpoints answer it with a 400.
+        """
+        frame, mask = self.frame, None
+        if labels is not None:
+            mask = self.frame.index.isin(labels)
+            frame = frame[mask]
+        if descending:
+            end = len(frame) if after is None else self._position(after, 'left', mask)
+            start = 0 if limit is None else max(end - limit, 0)
+            return frame.iloc[start:end].iloc[::-1]
+        start = 0 if after is None else self._position(after, 'right', mask)
+        return frame.iloc[start:] if limit is None else frame.iloc[start:start + limit]
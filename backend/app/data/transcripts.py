@@ -0,0 +1,234 @@
+# Append-only call transcripts, written as the call goes
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from ..config import Config
+from .workers import WorkerPool
+
+HEADER_FIELDS = ('call_id', 'phone', 'customer_name', 'type', 'direction', 'start_time')
+
+
+class TranscriptLog:
+    """One JSON Lines file per call (<call_id>.jsonl): a `header` record when
+    the call starts, a `message` record ({i, timestamp, role, content}) per
+    add_message, and an `end` record (duration, outcome) when it ends. `i` is
+    the message's position in the transcript; lines of two concurrent turns
+    may land in either order, so readers order messages by it.
+
+    Each record is flushed to the OS as it is written, so a crashed server
+    process loses nothing; fsync runs at most every TRANSCRIPT_FSYNC_SECONDS
+    per file and when the call ends, on WorkerPool and under that file's own
+    lock, so a slow disk only holds up the call being synced. Files are opened in append mode, so
+    several worker processes can write to one call. The newest
+    TRANSCRIPT_OPEN_FILES files stay open.
+
+    read() streams the file for a range of messages, and a negative start
+    reads from the end backwards, so the tail of a long call is cheap.
+    render_text() gives the old plain-text transcript, and older calls that
+    only have a .txt file are still served from it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = OrderedDict()  # call_id -> {file, synced, lock}
+        self._lock = threading.Lock()  # guards _files and _stats only
+        self._stats = {'records': 0, 'bytes': 0, 'fsyncs': 0, 'opened': 0}
+
+    def path(self, call_id, ext='jsonl'):
+        return os.path.join(self.directory, f"{os.path.basename(str(call_id))}.{ext}")
+
+    def _entry(self, call_id):
+        """The open file of a call, plus files pushed out of the open set
+        that the caller has to close"""
+        evicted = []
+        with self._lock:
+            entry = self._files.get(call_id)
+            if entry is None:
+                os.makedirs(self.directory, exist_ok=True)
+                entry = self._files[call_id] = {'file': open(self.path(call_id), 'ab'),
+                                                'synced': time.monotonic(), 'lock': threading.Lock()}
+                self._stats['opened'] += 1
+                while len(self._files) > Config.TRANSCRIPT_OPEN_FILES:
+                    evicted.append(self._files.popitem(last=False)[1])
+            self._files.move_to_end(call_id)
+        return entry, evicted
+
+    def _write(self, call_id, record, sync=False):
+        line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        while True:
+            entry, evicted = self._entry(call_id)
+            for old in evicted:
+                self._close(old)
+            # Only this call's appends wait for its fsync; the fsync itself
+            # runs on WorkerPool, so the hub keeps serving other calls
+            with entry['lock']:
+                f = entry['file']
+                if f is None:
+                    # Closed (evicted) between _entry() and here: reopen
+                    continue
+                f.write(line)
+                f.flush()
+                now = time.monotonic()
+                synced = sync or now - entry['synced'] >= Config.TRANSCRIPT_FSYNC_SECONDS
+                if synced:
+                    WorkerPool.run(os.fsync, f.fileno())
+                    entry['synced'] = now
+            with self._lock:
+                self._stats['fsyncs'] += synced
+                self._stats['records'] += 1
+                self._stats['bytes'] += len(line)
+            return
+
+    def _close(self, entry):
+        with entry['lock']:
+            f, entry['file'] = entry['file'], None
+            if f is None:
+                return
+            f.flush()
+            WorkerPool.run(os.fsync, f.fileno())
+            f.close()
+        with self._lock:
+            self._stats['fsyncs'] += 1
+
+    def start(self, call):
+        record = {'record': 'header', **{field: call.get(field) for field in HEADER_FIELDS}}
+        self._write(call['call_id'], record)
+
+    def append(self, call_id, index, message):
+        self._write(call_id, {'record': 'message', 'i': index, **message})
+
+    def end(self, call):
+        self._write(call['call_id'], {
+            'record': 'end',
+            'end_time': call.get('end_time'),
+            'duration_seconds': call.get('duration_seconds'),
+            'outcome': call.get('outcome')
+        }, sync=True)
+        with self._lock:
+            entry = self._files.pop(call['call_id'], None)
+        if entry:
+            self._close(entry)
+
+    def exists(self, call_id):
+        return os.path.exists(self.path(call_id))
+
+    def _records(self, call_id):
+        with open(self.path(call_id), 'rb') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-write
+                        continue
+
+    def _records_reversed(self, call_id, block_size=65536):
+        with open(self.path(call_id), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            rest = b''
+            while position > 0:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + rest).split(b'\n')
+                rest = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            if rest.strip():
+                try:
+                    yield json.loads(rest)
+                except ValueError:
+                    pass
+
+    def read(self, call_id, start=0, limit=None):
+        """Messages of a call in transcript order, or None if it has no .jsonl transcript.
+
+        Concurrent turns can write their lines out of order, so messages are
+        picked and sorted by their index `i`, not their place in the file.
+        start counts from the beginning; a negative start counts from the
+        end (start=-20 gives the last 20 messages) and only reads that far back.
+        """
+        if not self.exists(call_id):
+            return None
+        found = {}
+        if start < 0:
+            wanted = None
+            for record in self._records_reversed(call_id):
+                if record.get('record') != 'message':
+                    continue
+                found[record['i']] = record
+                if wanted is None and len(found) == -start:
+                    # The newest index is among the last few lines; read on
+                    # until every index of the tail has turned up
+                    last = max(found)
+                    wanted = set(range(max(last + start + 1, 0), last + 1))
+                if wanted is not None and wanted <= found.keys():
+                    break
+            tail = sorted(i for i in found if wanted is None or i in wanted)
+            messages = [found[i] for i in tail]
+            return messages[:limit] if limit is not None else messages
+        wanted = set(range(start, start + limit)) if limit is not None else None
+        for record in self._records(call_id):
+            if record.get('record') != 'message' or record['i'] < start:
+                continue
+            if wanted is None or record['i'] in wanted:
+                found[record['i']] = record
+                if wanted is not None and wanted <= found.keys():
+                    break
+        return [found[i] for i in sorted(found)]
+
+    def render_text(self, call_id):
+        """The transcript in the plain-text layout of the old .txt files"""
+        if not self.exists(call_id):
+            legacy = self.path(call_id, 'txt')
+            if os.path.exists(legacy):
+                with open(legacy, 'r', encoding='utf-8') as f:
+                    return f.read()
+            return None
+        header, end, messages = {}, {}, {}
+        for record in self._records(call_id):
+            kind = record.get('record')
+            if kind == 'header':
+                header = record
+            elif kind == 'end':
+                end = record
+            elif kind == 'message':
+                messages[record['i']] = record
+        lines = []
+        for i in sorted(messages):
+            record = messages[i]
+            role_label = "AI" if record['role'] == 'assistant' else "Customer"
+            lines.append(f"[{record['timestamp']}] {role_label}: {record['content']}\n\n")
+        return (
+            f"Call ID: {header.get('call_id', call_id)}\n"
+            f"Phone: {header.get('phone', '')}\n"
+            f"Customer: {header.get('customer_name', '')}\n"
+            f"Type: {header.get('type', '')}\n"
+            f"Duration: {end.get('duration_seconds', 0)} seconds\n"
+            f"Outcome: {end.get('outcome', '')}\n"
+            + "-" * 50 + "\n\n"
+            + ''.join(lines)
+        )
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._files.values())
+            self._files.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def get_stats(self):
+        with self._lock:
+            return {'open_files': len(self._files), **self._stats}
+
+
+transcripts = TranscriptLog(Config.TRANSCRIPTS_DIR)
+atexit.register(transcripts.close_all)
@@ -0,0 +1,116 @@
+# Keeping blocking work off the eventlet hub
+import sqlite3
+import threading
+import time
+from ..config import Config
+
+try:
+    import eventlet
+    from eventlet import patcher, tpool
+except ImportError:
+    eventlet = patcher = tpool = None
+
+
+def cooperative():
+    """True when the process runs on monkey-patched (green) threads and sockets"""
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+
+def cooperative_sleep(seconds):
+    """Sleep without blocking the other greenlets on this thread"""
+    if cooperative():
+        eventlet.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+# Under eventlet a SQLite connection is shared by every greenlet of its OS
+# thread, so SQLite's own busy wait would stall the whole hub while another
+# process holds the write lock: connections get this short busy timeout
+# instead and begin_immediate() does the waiting with cooperative sleeps
+GREEN_BUSY_TIMEOUT = 0.05
+
+
+def sqlite_timeout(seconds):
+    """Busy timeout to open a SQLite connection with, for a wait of up to seconds"""
+    return GREEN_BUSY_TIMEOUT if cooperative() else seconds
+
+
+def begin_immediate(conn, wait_seconds):
+    """BEGIN IMMEDIATE on conn, waiting up to wait_seconds for the write lock"""
+    deadline = time.monotonic() + wait_seconds
+    delay = 0.005
+    while True:
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or not cooperative() or time.monotonic() >= deadline:
+                raise
+        cooperative_sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+def thread_local():
+    """A threading.local that is per OS thread even when threads are green.
+
+    Under monkey-patching threading.local is per greenlet, which would give
+    every request its own SQLite connection; greenlets never switch inside
+    a SQLite call, so they can safely share one per OS thread.
+    """
+    if cooperative():
+        return patcher.original('threading').local()
+    return threading.local()
+
+
+class WorkerPool:
+    """Runs blocking CPU/disk work (pandas/openpyxl parsing and writing) on a
+    bounded pool of real OS threads, so the eventlet hub keeps serving other
+    calls meanwhile.
+
+    Network I/O doesn't need it: with run.py's monkey-patching, httpx (and so
+    the OpenAI and ElevenLabs clients) already yield to the hub while
+    waiting. Without eventlet (e.g. ASYNC_MODE=threading or a CLI script)
+    run() simply calls the function. Jobs must not take green locks; pass
+    them plain data and do the locking around the call.
+    """
+
+    _configured = False
+    _lock = threading.Lock()
+    _stats = {'jobs': 0, 'in_flight': 0, 'peak_in_flight': 0, 'busy_seconds': 0.0, 'max_seconds': 0.0}
+
+    @classmethod
+    def run(cls, fn, *args, **kwargs):
+        if not cooperative():
+            return fn(*args, **kwargs)
+        if not cls._configured:
+            tpool.set_num_threads(Config.WORKER_POOL_SIZE)
+            cls._configured = True
+
+        with cls._lock:
+            cls._stats['in_flight'] += 1
+            cls._stats['peak_in_flight'] = max(cls._stats['peak_in_flight'], cls._stats['in_flight'])
+        start = time.perf_counter()
+        try:
+            # Jobs beyond WORKER_POOL_SIZE queue inside tpool; the calling
+            # greenlet sleeps until its result is ready
+            return tpool.execute(fn, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with cls._lock:
+                cls._stats['in_flight'] -= 1
+                cls._stats['jobs'] += 1
+                cls._stats['busy_seconds'] += elapsed
+                cls._stats['max_seconds'] = max(cls._stats['max_seconds'], elapsed)
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            stats = dict(cls._stats)
+        return {
+            'cooperative': cooperative(),
+            'size': Config.WORKER_POOL_SIZE,
+            **stats,
+            'busy_seconds': round(stats['busy_seconds'], 3),
+            'max_seconds': round(stats['max_seconds'], 3)
+        }
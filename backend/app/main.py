@@ -1,6 +1,6 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
 from .config import Config
 Config.debug_keys()
@@ -11,13 +11,20 @@ from .api.routes.complaints import complaints_bp
 from .api.routes.leads import leads_bp
 from .api.routes.vehicles import vehicles_bp
 from .api.routes.calls import calls_bp
-from .api.routes.demo import demo_bp
-from .api.routes.tts import tts_bp
+from .api.routes.demo import demo_bp, validate_turn, stream_turn
+from .api.routes.tts import tts_bp, resolve_api_key
+from .api.routes.system import system_bp
 from .services.call_manager import CallManager
+from .services.call_finalizer import CallFinalizer
+from .services.call_updates import CallUpdates, CALLS_ROOM, call_room, call_summary
+from .services.dashboard import DashboardView
+from .services.tts import TTSService
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+# With a message queue, emits from any worker process reach clients of every worker
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=Config.ASYNC_MODE,
+                    message_queue=Config.SOCKETIO_MESSAGE_QUEUE or None)
 
 app.register_blueprint(customers_bp, url_prefix='/api/customers')
 app.register_blueprint(appointments_bp, url_prefix='/api/appointments')
@@ -27,6 +34,7 @@ app.register_blueprint(vehicles_bp, url_prefix='/api/vehicles')
 app.register_blueprint(calls_bp, url_prefix='/api/calls')
 app.register_blueprint(demo_bp, url_prefix='/api/demo')
 app.register_blueprint(tts_bp, url_prefix='/api/tts')
+app.register_blueprint(system_bp, url_prefix='/api/system')
 
 
 @app.route('/')
@@ -40,28 +48,19 @@ def index():
 
 @app.route('/api/dashboard/stats')
 def get_dashboard_stats():
-    from .services.complaint import ComplaintService
-    from .services.lead import LeadService
-    from .services.appointment import AppointmentService
+    return jsonify(DashboardView.snapshot())
 
-    call_stats = CallManager.get_stats()
-    complaint_stats = ComplaintService.get_stats()
-    lead_stats = LeadService.get_stats()
-    today_appointments = AppointmentService.get_today()
 
-    return jsonify({
-        'calls': call_stats,
-        'complaints': complaint_stats,
-        'leads': lead_stats,
-        'today_appointments': len(today_appointments),
-        'active_calls': len(CallManager.get_active_calls())
-    })
+DashboardView.start(socketio)
+CallUpdates.start(socketio)
+CallFinalizer.start(socketio)
 
 
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
     emit('connected', {'status': 'connected'})
+    emit('dashboard_snapshot', DashboardView.snapshot())
 
 
 @socketio.on('disconnect')
@@ -71,27 +70,94 @@ def handle_disconnect():
 
 @socketio.on('subscribe_call')
 def handle_subscribe(data):
-    call_id = data.get('call_id')
+    """Join the call's room: a full call_update now, call_delta events after"""
+    call_id = (data or {}).get('call_id')
     call = CallManager.get_call(call_id)
     if call:
+        join_room(call_room(call_id))
         emit('call_update', call)
 
 
+@socketio.on('unsubscribe_call')
+def handle_unsubscribe(data):
+    leave_room(call_room((data or {}).get('call_id')))
+
+
+@socketio.on('subscribe_calls')
+def handle_subscribe_calls():
+    """Join the live calls list: an active_calls snapshot (summaries, no
+    transcripts) now, call_started / call_summary_delta / call_ended after"""
+    join_room(CALLS_ROOM)
+    emit('active_calls', [call_summary(call) for call in CallManager.get_active_calls()])
+
+
+@socketio.on('unsubscribe_calls')
+def handle_unsubscribe_calls():
+    leave_room(CALLS_ROOM)
+
+
 @socketio.on('get_active_calls')
 def handle_get_active_calls():
-    calls = CallManager.get_active_calls()
-    emit('active_calls', calls)
+    """The active_calls snapshot of subscribe_calls, without joining the room"""
+    emit('active_calls', [call_summary(call) for call in CallManager.get_active_calls()])
+
+
+@socketio.on('demo_message')
+def handle_demo_message(data):
+    """Streamed AI turn over Socket.IO: agent_token / agent_sentence /
+    agent_function events to the sender, then agent_done (or agent_error).
+
+    With `speak: true` each sentence is also synthesized while the rest of
+    the reply is still being generated, and sent in order as an agent_audio
+    binary frame ({index, text, audio}; audio is null if synthesis failed).
+    """
+    data = data or {}
+    call, error, _ = validate_turn(data.get('call_id'), data.get('message'))
+    if error:
+        emit('agent_error', error)
+        return
+
+    def events():
+        for kind, payload in stream_turn(call, data['message']):
+            emit(f'agent_{kind}', payload)
+            # Let the server flush each event before the next token arrives
+            socketio.sleep(0)
+            if kind == 'sentence':
+                yield payload['text']
+
+    if data.get('speak') and resolve_api_key():
+        for chunk in TTSService.stream_speech(events(), data.get('voice')):
+            emit('agent_audio', chunk)
+    else:
+        for _ in events():
+            pass
+
+
+@socketio.on('tts_stream')
+def handle_tts_stream(data):
+    """Pipelined TTS over Socket.IO: tts_chunk binary frames in order, then tts_done"""
+    data = data or {}
+    text = data.get('text', '')
+    if not text or not resolve_api_key():
+        emit('tts_error', {'error': 'No text provided' if not text else 'ElevenLabs API key not configured'})
+        return
+    count = 0
+    for chunk in TTSService.stream_speech(TTSService.split_sentences(text), data.get('voice')):
+        emit('tts_chunk', chunk)
+        count += 1
+    emit('tts_done', {'sentences': count})
 
 
 def broadcast_call_update(call_id):
+    """Resend a whole call to its watchers; routine changes go out as call_delta"""
     call = CallManager.get_call(call_id)
     if call:
-        socketio.emit('call_update', call)
+        socketio.emit('call_update', call, to=call_room(call_id))
 
 
 def broadcast_active_calls():
     calls = CallManager.get_active_calls()
-    socketio.emit('active_calls', calls)
+    socketio.emit('active_calls', [call_summary(call) for call in calls], to=CALLS_ROOM)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,177 @@
+# Shared table aggregation
+import math
+import os
+import threading
+import time
+from flask import g, has_app_context
+from ..config import Config
+from ..data.storage import storage
+
+
+class TableStats:
+    """Counters for a table, computed in one grouped pass.
+
+    summarize() takes the counters wanted as {name: column} or
+    {name: (column, prefix_len)} and returns
+    {'total': n, 'counts': {name: {value: n}}, 'sums': {column: (sum, non_null)}}.
+
+    Within a request every summary is computed once and shared, so the
+    dashboard touches each table once. With Config.INCREMENTAL_STATS the
+    counters are seeded by one pass and then kept current from storage
+    change events, making a summary O(distinct values). Seeding holds the
+    table's storage.change_lock, so no write falls between the seed pass and
+    the counters taking over. They are re-seeded when
+    storage.table_version() shows another process wrote the table, and
+    after INCREMENTAL_STATS_TTL seconds in any case.
+    """
+
+    _live = {}
+    _lock = threading.Lock()
+    seeds = 0
+
+    @staticmethod
+    def _normalize(keys):
+        spec = []
+        for name, key in keys.items():
+            column, prefix_len = key if isinstance(key, tuple) else (key, None)
+            spec.append((name, column, prefix_len))
+        return tuple(spec)
+
+    @staticmethod
+    def _compute(filepath, columns, spec, sum_columns):
+        groups = storage.group_counts(
+            filepath, columns, [(column, prefix_len) for _, column, prefix_len in spec], sum_columns
+        )
+        summary = {
+            'total': 0,
+            'counts': {name: {} for name, _, _ in spec},
+            'sums': {column: [0.0, 0] for column in sum_columns}
+        }
+        for key_values, count, sums, non_null in groups:
+            summary['total'] += count
+            for (name, _, _), value in zip(spec, key_values):
+                if value is not None:
+                    counts = summary['counts'][name]
+                    counts[value] = counts.get(value, 0) + count
+            for column, total, n in zip(sum_columns, sums, non_null):
+                summary['sums'][column][0] += total
+                summary['sums'][column][1] += n
+        return summary
+
+    @staticmethod
+    def _snapshot(summary):
+        return {
+            'total': summary['total'],
+            'counts': {name: dict(counts) for name, counts in summary['counts'].items()},
+            'sums': {column: tuple(value) for column, value in summary['sums'].items()}
+        }
+
+    @classmethod
+    def summarize(cls, filepath, columns, keys, sum_columns=()):
+        spec = cls._normalize(keys)
+        sum_columns = tuple(sum_columns)
+        memo_key = (os.path.abspath(filepath), spec, sum_columns)
+
+        memo = None
+        if has_app_context():
+            memo = g.setdefault('_table_stats', {})
+            if memo_key in memo:
+                return memo[memo_key]
+
+        if Config.INCREMENTAL_STATS:
+            table_version = storage.table_version(filepath)
+            with cls._lock:
+                live = cls._live.get(memo_key)
+                if (live is not None and live['table_version'] == table_version
+                        and time.time() - live['seeded_at'] < Config.INCREMENTAL_STATS_TTL):
+                    result = cls._snapshot(live['summary'])
+                else:
+                    live = None
+            if live is None:
+                # No write to the table can land between the seed pass and
+                # registering it, or its change event would be lost
+                with storage.change_lock(filepath):
+                    table_version = storage.table_version(filepath)
+                    summary = cls._compute(filepath, columns, spec, sum_columns)
+                    with cls._lock:
+                        cls._live[memo_key] = {'summary': summary, 'seeded_at': time.time(),
+                                               'table_version': table_version}
+                        cls.seeds += 1
+                        result = cls._snapshot(summary)
+        else:
+            result = cls._snapshot(cls._compute(filepath, columns, spec, sum_columns))
+
+        if memo is not None:
+            memo[memo_key] = result
+        return result
+
+    @staticmethod
+    def _key_value(row, column, prefix_len):
+        value = row.get(column)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        return str(value)[:prefix_len] if prefix_len else value
+
+    @staticmethod
+    def _number(value):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(number) else number
+
+    @classmethod
+    def _apply(cls, summary, spec, sum_columns, row, sign):
+        summary['total'] += sign
+        for name, column, prefix_len in spec:
+            value = cls._key_value(row, column, prefix_len)
+            if value is None:
+                continue
+            counts = summary['counts'][name]
+            counts[value] = counts.get(value, 0) + sign
+            if counts[value] <= 0:
+                del counts[value]
+        for column in sum_columns:
+            number = cls._number(row.get(column))
+            if number is not None:
+                summary['sums'][column][0] += sign * number
+                summary['sums'][column][1] += sign
+
+    @classmethod
+    def on_change(cls, filepath, before, after):
+        """Storage listener that keeps live counters in step with writes"""
+        path = os.path.abspath(filepath)
+        if has_app_context():
+            # Summaries memoized earlier in this request are now out of date
+            g.pop('_table_stats', None)
+        if not Config.INCREMENTAL_STATS:
+            return
+        with cls._lock:
+            for memo_key in [k for k in cls._live if k[0] == path]:
+                if before is None:
+                    # Whole table replaced; re-seed on next use
+                    del cls._live[memo_key]
+                    continue
+                _, spec, sum_columns = memo_key
+                summary = cls._live[memo_key]['summary']
+                for row in before:
+                    cls._apply(summary, spec, sum_columns, row, -1)
+                for row in after:
+                    cls._apply(summary, spec, sum_columns, row, 1)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._live.clear()
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            return {
+                'incremental': Config.INCREMENTAL_STATS,
+                'live_summaries': len(cls._live),
+                'seeds': cls.seeds
+            }
+
+
+storage.subscribe(TableStats.on_change)
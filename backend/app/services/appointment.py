@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
-from ..data.excel_handler import ExcelHandler, APPOINTMENT_COLUMNS
+from ..data.excel_handler import APPOINTMENT_COLUMNS
+from ..data.ids import IdGenerator
+from ..data.storage import storage
 from ..config import Config
 
 
@@ -17,26 +19,22 @@ class AppointmentService:
 
     @staticmethod
     def get_all():
-        df = ExcelHandler.read_excel(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
+        df = storage.read_table(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_by_id(appointment_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.APPOINTMENTS_FILE, 'appointment_id', appointment_id, APPOINTMENT_COLUMNS
         )
 
     @staticmethod
     def get_by_date(date):
-        df = ExcelHandler.read_excel(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
-        result = df[df['date'] == date]
-        return result.to_dict('records')
+        return storage.find_rows(Config.APPOINTMENTS_FILE, 'date', date, APPOINTMENT_COLUMNS)
 
     @staticmethod
     def get_by_customer(customer_id):
-        df = ExcelHandler.read_excel(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
-        result = df[df['customer_id'] == customer_id]
-        return result.to_dict('records')
+        return storage.find_rows(Config.APPOINTMENTS_FILE, 'customer_id', customer_id, APPOINTMENT_COLUMNS)
 
     @staticmethod
     def get_available_slots(date, appointment_type='test_drive'):
@@ -47,7 +45,7 @@ class AppointmentService:
 
     @staticmethod
     def create(data):
-        appointment_id = ExcelHandler.generate_id('APT')
+        appointment_id = IdGenerator.generate('APT')
         appointment = {
             'appointment_id': appointment_id,
             'customer_id': data.get('customer_id', ''),
@@ -65,11 +63,11 @@ class AppointmentService:
             'notes': data.get('notes', ''),
             'created_at': datetime.now().isoformat()
         }
-        return ExcelHandler.append_row(Config.APPOINTMENTS_FILE, appointment, APPOINTMENT_COLUMNS)
+        return storage.append_row(Config.APPOINTMENTS_FILE, appointment, APPOINTMENT_COLUMNS)
 
     @staticmethod
     def update(appointment_id, data):
-        return ExcelHandler.update_row(
+        return storage.update_row(
             Config.APPOINTMENTS_FILE, 'appointment_id', appointment_id, data, APPOINTMENT_COLUMNS
         )
 
@@ -79,11 +77,11 @@ class AppointmentService:
 
     @staticmethod
     def delete(appointment_id):
-        ExcelHandler.delete_row(Config.APPOINTMENTS_FILE, 'appointment_id', appointment_id, APPOINTMENT_COLUMNS)
+        storage.delete_row(Config.APPOINTMENTS_FILE, 'appointment_id', appointment_id, APPOINTMENT_COLUMNS)
 
     @staticmethod
     def get_upcoming(days=7):
-        df = ExcelHandler.read_excel(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
+        df = storage.read_table(Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS)
         today = datetime.now().date()
         end_date = today + timedelta(days=days)
 
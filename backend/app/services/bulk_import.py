@@ -0,0 +1,203 @@
+# Bulk import of customers, leads and vehicles
+import csv
+import io
+import json
+import os
+import re
+import time
+import pandas as pd
+from ..config import Config
+from ..data.excel_handler import CUSTOMER_COLUMNS, LEAD_COLUMNS, VEHICLE_COLUMNS
+from ..data.storage import storage
+from .customer import CustomerService
+from .lead import LeadService
+from .vehicle import VehicleService
+
+
+def normalize_phone(phone):
+    """Phone numbers compare on their last 10 digits, so '+91 98765 43210' == '9876543210'"""
+    return re.sub(r'\D', '', str(phone))[-10:]
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+class BulkImporter:
+    """Validates a CSV/XLSX/NDJSON file against a table schema and appends it in one batch.
+
+    Rows are checked for required and typed fields, then deduplicated on
+    phone (model/variant/fuel type for vehicles) against both the existing
+    table and earlier rows in the same file. Valid rows are built with the
+    service's own defaults and written with a single storage.append_rows.
+    """
+
+    FORMATS = ('csv', 'xlsx', 'ndjson')
+    MAX_REPORTED_ERRORS = 1000
+
+    ENTITIES = {
+        'customers': {
+            'file': Config.CUSTOMERS_FILE, 'columns': CUSTOMER_COLUMNS, 'build': CustomerService.build,
+            'required': ['name', 'phone'], 'numeric': [], 'boolean': [], 'dedupe': ['phone']
+        },
+        'leads': {
+            'file': Config.LEADS_FILE, 'columns': LEAD_COLUMNS, 'build': LeadService.build,
+            'required': ['name', 'phone'], 'numeric': [], 'boolean': [], 'dedupe': ['phone']
+        },
+        'vehicles': {
+            'file': Config.VEHICLES_FILE, 'columns': VEHICLE_COLUMNS, 'build': VehicleService.build,
+            'required': ['model', 'variant'], 'numeric': ['price_ex_showroom', 'price_on_road'],
+            'boolean': ['in_stock'], 'dedupe': ['model', 'variant', 'fuel_type']
+        },
+    }
+
+    @staticmethod
+    def detect_format(filename):
+        ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+        return {'xls': 'xlsx', 'jsonl': 'ndjson', 'json': 'ndjson'}.get(ext, ext)
+
+    @staticmethod
+    def read_records(data, fmt):
+        """Yield (row_number, record) pairs; record is an Exception for unreadable rows"""
+        if fmt not in BulkImporter.FORMATS:
+            raise BulkImportError(f"Unsupported format '{fmt}'; use csv, xlsx or ndjson")
+        if fmt == 'xlsx':
+            try:
+                df = pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+            except Exception as e:
+                raise BulkImportError(f"Could not read workbook: {e}")
+            for number, record in enumerate(df.to_dict('records'), start=2):
+                yield number, record
+            return
+
+        try:
+            text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+        except UnicodeDecodeError:
+            raise BulkImportError('File is not valid UTF-8')
+        if fmt == 'csv':
+            for number, record in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+                yield number, record
+        else:
+            for number, line in enumerate(text.splitlines(), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, ValueError(f"Invalid JSON: {e.msg}")
+                    continue
+                yield number, record if isinstance(record, dict) else ValueError('Expected a JSON object')
+
+    @staticmethod
+    def _dedupe_key(record, columns):
+        key = []
+        for column in columns:
+            value = record.get(column)
+            value = '' if value is None or (isinstance(value, float) and pd.isna(value)) else value
+            key.append(normalize_phone(value) if column == 'phone' else str(value).strip().lower())
+        return tuple(key)
+
+    @staticmethod
+    def _clean(record, spec, ignored):
+        """Validated record with known columns only; raises ValueError on bad rows"""
+        cleaned = {}
+        for key, value in record.items():
+            key = str(key).strip()
+            if key not in spec['columns']:
+                ignored.add(key)
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '' or (isinstance(value, float) and pd.isna(value)):
+                continue
+            cleaned[key] = value
+
+        for field in spec['required']:
+            if field not in cleaned:
+                raise ValueError(f"Missing required field '{field}'")
+        if 'phone' in cleaned and len(normalize_phone(cleaned['phone'])) < 10:
+            raise ValueError(f"Invalid phone '{cleaned['phone']}'")
+        for field in spec['numeric']:
+            if field in cleaned:
+                try:
+                    cleaned[field] = float(str(cleaned[field]).replace(',', ''))
+                except ValueError:
+                    raise ValueError(f"'{field}' must be a number")
+                if cleaned[field].is_integer():
+                    cleaned[field] = int(cleaned[field])
+        for field in spec['boolean']:
+            if field in cleaned and not isinstance(cleaned[field], bool):
+                text = str(cleaned[field]).lower()
+                if text not in ('true', 'false', 'yes', 'no', '1', '0'):
+                    raise ValueError(f"'{field}' must be true or false")
+                cleaned[field] = text in ('true', 'yes', '1')
+        return cleaned
+
+    @staticmethod
+    def import_records(entity, records, dry_run=False):
+        """Import (row_number, record) pairs into entity; returns a report dict"""
+        spec = BulkImporter.ENTITIES.get(entity)
+        if spec is None:
+            raise BulkImportError(f"Bulk import is not supported for '{entity}'")
+        start = time.perf_counter()
+        id_column = spec['columns'][0]
+
+        existing = storage.read_table(spec['file'], spec['columns'])
+        existing_ids = set(existing[id_column].dropna()) if id_column in existing else set()
+        seen = {
+            BulkImporter._dedupe_key(row, spec['dedupe'])
+            for row in existing[[c for c in spec['dedupe'] if c in existing]].to_dict('records')
+        }
+
+        received = 0
+        duplicates = 0
+        errors = []
+        error_count = 0
+        ignored = set()
+        rows = []
+        for number, record in records:
+            received += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                cleaned = BulkImporter._clean(record, spec, ignored)
+                key = BulkImporter._dedupe_key(cleaned, spec['dedupe'])
+                if key in seen:
+                    duplicates += 1
+                    continue
+                row = spec['build'](cleaned)
+                # Keep ids supplied by the file (e.g. readable vehicle ids) when they are free
+                if cleaned.get(id_column):
+                    if cleaned[id_column] in existing_ids:
+                        raise ValueError(f"{id_column} '{cleaned[id_column]}' already exists")
+                    row[id_column] = cleaned[id_column]
+                    existing_ids.add(row[id_column])
+                # Columns the service doesn't default (e.g. notes) still come from the file
+                row.update({k: v for k, v in cleaned.items() if k not in row})
+                seen.add(key)
+                rows.append(row)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < BulkImporter.MAX_REPORTED_ERRORS:
+                    errors.append({'row': number, 'error': str(e)})
+
+        if rows and not dry_run:
+            storage.append_rows(spec['file'], rows, spec['columns'])
+
+        elapsed = time.perf_counter() - start
+        return {
+            'entity': entity,
+            'dry_run': dry_run,
+            'received': received,
+            'imported': len(rows),
+            'duplicates': duplicates,
+            'error_count': error_count,
+            'errors': errors,
+            'ignored_columns': sorted(ignored),
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'rows_per_second': round(received / elapsed) if elapsed > 0 else None
+        }
+
+    @staticmethod
+    def import_file(entity, data, fmt, dry_run=False):
+        return BulkImporter.import_records(entity, BulkImporter.read_records(data, fmt), dry_run)
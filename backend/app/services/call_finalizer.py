@@ -0,0 +1,182 @@
+# Background finalization of ended calls
+import threading
+import time
+from ..config import Config
+from ..data.call_state import call_store
+from ..data.excel_handler import CALL_LOG_COLUMNS
+from ..data.storage import storage
+from ..data.transcripts import transcripts
+from .customer import CustomerService
+from .dashboard import DashboardView
+
+
+def call_log_entry(call):
+    return {column: call.get(column, '') for column in CALL_LOG_COLUMNS}
+
+
+class CallFinalizer:
+    """Everything that happens after a hangup, off the request path.
+
+    end_call only moves the call to the call store's finalization queue (one
+    atomic step) and returns. A background task then drains the queue in
+    batches of FINALIZE_BATCH_SIZE. Each call goes through three steps: close
+    its transcript, append its call-log row (the batch's rows in one write
+    when they all go through) and bump total_calls / last_call_date of the
+    matching customer. Every step is recorded in the queue as it completes
+    (mark_finished), and a call is acknowledged once all three are done.
+
+    Delivery is at-least-once per step: a call that fails, or whose worker
+    dies, is claimed again when its FINALIZE_LEASE_SECONDS lease runs out,
+    including after a restart with the SQLite call store, and resumes at the
+    first step not yet recorded. One bad call doesn't hold up the rest of its
+    batch. After FINALIZE_MAX_ATTEMPTS failed attempts the call is parked
+    with its error and shows up under `parked` in get_stats().
+
+    Memory stays bounded because only one batch is held at a time; the
+    backlog lives in the store. When more than
+    FINALIZE_MAX_PENDING calls are waiting, end_call drains a batch itself
+    before returning, so callers slow down instead of the backlog growing.
+    """
+
+    _socketio = None
+    _wake = threading.Event()
+    _drain_lock = threading.Lock()
+    _stats = {'finalized': 0, 'batches': 0, 'failures': 0, 'retried': 0, 'skipped_duplicates': 0,
+              'inline_drains': 0, 'last_batch_ms': None}
+
+    @classmethod
+    def start(cls, socketio):
+        """Drain the queue from a background task on the app's SocketIO server"""
+        if cls._socketio is not None:
+            return
+        cls._socketio = socketio
+        socketio.start_background_task(cls._loop)
+
+    @classmethod
+    def submit(cls, call):
+        """Called by end_call once the call is queued"""
+        if call_store.count_finished() > Config.FINALIZE_MAX_PENDING:
+            cls._stats['inline_drains'] += 1
+            cls.drain_batch()
+        cls._wake.set()
+
+    @classmethod
+    def _loop(cls):
+        while True:
+            # Queued calls left over from before a restart are picked up on the first pass
+            try:
+                while cls.drain_batch():
+                    cls._socketio.sleep(0)
+            except Exception as e:
+                print(f"[Finalizer] Drain failed: {e}")
+            cls._wake.wait(Config.FINALIZE_INTERVAL)
+            cls._wake.clear()
+
+    @classmethod
+    def drain(cls):
+        """Finalize everything claimable now, e.g. from a script or before
+        shutdown; calls that failed stay queued until their lease runs out"""
+        total = 0
+        while True:
+            done = cls.drain_batch()
+            if not done:
+                return total
+            total += done
+
+    @classmethod
+    def drain_batch(cls):
+        """Finalize one batch; returns how many calls it claimed"""
+        with cls._drain_lock:
+            calls = call_store.claim_finished(Config.FINALIZE_BATCH_SIZE, Config.FINALIZE_LEASE_SECONDS)
+            if not calls:
+                return 0
+            start = time.perf_counter()
+            errors = {}
+            cls._close_transcripts(calls, errors)
+            cls._log_calls(calls, errors)
+            cls._count_calls(calls, errors)
+
+            finished = [call['call_id'] for call in calls if call['call_id'] not in errors]
+            if finished:
+                call_store.ack_finished(finished)
+                # This process's view; the others see the new call logs through
+                # storage.table_version()
+                DashboardView.mark_dirty()
+            for call in calls:
+                if call['call_id'] in errors:
+                    cls._failed(call, errors[call['call_id']])
+            cls._stats['batches'] += 1
+            cls._stats['finalized'] += len(finished)
+            cls._stats['last_batch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return len(calls)
+
+    @staticmethod
+    def _pending(calls, errors, step):
+        return [call for call in calls
+                if call['call_id'] not in errors and step not in call.get('finalize_done', ())]
+
+    @classmethod
+    def _close_transcripts(cls, calls, errors):
+        closed = []
+        for call in cls._pending(calls, errors, 'transcript'):
+            try:
+                transcripts.end(call)
+                closed.append(call['call_id'])
+            except Exception as e:
+                errors[call['call_id']] = f"transcript: {e}"
+        call_store.mark_finished(closed, 'transcript')
+
+    @classmethod
+    def _log_calls(cls, calls, errors):
+        pending = cls._pending(calls, errors, 'logged')
+        # A call claimed before may have been logged by a worker that stopped before recording it
+        retried = [call for call in pending if call.get('finalize_attempts', 1) > 1]
+        logged = [
+            call['call_id'] for call in retried
+            if storage.get_by_id(Config.CALL_LOGS_FILE, 'call_id', call['call_id'], CALL_LOG_COLUMNS)
+        ]
+        cls._stats['retried'] += len(retried)
+        cls._stats['skipped_duplicates'] += len(logged)
+        fresh = [call for call in pending if call['call_id'] not in logged]
+        try:
+            storage.append_rows(Config.CALL_LOGS_FILE, [call_log_entry(call) for call in fresh], CALL_LOG_COLUMNS)
+            logged += [call['call_id'] for call in fresh]
+        except Exception:
+            # Write them one by one so a single bad row only holds up its own call
+            for call in fresh:
+                try:
+                    storage.append_row(Config.CALL_LOGS_FILE, call_log_entry(call), CALL_LOG_COLUMNS)
+                    logged.append(call['call_id'])
+                except Exception as e:
+                    errors[call['call_id']] = f"call log: {e}"
+        call_store.mark_finished(logged, 'logged')
+
+    @classmethod
+    def _count_calls(cls, calls, errors):
+        for call in cls._pending(calls, errors, 'counted'):
+            try:
+                if call.get('phone'):
+                    customer = CustomerService.get_by_phone(call['phone'])
+                    if customer:
+                        # Idempotent: a retry after the count was written but not
+                        # recorded in the queue finds the call on the customer row
+                        CustomerService.increment_call_count(customer['customer_id'], 1,
+                                                             call.get('end_time') or None, call['call_id'])
+                call_store.mark_finished([call['call_id']], 'counted')
+            except Exception as e:
+                errors[call['call_id']] = f"customer count: {e}"
+
+    @classmethod
+    def _failed(cls, call, error):
+        cls._stats['failures'] += 1
+        attempts = call.get('finalize_attempts', 1)
+        if attempts >= Config.FINALIZE_MAX_ATTEMPTS:
+            call_store.park_finished(call['call_id'], error)
+            print(f"[Finalizer] Parked call {call['call_id']} after {attempts} attempts: {error}")
+        else:
+            print(f"[Finalizer] Call {call['call_id']} failed (attempt {attempts}), will retry: {error}")
+
+    @classmethod
+    def get_stats(cls):
+        return {'running': cls._socketio is not None, 'pending': call_store.count_finished(),
+                **cls._stats, 'parked': call_store.count_parked(), 'recent_parked': call_store.parked(5)}
@@ -1,15 +1,41 @@
+import copy
 from datetime import datetime
-import os
-from ..data.excel_handler import ExcelHandler, CALL_LOG_COLUMNS
+import time
+from ..data.call_state import call_store
+from ..data.excel_handler import CALL_LOG_COLUMNS
+from ..data.ids import IdGenerator
+from ..data.storage import storage
+from ..data.transcripts import transcripts
 from ..config import Config
+from .aggregation import TableStats
+from .call_finalizer import CallFinalizer
+from .call_updates import CallUpdates
+from .dashboard import DashboardView
 
 
 class CallManager:
-    active_calls = {}
+    """Active calls live in call_store (app/data/call_state.py), which may be
+    shared by several worker processes; every change goes through
+    call_store.update() / append_message() so concurrent turns on one call
+    don't lose writes.
+    Calls nobody has touched for CALL_STATE_TTL_SECONDS (the caller hung up
+    and the client never ended the call) are ended as 'abandoned'.
+    """
+
+    _swept_at = 0.0
+    _end_listeners = []
+
+    @staticmethod
+    def on_end(listener):
+        """Register listener(call) for every ended call, whether the client
+        ended it or sweep_expired() did (the agent's per-call state lives in
+        app/agent, which depends on this module)"""
+        CallManager._end_listeners.append(listener)
 
     @staticmethod
     def start_call(phone, direction='inbound', call_type='inquiry', customer_name='Unknown'):
-        call_id = ExcelHandler.generate_id('CALL')
+        CallManager.sweep_expired()
+        call_id = IdGenerator.generate('CALL')
         call = {
             'call_id': call_id,
             'customer_id': '',
@@ -23,7 +49,7 @@ class CallManager:
             'handled_by': 'ai',
             'takeover_reason': '',
             'outcome': '',
-            'transcript_file': f"{call_id}.txt",
+            'transcript_file': f"{call_id}.jsonl",
             'transcript': [],
             'sentiment_score': 0.0,
             'ai_confidence': 1.0,
@@ -35,69 +61,115 @@ class CallManager:
                 'functions_called': []
             }
         }
-        CallManager.active_calls[call_id] = call
+        call_store.add(call)
+        transcripts.start(call)
+        CallUpdates.started(call)
+        DashboardView.mark_dirty()
         return call
 
     @staticmethod
     def get_active_calls():
-        return list(CallManager.active_calls.values())
+        CallManager.sweep_expired()
+        return call_store.list()
 
     @staticmethod
     def get_call(call_id):
-        return CallManager.active_calls.get(call_id)
+        return call_store.get(call_id)
+
+    @staticmethod
+    def count_active():
+        return call_store.count()
+
+    @staticmethod
+    def get_events(after=0, limit=100):
+        return call_store.events_since(after, limit)
 
     @staticmethod
     def add_message(call_id, role, content, timestamp=None):
-        if call_id in CallManager.active_calls:
-            if timestamp is None:
-                call_start = datetime.fromisoformat(CallManager.active_calls[call_id]['start_time'])
+        def append(call):
+            stamp = timestamp
+            if stamp is None:
+                call_start = datetime.fromisoformat(call['start_time'])
                 elapsed = (datetime.now() - call_start).total_seconds()
                 mins = int(elapsed // 60)
                 secs = int(elapsed % 60)
-                timestamp = f"{mins:02d}:{secs:02d}"
+                stamp = f"{mins:02d}:{secs:02d}"
 
-            message = {
-                'timestamp': timestamp,
+            return {
+                'timestamp': stamp,
                 'role': role,
                 'content': content
             }
-            CallManager.active_calls[call_id]['transcript'].append(message)
-            return message
-        return None
+
+        # The position is taken inside the store's update: with two turns on
+        # the call at once, what follows may run in either order
+        index, message = call_store.append_message(call_id, append)
+        if index is None:
+            return None
+        transcripts.append(call_id, index, message)
+        CallUpdates.message(call_id, message, index)
+        return message
+
+    @staticmethod
+    def _change(call_id, apply, event):
+        """Run apply(call) -> changed fields (None if unchanged) as one store update, and push the change"""
+        call, fields = call_store.update(call_id, apply, event=event)
+        if fields:
+            CallUpdates.changed(call_id, fields)
+        return call
 
     @staticmethod
     def update_context(call_id, context_updates):
-        if call_id in CallManager.active_calls:
-            CallManager.active_calls[call_id]['context'].update(context_updates)
+        def apply(call):
+            call['context'].update(context_updates)
+            return {'context': copy.deepcopy(call['context'])}
+
+        CallManager._change(call_id, apply, 'context')
 
     @staticmethod
     def add_function_call(call_id, function_name):
-        if call_id in CallManager.active_calls:
-            CallManager.active_calls[call_id]['context']['functions_called'].append(function_name)
+        def apply(call):
+            call['context']['functions_called'].append(function_name)
+            return {'context': copy.deepcopy(call['context'])}
+
+        CallManager._change(call_id, apply, 'function')
 
     @staticmethod
     def update_sentiment(call_id, sentiment_score):
-        if call_id in CallManager.active_calls:
-            CallManager.active_calls[call_id]['sentiment_score'] = sentiment_score
+        CallManager._change(call_id, lambda call: CallManager._set(call, 'sentiment_score', sentiment_score),
+                            'sentiment')
 
     @staticmethod
     def update_confidence(call_id, confidence):
-        if call_id in CallManager.active_calls:
-            CallManager.active_calls[call_id]['ai_confidence'] = confidence
+        CallManager._change(call_id, lambda call: CallManager._set(call, 'ai_confidence', confidence),
+                            'confidence')
+
+    @staticmethod
+    def _set(call, field, value):
+        if call[field] == value:
+            return None
+        call[field] = value
+        return {field: value}
 
     @staticmethod
     def takeover(call_id, reason='manual'):
-        if call_id in CallManager.active_calls:
-            CallManager.active_calls[call_id]['handled_by'] = 'ai_then_human'
-            CallManager.active_calls[call_id]['takeover_reason'] = reason
-            CallManager.active_calls[call_id]['status'] = 'takeover'
-            return True
-        return False
+        def hand_over(call):
+            call['handled_by'] = 'ai_then_human'
+            call['takeover_reason'] = reason
+            call['status'] = 'takeover'
+            return {'handled_by': 'ai_then_human', 'takeover_reason': reason, 'status': 'takeover'}
+
+        call = CallManager._change(call_id, hand_over, 'takeover')
+        if call is None:
+            return False
+        DashboardView.mark_dirty()
+        return True
 
     @staticmethod
     def end_call(call_id, outcome='resolved'):
-        if call_id in CallManager.active_calls:
-            call = CallManager.active_calls[call_id]
+        """End a call and queue it for CallFinalizer (transcript, call log,
+        customer counts); returns the ended call without waiting for those"""
+        def close(call):
             call['end_time'] = datetime.now().isoformat()
             start = datetime.fromisoformat(call['start_time'])
             end = datetime.fromisoformat(call['end_time'])
@@ -105,83 +177,70 @@ class CallManager:
             call['outcome'] = outcome
             call['status'] = 'ended'
 
-            CallManager._save_transcript(call)
-            CallManager._save_call_log(call)
-
-            del CallManager.active_calls[call_id]
-            return call
-        return None
-
-    @staticmethod
-    def _save_transcript(call):
-        os.makedirs(Config.TRANSCRIPTS_DIR, exist_ok=True)
-        filepath = os.path.join(Config.TRANSCRIPTS_DIR, call['transcript_file'])
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"Call ID: {call['call_id']}\n")
-            f.write(f"Phone: {call['phone']}\n")
-            f.write(f"Customer: {call['customer_name']}\n")
-            f.write(f"Type: {call['type']}\n")
-            f.write(f"Duration: {call['duration_seconds']} seconds\n")
-            f.write(f"Outcome: {call['outcome']}\n")
-            f.write("-" * 50 + "\n\n")
-
-            for msg in call['transcript']:
-                role_label = "AI" if msg['role'] == 'assistant' else "Customer"
-                f.write(f"[{msg['timestamp']}] {role_label}: {msg['content']}\n\n")
-
-    @staticmethod
-    def _save_call_log(call):
-        log_entry = {
-            'call_id': call['call_id'],
-            'customer_id': call['customer_id'],
-            'customer_name': call['customer_name'],
-            'phone': call['phone'],
-            'direction': call['direction'],
-            'type': call['type'],
-            'start_time': call['start_time'],
-            'end_time': call['end_time'],
-            'duration_seconds': call['duration_seconds'],
-            'handled_by': call['handled_by'],
-            'takeover_reason': call['takeover_reason'],
-            'outcome': call['outcome'],
-            'transcript_file': call['transcript_file'],
-            'sentiment_score': call['sentiment_score'],
-            'ai_confidence': call['ai_confidence'],
-            'notes': call['notes']
-        }
-        ExcelHandler.append_row(Config.CALL_LOGS_FILE, log_entry, CALL_LOG_COLUMNS)
+        # Taking the call out of the active calls first means only one worker ends (and logs) it
+        call = call_store.finish(call_id, close)
+        if call is None:
+            return None
+        CallFinalizer.submit(call)
+        for listener in CallManager._end_listeners:
+            listener(call)
+
+        CallUpdates.ended(call)
+        DashboardView.mark_dirty()
+        return call
+
+    @staticmethod
+    def sweep_expired(force=False):
+        """End calls idle for longer than CALL_STATE_TTL_SECONDS; runs at most once a minute"""
+        now = time.monotonic()
+        if not force and now - CallManager._swept_at < 60:
+            return []
+        CallManager._swept_at = now
+        ended = []
+        for call_id in call_store.expired(Config.CALL_STATE_TTL_SECONDS):
+            call = CallManager.end_call(call_id, outcome='abandoned')
+            if call:
+                print(f"[CallManager] Ended abandoned call {call_id}")
+                ended.append(call)
+        return ended
 
     @staticmethod
     def get_call_logs():
-        df = ExcelHandler.read_excel(Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS)
+        df = storage.read_table(Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_call_log(call_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.CALL_LOGS_FILE, 'call_id', call_id, CALL_LOG_COLUMNS
         )
 
     @staticmethod
     def get_transcript(call_id):
-        filepath = os.path.join(Config.TRANSCRIPTS_DIR, f"{call_id}.txt")
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
-        return None
+        """Plain-text transcript (ongoing calls included), or None"""
+        return transcripts.render_text(call_id)
+
+    @staticmethod
+    def get_transcript_messages(call_id, start=0, limit=None):
+        """Transcript messages in a range; a negative start counts from the end"""
+        return transcripts.read(call_id, start, limit)
 
     @staticmethod
     def get_stats():
-        df = ExcelHandler.read_excel(Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS)
+        summary = TableStats.summarize(
+            Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS,
+            {'handled_by': 'handled_by', 'day': ('start_time', 10)},
+            sum_columns=['duration_seconds']
+        )
         today = datetime.now().strftime('%Y-%m-%d')
-
-        today_calls = df[df['start_time'].str.startswith(today, na=False)]
+        handled_by = summary['counts']['handled_by']
+        duration_total, duration_count = summary['sums']['duration_seconds']
 
         return {
-            'total_calls': len(df),
-            'today_calls': len(today_calls),
-            'active_calls': len(CallManager.active_calls),
-            'ai_handled': len(df[df['handled_by'] == 'ai']),
-            'human_takeover': len(df[df['handled_by'] == 'ai_then_human']),
-            'avg_duration': df['duration_seconds'].mean() if len(df) > 0 else 0
+            'total_calls': summary['total'],
+            'today_calls': summary['counts']['day'].get(today, 0),
+            'active_calls': CallManager.count_active(),
+            'ai_handled': handled_by.get('ai', 0),
+            'human_takeover': handled_by.get('ai_then_human', 0),
+            'avg_duration': duration_total / duration_count if duration_count else 0
         }
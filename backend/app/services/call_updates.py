@@ -0,0 +1,100 @@
+# Live call updates over Socket.IO, sent per call room as diffs
+import json
+import threading
+
+CALLS_ROOM = 'calls'
+
+
+def call_room(call_id):
+    return f"call:{call_id}"
+
+
+def call_summary(call):
+    """What the live calls list shows: the call without its transcript"""
+    summary = {key: value for key, value in call.items() if key != 'transcript'}
+    transcript = call.get('transcript') or []
+    summary['message_count'] = len(transcript)
+    summary['last_message'] = transcript[-1] if transcript else None
+    return summary
+
+
+class CallUpdates:
+    """Pushes changes to active calls to the clients watching them.
+
+    Clients join the `calls` room (subscribe_calls) for the live calls list
+    and a `call:<call_id>` room (subscribe_call) for one call's transcript.
+    Each gets a full snapshot once when it subscribes; after that CallManager
+    reports every change here and only the change is sent:
+
+    - `call_delta` to the call's room: {call_id, messages: [new messages],
+      index: transcript position of the first one} or {call_id, fields: {...}}
+    - `call_summary_delta` to `calls`: the same changed fields, or
+      {last_message, message_count} for a new message
+    - `call_started` (a summary) and `call_ended` ({call_id, outcome}) to both
+
+    `index` is assigned inside the call-store update that added the message,
+    but two turns on one call can emit in either order, so clients place
+    messages by `index` and re-subscribe for a fresh snapshot only when a
+    gap stays open.
+    With SOCKETIO_MESSAGE_QUEUE set the emits go through the queue, so a
+    change made in one worker process reaches clients connected to any of them.
+    """
+
+    # Payload sizes are measured on every SIZE_SAMPLE-th emit only, so the
+    # hot path doesn't serialize each payload a second time
+    SIZE_SAMPLE = 20
+
+    _socketio = None
+    _lock = threading.Lock()
+    _counters = {'emits': 0, 'sampled': 0, 'sampled_bytes': 0}
+
+    @classmethod
+    def start(cls, socketio):
+        cls._socketio = socketio
+
+    @classmethod
+    def _emit(cls, event, payload, room):
+        if cls._socketio is None:
+            return
+        cls._socketio.emit(event, payload, to=room)
+        with cls._lock:
+            cls._counters['emits'] += 1
+            sample = cls._counters['emits'] % cls.SIZE_SAMPLE == 1
+        if sample:
+            size = len(json.dumps(payload, default=str))
+            with cls._lock:
+                cls._counters['sampled'] += 1
+                cls._counters['sampled_bytes'] += size
+
+    @classmethod
+    def started(cls, call):
+        summary = call_summary(call)
+        cls._emit('call_started', summary, CALLS_ROOM)
+        cls._emit('call_started', summary, call_room(call['call_id']))
+
+    @classmethod
+    def message(cls, call_id, message, index):
+        cls._emit('call_delta', {'call_id': call_id, 'messages': [message], 'index': index}, call_room(call_id))
+        cls._emit('call_summary_delta', {'call_id': call_id, 'fields': {
+            'last_message': message, 'message_count': index + 1
+        }}, CALLS_ROOM)
+
+    @classmethod
+    def changed(cls, call_id, fields):
+        payload = {'call_id': call_id, 'fields': fields}
+        cls._emit('call_delta', payload, call_room(call_id))
+        cls._emit('call_summary_delta', payload, CALLS_ROOM)
+
+    @classmethod
+    def ended(cls, call):
+        payload = {'call_id': call['call_id'], 'outcome': call.get('outcome')}
+        cls._emit('call_ended', payload, CALLS_ROOM)
+        cls._emit('call_ended', payload, call_room(call['call_id']))
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            counters = dict(cls._counters)
+        average = counters['sampled_bytes'] / counters['sampled'] if counters['sampled'] else 0
+        return {'pushing': cls._socketio is not None, 'emits': counters['emits'],
+                'avg_bytes': round(average), 'bytes_estimate': round(average * counters['emits'])}
@@ -1,6 +1,9 @@
 from datetime import datetime
-from ..data.excel_handler import ExcelHandler, COMPLAINT_COLUMNS
+from ..data.excel_handler import COMPLAINT_COLUMNS
+from ..data.ids import IdGenerator
+from ..data.storage import storage
 from ..config import Config
+from .aggregation import TableStats
 
 
 class ComplaintService:
@@ -20,36 +23,32 @@ class ComplaintService:
 
     @staticmethod
     def get_all():
-        df = ExcelHandler.read_excel(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
+        df = storage.read_table(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_by_id(complaint_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.COMPLAINTS_FILE, 'complaint_id', complaint_id, COMPLAINT_COLUMNS
         )
 
     @staticmethod
     def get_by_customer(customer_id):
-        df = ExcelHandler.read_excel(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
-        result = df[df['customer_id'] == customer_id]
-        return result.to_dict('records')
+        return storage.find_rows(Config.COMPLAINTS_FILE, 'customer_id', customer_id, COMPLAINT_COLUMNS)
 
     @staticmethod
     def get_by_status(status):
-        df = ExcelHandler.read_excel(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
-        result = df[df['status'] == status]
-        return result.to_dict('records')
+        return storage.find_rows(Config.COMPLAINTS_FILE, 'status', status, COMPLAINT_COLUMNS)
 
     @staticmethod
     def get_open_complaints():
-        df = ExcelHandler.read_excel(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
+        df = storage.read_table(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
         result = df[df['status'].isin(['open', 'in_progress'])]
         return result.to_dict('records')
 
     @staticmethod
     def create(data):
-        complaint_id = ExcelHandler.generate_id('COMP')
+        complaint_id = IdGenerator.generate('COMP')
 
         category = data.get('category', 'other')
         if category in ['vehicle_defect', 'warranty_claims', 'delivery_delay']:
@@ -72,11 +71,11 @@ class ComplaintService:
             'created_at': datetime.now().isoformat(),
             'resolved_at': ''
         }
-        return ExcelHandler.append_row(Config.COMPLAINTS_FILE, complaint, COMPLAINT_COLUMNS)
+        return storage.append_row(Config.COMPLAINTS_FILE, complaint, COMPLAINT_COLUMNS)
 
     @staticmethod
     def update(complaint_id, data):
-        return ExcelHandler.update_row(
+        return storage.update_row(
             Config.COMPLAINTS_FILE, 'complaint_id', complaint_id, data, COMPLAINT_COLUMNS
         )
 
@@ -91,16 +90,19 @@ class ComplaintService:
 
     @staticmethod
     def delete(complaint_id):
-        ExcelHandler.delete_row(Config.COMPLAINTS_FILE, 'complaint_id', complaint_id, COMPLAINT_COLUMNS)
+        storage.delete_row(Config.COMPLAINTS_FILE, 'complaint_id', complaint_id, COMPLAINT_COLUMNS)
 
     @staticmethod
     def get_stats():
-        df = ExcelHandler.read_excel(Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS)
+        summary = TableStats.summarize(
+            Config.COMPLAINTS_FILE, COMPLAINT_COLUMNS, {'status': 'status', 'priority': 'priority'}
+        )
+        status = summary['counts']['status']
         return {
-            'total': len(df),
-            'open': len(df[df['status'] == 'open']),
-            'in_progress': len(df[df['status'] == 'in_progress']),
-            'resolved': len(df[df['status'] == 'resolved']),
-            'closed': len(df[df['status'] == 'closed']),
-            'high_priority': len(df[df['priority'] == 'high'])
+            'total': summary['total'],
+            'open': status.get('open', 0),
+            'in_progress': status.get('in_progress', 0),
+            'resolved': status.get('resolved', 0),
+            'closed': status.get('closed', 0),
+            'high_priority': summary['counts']['priority'].get('high', 0)
         }
@@ -1,31 +1,34 @@
+import math
 from datetime import datetime
-from ..data.excel_handler import ExcelHandler, CUSTOMER_COLUMNS
+from ..data.excel_handler import CUSTOMER_COLUMNS
+from ..data.ids import IdGenerator
+from ..data.storage import storage
 from ..config import Config
 
 
 class CustomerService:
     @staticmethod
     def get_all():
-        df = ExcelHandler.read_excel(Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS)
+        df = storage.read_table(Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_by_id(customer_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.CUSTOMERS_FILE, 'customer_id', customer_id, CUSTOMER_COLUMNS
         )
 
     @staticmethod
     def get_by_phone(phone):
-        df = ExcelHandler.read_excel(Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS)
-        result = df[df['phone'] == phone]
+        result = storage.find_rows(Config.CUSTOMERS_FILE, 'phone', phone, CUSTOMER_COLUMNS)
         if len(result) > 0:
-            return result.iloc[0].to_dict()
+            return result[0]
         return None
 
     @staticmethod
-    def create(data):
-        customer_id = ExcelHandler.generate_id('CUST')
+    def build(data):
+        """A new record from request data, with defaults filled in and a fresh id"""
+        customer_id = IdGenerator.generate('CUST')
         customer = {
             'customer_id': customer_id,
             'name': data.get('name', ''),
@@ -42,30 +45,46 @@ class CustomerService:
             'notes': data.get('notes', ''),
             'created_at': datetime.now().isoformat()
         }
-        return ExcelHandler.append_row(Config.CUSTOMERS_FILE, customer, CUSTOMER_COLUMNS)
+        return customer
+
+    @staticmethod
+    def create(data):
+        return storage.append_row(Config.CUSTOMERS_FILE, CustomerService.build(data), CUSTOMER_COLUMNS)
 
     @staticmethod
     def update(customer_id, data):
-        return ExcelHandler.update_row(
+        return storage.update_row(
             Config.CUSTOMERS_FILE, 'customer_id', customer_id, data, CUSTOMER_COLUMNS
         )
 
     @staticmethod
     def delete(customer_id):
-        ExcelHandler.delete_row(Config.CUSTOMERS_FILE, 'customer_id', customer_id, CUSTOMER_COLUMNS)
+        storage.delete_row(Config.CUSTOMERS_FILE, 'customer_id', customer_id, CUSTOMER_COLUMNS)
 
     @staticmethod
-    def increment_call_count(customer_id):
+    def increment_call_count(customer_id, count=1, last_call_date=None, call_id=None):
+        """Count a call. With call_id the count is recorded in the same write,
+        and counting the same call again is a no-op (for retried finalization)
+        """
         customer = CustomerService.get_by_id(customer_id)
         if customer:
-            CustomerService.update(customer_id, {
-                'total_calls': int(customer.get('total_calls', 0)) + 1,
-                'last_call_date': datetime.now().isoformat()
-            })
+            if call_id is not None and customer.get('last_call_id') == call_id:
+                return
+            total_calls = customer.get('total_calls') or 0
+            if isinstance(total_calls, float) and math.isnan(total_calls):
+                # An empty cell on the Excel backend
+                total_calls = 0
+            data = {
+                'total_calls': int(total_calls) + count,
+                'last_call_date': last_call_date or datetime.now().isoformat()
+            }
+            if call_id is not None:
+                data['last_call_id'] = call_id
+            CustomerService.update(customer_id, data)
 
     @staticmethod
     def search(query):
-        df = ExcelHandler.read_excel(Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS)
+        df = storage.read_table(Config.CUSTOMERS_FILE, CUSTOMER_COLUMNS)
         query = query.lower()
         mask = (
             df['name'].str.lower().str.contains(query, na=False) |
@@ -0,0 +1,132 @@
+# Materialized dashboard view
+import threading
+import time
+from datetime import datetime
+from ..config import Config
+from ..data.call_state import call_store
+from ..data.excel_handler import APPOINTMENT_COLUMNS
+from ..data.storage import storage
+from .aggregation import TableStats
+
+
+class DashboardView:
+    """The /api/dashboard/stats payload, kept materialized between requests.
+
+    Storage writes and call lifecycle events only mark the view dirty. It is
+    rebuilt from the live TableStats counters (cost grows with the number of
+    distinct stage/status/day values, not with row count) at most once per
+    DASHBOARD_PUSH_INTERVAL, and only the changed counters are broadcast as a
+    `dashboard_delta` event. Every browser tab shares the same rebuild.
+
+    With several worker processes each one keeps its own view and pushes
+    its deltas only to the clients connected to it (ignore_queue), so no
+    client gets the same change twice or two views' counters mixed. Writes
+    and calls handled by the other workers mark the view dirty through
+    storage.table_version() and call_store.version().
+    """
+
+    TABLES = (Config.CALL_LOGS_FILE, Config.COMPLAINTS_FILE, Config.LEADS_FILE, Config.APPOINTMENTS_FILE)
+
+    _state = None
+    _built_at = 0.0
+    _day = None
+    _dirty = True
+    _versions = None
+    _lock = threading.Lock()
+    _socketio = None
+    rebuilds = 0
+    deltas_sent = 0
+
+    @classmethod
+    def mark_dirty(cls, *_):
+        """Storage listener / call lifecycle hook; cheap so it can run on every write"""
+        cls._dirty = True
+
+    @staticmethod
+    def _build():
+        from .call_manager import CallManager
+        from .complaint import ComplaintService
+        from .lead import LeadService
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        appointments = TableStats.summarize(
+            Config.APPOINTMENTS_FILE, APPOINTMENT_COLUMNS, {'date': 'date'}
+        )
+        return {
+            'calls': CallManager.get_stats(),
+            'complaints': ComplaintService.get_stats(),
+            'leads': LeadService.get_stats(),
+            'today_appointments': appointments['counts']['date'].get(today, 0),
+            'active_calls': CallManager.count_active()
+        }
+
+    @staticmethod
+    def _diff(old, new):
+        delta = {}
+        for key, value in new.items():
+            if isinstance(value, dict) and isinstance(old.get(key), dict):
+                changed = {k: v for k, v in value.items() if old[key].get(k) != v}
+                if changed:
+                    delta[key] = changed
+            elif old.get(key) != value:
+                delta[key] = value
+        return delta
+
+    @classmethod
+    def refresh(cls, force=False):
+        """Rebuild if dirty, stale or the day rolled over; returns (state, delta)"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        versions = tuple(storage.table_version(f) for f in cls.TABLES) + (call_store.version(),)
+        with cls._lock:
+            if versions != cls._versions:
+                cls._versions = versions
+                cls._dirty = True
+            stale = time.time() - cls._built_at >= Config.DASHBOARD_REFRESH_SECONDS
+            if not (force or cls._dirty or stale or cls._day != today or cls._state is None):
+                return cls._state, {}
+            cls._dirty = False
+            old = cls._state
+            new = cls._build()
+            cls._state = new
+            cls._built_at = time.time()
+            cls._day = today
+            cls.rebuilds += 1
+        return new, (cls._diff(old, new) if old is not None else new)
+
+    @classmethod
+    def snapshot(cls):
+        state, _ = cls.refresh()
+        return state
+
+    @classmethod
+    def start(cls, socketio):
+        """Push deltas from a background task on the app's SocketIO server"""
+        if cls._socketio is not None:
+            return
+        cls._socketio = socketio
+        socketio.start_background_task(cls._push_loop)
+
+    @classmethod
+    def _push_loop(cls):
+        while True:
+            cls._socketio.sleep(Config.DASHBOARD_PUSH_INTERVAL)
+            try:
+                _, delta = cls.refresh()
+                if delta:
+                    # Only to this process's clients; the other workers push their own
+                    cls._socketio.emit('dashboard_delta', delta, ignore_queue=True)
+                    cls.deltas_sent += 1
+            except Exception as e:
+                print(f"[Dashboard] Refresh failed: {e}")
+
+    @classmethod
+    def get_stats(cls):
+        return {
+            'rebuilds': cls.rebuilds,
+            'deltas_sent': cls.deltas_sent,
+            'pushing': cls._socketio is not None,
+            'age_seconds': round(time.time() - cls._built_at, 1) if cls._state else None
+        }
+
+
+storage.subscribe(DashboardView.mark_dirty)
@@ -0,0 +1,261 @@
+# Shared keep-alive HTTP clients for upstream APIs
+import atexit
+import random
+import threading
+import time
+import httpx
+from ..config import Config
+from .metrics import LatencyHistogram
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Retried transport errors; any other TransportError (ReadError,
+# RemoteProtocolError, WriteError...) fails the request straight away, and
+# every failure is recorded against the circuit
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.ReadTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while an upstream's circuit is open"""
+
+
+class _CircuitBreaker:
+    """Opens after HTTP_CIRCUIT_FAILURES consecutive failures; after
+    HTTP_CIRCUIT_COOLDOWN seconds one trial request is let through
+    (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= Config.HTTP_CIRCUIT_COOLDOWN:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record(self, ok):
+        self.trial_in_flight = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= Config.HTTP_CIRCUIT_FAILURES:
+            if self.opened_at is None:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+
+class _Upstream:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.circuit = _CircuitBreaker()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.connections_opened = 0
+        # Time to response headers, split by whether a new connection (and
+        # TCP/TLS handshake) was needed - the difference is what pooling saves
+        self.latency_new = LatencyHistogram()
+        self.latency_reused = LatencyHistogram()
+        self.handshake = LatencyHistogram()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'circuit': self.circuit.state,
+                'circuit_opened': self.circuit.times_opened,
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'rejected_by_circuit': self.rejected,
+                'connections_opened': self.connections_opened,
+                'latency_new_connection': self.latency_new.to_dict(),
+                'latency_reused_connection': self.latency_reused.to_dict(),
+                'handshake': self.handshake.to_dict()
+            }
+
+
+class _PooledTransport(httpx.BaseTransport):
+    """httpx transport adding retries with jittered backoff, a circuit
+    breaker and latency accounting on top of a keep-alive connection pool"""
+
+    def __init__(self, upstream, http2):
+        self.upstream = upstream
+        self.transport = httpx.HTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=Config.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=Config.HTTP_POOL_KEEPALIVE_SECONDS
+            )
+        )
+
+    def _send(self, request):
+        connect = {}
+        outer_trace = request.extensions.get('trace')
+
+        def trace(event, info):
+            # httpcore reports connection setup only when no pooled connection was free
+            if event == 'connection.connect_tcp.started':
+                connect['started'] = time.perf_counter()
+            elif event in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+                connect['done'] = time.perf_counter()
+            if outer_trace:
+                outer_trace(event, info)
+
+        request.extensions = {**request.extensions, 'trace': trace}
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        upstream = self.upstream
+        with upstream.lock:
+            upstream.requests += 1
+            if 'started' in connect:
+                upstream.connections_opened += 1
+                upstream.latency_new.observe(elapsed_ms)
+                if 'done' in connect:
+                    upstream.handshake.observe((connect['done'] - connect['started']) * 1000)
+            else:
+                upstream.latency_reused.observe(elapsed_ms)
+        return response
+
+    def handle_request(self, request):
+        upstream = self.upstream
+        with upstream.lock:
+            allowed = upstream.circuit.allow()
+            if not allowed:
+                upstream.rejected += 1
+        if not allowed:
+            raise CircuitOpenError(f"{upstream.name} circuit is open after repeated failures", request=request)
+
+        try:
+            return self._attempts(request)
+        except BaseException:
+            # Any error ends the request as a failure (and ends a half-open
+            # trial), so the circuit can't stay stuck half-open
+            with upstream.lock:
+                upstream.errors += 1
+                upstream.circuit.record(ok=False)
+            raise
+
+    def _attempts(self, request):
+        """Send with retries; records the outcome of responses, while errors
+        propagate to handle_request, which records them"""
+        upstream = self.upstream
+        attempt = 0
+        while True:
+            try:
+                response = self._send(request)
+            except RETRY_ERRORS as e:
+                failure = e
+                response = None
+            else:
+                failure = None
+                if response.status_code not in RETRY_STATUSES:
+                    with upstream.lock:
+                        upstream.circuit.record(ok=True)
+                    return response
+
+            if attempt >= Config.HTTP_RETRIES:
+                if failure is not None:
+                    raise failure
+                with upstream.lock:
+                    upstream.errors += 1
+                    upstream.circuit.record(ok=False)
+                return response
+
+            attempt += 1
+            with upstream.lock:
+                upstream.retries += 1
+            delay = _backoff(attempt, response)
+            if response is not None:
+                response.close()
+            print(f"[HTTP] {upstream.name}: retry {attempt} in {delay:.2f}s "
+                  f"({failure or response.status_code})")
+            time.sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+
+def _backoff(attempt, response):
+    """Full-jitter exponential backoff, honouring a short Retry-After"""
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after and retry_after.isdigit() and int(retry_after) <= Config.HTTP_RETRY_MAX_DELAY:
+            return float(retry_after)
+    cap = min(Config.HTTP_RETRY_MAX_DELAY, Config.HTTP_RETRY_BACKOFF * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPPool:
+    """Process-lifetime httpx clients, one per upstream ('elevenlabs', 'openai').
+
+    Connections are kept alive and reused across requests and threads
+    (HTTP/2 when Config.HTTP2 is set and the h2 package is installed).
+    Connection failures, timeouts and 429/5xx responses are retried
+    HTTP_RETRIES times with jittered backoff; repeated failures open a
+    per-upstream circuit so callers fail fast instead of queueing on a dead
+    upstream. Latency is recorded separately for new and reused connections.
+    """
+
+    _clients = {}
+    _upstreams = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def client(cls, name, timeout=30.0):
+        client = cls._clients.get(name)
+        if client is not None:
+            return client
+        with cls._lock:
+            if name not in cls._clients:
+                http2 = Config.HTTP2 and _http2_available()
+                upstream = cls._upstreams.setdefault(name, _Upstream(name))
+                cls._clients[name] = httpx.Client(
+                    transport=_PooledTransport(upstream, http2),
+                    timeout=httpx.Timeout(timeout, connect=Config.HTTP_CONNECT_TIMEOUT)
+                )
+                print(f"[HTTP] Pooled client for {name} ({'HTTP/2' if http2 else 'HTTP/1.1'} keep-alive)")
+            return cls._clients[name]
+
+    @classmethod
+    def close_all(cls):
+        with cls._lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients = {}
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            upstreams = dict(cls._upstreams)
+        return {name: upstream.get_stats() for name, upstream in upstreams.items()}
+
+
+atexit.register(HTTPPool.close_all)
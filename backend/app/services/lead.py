@@ -1,6 +1,9 @@
 from datetime import datetime
-from ..data.excel_handler import ExcelHandler, LEAD_COLUMNS
+from ..data.excel_handler import LEAD_COLUMNS
+from ..data.ids import IdGenerator
+from ..data.storage import storage
 from ..config import Config
+from .aggregation import TableStats
 
 
 class LeadService:
@@ -19,38 +22,36 @@ class LeadService:
 
     @staticmethod
     def get_all():
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
+        df = storage.read_table(Config.LEADS_FILE, LEAD_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_by_id(lead_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.LEADS_FILE, 'lead_id', lead_id, LEAD_COLUMNS
         )
 
     @staticmethod
     def get_by_phone(phone):
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
-        result = df[df['phone'] == phone]
+        result = storage.find_rows(Config.LEADS_FILE, 'phone', phone, LEAD_COLUMNS)
         if len(result) > 0:
-            return result.iloc[0].to_dict()
+            return result[0]
         return None
 
     @staticmethod
     def get_by_stage(stage):
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
-        result = df[df['stage'] == stage]
-        return result.to_dict('records')
+        return storage.find_rows(Config.LEADS_FILE, 'stage', stage, LEAD_COLUMNS)
 
     @staticmethod
     def get_active_leads():
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
+        df = storage.read_table(Config.LEADS_FILE, LEAD_COLUMNS)
         result = df[~df['stage'].isin(['converted', 'lost'])]
         return result.to_dict('records')
 
     @staticmethod
-    def create(data):
-        lead_id = ExcelHandler.generate_id('LEAD')
+    def build(data):
+        """A new record from request data, with defaults filled in and a fresh id"""
+        lead_id = IdGenerator.generate('LEAD')
         lead = {
             'lead_id': lead_id,
             'name': data.get('name', ''),
@@ -66,12 +67,16 @@ class LeadService:
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
         }
-        return ExcelHandler.append_row(Config.LEADS_FILE, lead, LEAD_COLUMNS)
+        return lead
+
+    @staticmethod
+    def create(data):
+        return storage.append_row(Config.LEADS_FILE, LeadService.build(data), LEAD_COLUMNS)
 
     @staticmethod
     def update(lead_id, data):
         data['updated_at'] = datetime.now().isoformat()
-        return ExcelHandler.update_row(
+        return storage.update_row(
             Config.LEADS_FILE, 'lead_id', lead_id, data, LEAD_COLUMNS
         )
 
@@ -81,7 +86,7 @@ class LeadService:
 
     @staticmethod
     def delete(lead_id):
-        ExcelHandler.delete_row(Config.LEADS_FILE, 'lead_id', lead_id, LEAD_COLUMNS)
+        storage.delete_row(Config.LEADS_FILE, 'lead_id', lead_id, LEAD_COLUMNS)
 
     @staticmethod
     def convert_to_customer(lead_id):
@@ -93,16 +98,17 @@ class LeadService:
 
     @staticmethod
     def get_stats():
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
-        stats = {'total': len(df)}
+        summary = TableStats.summarize(Config.LEADS_FILE, LEAD_COLUMNS, {'stage': 'stage'})
+        stats = {'total': summary['total']}
         for stage in LeadService.STAGES:
-            stats[stage] = len(df[df['stage'] == stage])
+            stats[stage] = summary['counts']['stage'].get(stage, 0)
         return stats
 
     @staticmethod
     def get_pipeline():
-        df = ExcelHandler.read_excel(Config.LEADS_FILE, LEAD_COLUMNS)
-        pipeline = {}
-        for stage in LeadService.STAGES:
-            pipeline[stage] = df[df['stage'] == stage].to_dict('records')
+        df = storage.read_table(Config.LEADS_FILE, LEAD_COLUMNS)
+        pipeline = {stage: [] for stage in LeadService.STAGES}
+        for stage, group in df.groupby('stage', sort=False):
+            if stage in pipeline:
+                pipeline[stage] = group.to_dict('records')
         return pipeline
@@ -0,0 +1,44 @@
+# Latency histograms shared by the upstream pools and the tool executor
+
+# Bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; not thread-safe, callers hold their own lock"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        target = fraction * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 1)
+        return None
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 1),
+            'buckets': {label: n for label, n in zip(labels, self.buckets) if n}
+        }
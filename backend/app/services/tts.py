@@ -1,8 +1,15 @@
-import httpx
+import contextvars
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from ..config import Config
+from ..agent.streaming import SentenceChunker
+from .tts_cache import TTSCache
+from .http_pool import HTTPPool
 
 class TTSService:
-    ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1"
+    ELEVENLABS_API_URL = Config.ELEVENLABS_API_URL
 
     # Good Hindi/Indian voices from ElevenLabs
     VOICE_OPTIONS = {
@@ -16,9 +23,25 @@ class TTSService:
 
     DEFAULT_VOICE = "rachel"
 
+    MODEL_ID = "eleven_multilingual_v2"  # Best for Hindi/Hinglish
+    VOICE_SETTINGS = {
+        "stability": 0.5,
+        "similarity_boost": 0.75,
+        "style": 0.5,
+        "use_speaker_boost": True
+    }
+
+    # Shared by every pipelined stream. Each stream keeps at most
+    # TTS_MAX_PARALLEL sentences in flight itself; the pool has room for
+    # TTS_CONCURRENT_CALLS streams doing that at once, so one call's
+    # sentences don't queue behind another's
+    _executor = None
+    _executor_lock = threading.Lock()
+
     @classmethod
     def get_speech(cls, text: str, voice: str = None) -> bytes:
-        """Convert text to speech using ElevenLabs API"""
+        """Convert text to speech using ElevenLabs API (served from TTSCache when the same
+        text was already synthesized with the same voice, model and settings)"""
 
         api_key = Config.ELEVENLABS_API_KEY
         if not api_key:
@@ -26,6 +49,11 @@ class TTSService:
 
         voice_id = cls.VOICE_OPTIONS.get(voice or cls.DEFAULT_VOICE, cls.VOICE_OPTIONS[cls.DEFAULT_VOICE])
 
+        cache_key = TTSCache.key(text, voice_id, cls.MODEL_ID, cls.VOICE_SETTINGS)
+        cached = TTSCache.get(cache_key)
+        if cached is not None:
+            return cached
+
         url = f"{cls.ELEVENLABS_API_URL}/text-to-speech/{voice_id}"
 
         headers = {
@@ -36,19 +64,101 @@ class TTSService:
 
         data = {
             "text": text,
-            "model_id": "eleven_multilingual_v2",  # Best for Hindi/Hinglish
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.75,
-                "style": 0.5,
-                "use_speaker_boost": True
-            }
+            "model_id": cls.MODEL_ID,
+            "voice_settings": cls.VOICE_SETTINGS
         }
 
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            return response.content
+        response = HTTPPool.client('elevenlabs').post(url, json=data, headers=headers)
+        response.raise_for_status()
+        audio = response.content
+
+        TTSCache.put(cache_key, audio)
+        return audio
+
+    @staticmethod
+    def split_sentences(text: str):
+        """Sentence-sized pieces of a finished reply, as the streaming agent would emit them"""
+        chunker = SentenceChunker()
+        return chunker.feed(text + ' ') + chunker.flush()
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=Config.TTS_MAX_PARALLEL * Config.TTS_CONCURRENT_CALLS,
+                        thread_name_prefix='tts'
+                    )
+        return cls._executor
+
+    @classmethod
+    def stream_speech(cls, sentences, voice: str = None):
+        """Synthesize sentences concurrently and yield their audio in order.
+
+        sentences may be a lazy iterable (e.g. sentence events from the
+        streaming agent): it is read on a separate green thread, in the
+        caller's context, so each sentence is submitted as soon as it arrives
+        and finished audio is yielded as soon as it is next in line, without
+        waiting for the following sentence. At most TTS_MAX_PARALLEL of this
+        stream are in flight. Results are {'index', 'text', 'audio'}; a
+        sentence that fails yields 'audio': None and an 'error' instead of
+        ending the stream. An exception raised by sentences is re-raised.
+        """
+        pool = cls._pool()
+        inbox = queue.Queue()  # ('text', str), ('end', None), ('error', exc) or ('done', None)
+        stop = threading.Event()
+        texts = deque()
+        pending = deque()
+
+        def read():
+            try:
+                for text in sentences:
+                    if stop.is_set():
+                        return
+                    inbox.put(('text', text))
+                inbox.put(('end', None))
+            except Exception as e:
+                inbox.put(('error', e))
+
+        def result(entry):
+            index, text, future = entry
+            try:
+                return {'index': index, 'text': text, 'audio': future.result()}
+            except Exception as e:
+                error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                print(f"[TTS] Sentence {index} failed: {error}")
+                return {'index': index, 'text': text, 'audio': None, 'error': error}
+
+        threading.Thread(target=contextvars.copy_context().run, args=(read,), daemon=True).start()
+        count = 0
+        ended = False
+        try:
+            while True:
+                while texts and len(pending) < Config.TTS_MAX_PARALLEL:
+                    text = texts.popleft()
+                    future = pool.submit(cls.get_speech, text, voice)
+                    # Wake the loop below as soon as this sentence is done
+                    future.add_done_callback(lambda _: inbox.put(('done', None)))
+                    pending.append((count, text, future))
+                    count += 1
+                if pending and pending[0][2].done():
+                    yield result(pending.popleft())
+                    continue
+                if ended and not texts and not pending:
+                    return
+                kind, value = inbox.get()
+                if kind == 'text':
+                    texts.append(value)
+                elif kind == 'end':
+                    ended = True
+                elif kind == 'error':
+                    raise value
+        finally:
+            # Client went away: don't synthesize sentences nobody will hear
+            stop.set()
+            for _, _, future in pending:
+                future.cancel()
 
     @classmethod
     def get_available_voices(cls):
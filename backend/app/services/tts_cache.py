@@ -0,0 +1,184 @@
+# Content-addressed cache for synthesized speech
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from ..config import Config
+
+
+class TTSCache:
+    """Synthesized audio keyed by hash(text, voice_id, model_id, voice_settings).
+
+    Two tiers, both bounded in bytes: an in-memory LRU
+    (TTS_CACHE_MEMORY_BYTES) in front of a directory of MP3 files
+    (TTS_CACHE_DIR, TTS_CACHE_DISK_BYTES). Disk hits are promoted to memory;
+    when the disk tier is over budget the least recently used files (by
+    mtime, refreshed on every hit) are removed. Audio for the same inputs is
+    identical, so nothing ever needs invalidating - a change of voice, model
+    or settings is simply a different key.
+    """
+
+    _memory = OrderedDict()
+    _memory_bytes = 0
+    _disk_index = None  # key -> (size, mtime), loaded on first disk access
+    _disk_bytes = 0
+    _lock = threading.Lock()
+    _counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'bytes_saved': 0}
+
+    @staticmethod
+    def key(text, voice_id, model_id, voice_settings):
+        payload = json.dumps([text, voice_id, model_id, voice_settings], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _path(key):
+        return os.path.join(Config.TTS_CACHE_DIR, key[:2], f"{key}.mp3")
+
+    @classmethod
+    def _load_disk_index(cls):
+        if cls._disk_index is not None:
+            return
+        cls._disk_index = {}
+        cls._disk_bytes = 0
+        if not os.path.isdir(Config.TTS_CACHE_DIR):
+            return
+        for root, _, files in os.walk(Config.TTS_CACHE_DIR):
+            for name in files:
+                if not name.endswith('.mp3'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                cls._disk_index[name[:-4]] = (stat.st_size, stat.st_mtime)
+                cls._disk_bytes += stat.st_size
+        print(f"[TTSCache] Found {len(cls._disk_index)} cached clips ({cls._disk_bytes} bytes) on disk")
+
+    @classmethod
+    def _remember(cls, key, audio):
+        """Put audio in the memory tier, evicting least recently used entries"""
+        if len(audio) > Config.TTS_CACHE_MEMORY_BYTES:
+            return
+        if key in cls._memory:
+            cls._memory.move_to_end(key)
+            return
+        cls._memory[key] = audio
+        cls._memory_bytes += len(audio)
+        while cls._memory_bytes > Config.TTS_CACHE_MEMORY_BYTES:
+            _, evicted = cls._memory.popitem(last=False)
+            cls._memory_bytes -= len(evicted)
+
+    @classmethod
+    def _evict_disk(cls):
+        if cls._disk_bytes <= Config.TTS_CACHE_DISK_BYTES:
+            return
+        for key, (size, _) in sorted(cls._disk_index.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(cls._path(key))
+            except OSError:
+                pass
+            del cls._disk_index[key]
+            cls._disk_bytes -= size
+            cls._counters['evictions'] += 1
+            if cls._disk_bytes <= Config.TTS_CACHE_DISK_BYTES:
+                break
+
+    @classmethod
+    def get(cls, key):
+        """Cached audio for key, or None"""
+        if not Config.TTS_CACHE_ENABLED:
+            return None
+        with cls._lock:
+            audio = cls._memory.get(key)
+            if audio is not None:
+                cls._memory.move_to_end(key)
+                cls._counters['memory_hits'] += 1
+                cls._counters['bytes_saved'] += len(audio)
+                return audio
+            cls._load_disk_index()
+            if key not in cls._disk_index:
+                cls._counters['misses'] += 1
+                return None
+
+        path = cls._path(key)
+        try:
+            with open(path, 'rb') as f:
+                audio = f.read()
+            os.utime(path)
+        except OSError:
+            audio = None
+
+        with cls._lock:
+            if audio is None:
+                # Removed behind our back (or by another process's eviction)
+                size, _ = cls._disk_index.pop(key, (0, 0))
+                cls._disk_bytes -= size
+                cls._counters['misses'] += 1
+                return None
+            cls._disk_index[key] = (len(audio), os.path.getmtime(path))
+            cls._remember(key, audio)
+            cls._counters['disk_hits'] += 1
+            cls._counters['bytes_saved'] += len(audio)
+        return audio
+
+    @classmethod
+    def put(cls, key, audio):
+        if not Config.TTS_CACHE_ENABLED or not audio:
+            return
+        path = cls._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a concurrent reader never sees half a clip
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[TTSCache] Could not write {path}: {e}")
+            path = None
+
+        with cls._lock:
+            cls._remember(key, audio)
+            cls._counters['stores'] += 1
+            if path is None:
+                return
+            cls._load_disk_index()
+            previous, _ = cls._disk_index.get(key, (0, 0))
+            cls._disk_index[key] = (len(audio), os.path.getmtime(path))
+            cls._disk_bytes += len(audio) - previous
+            cls._evict_disk()
+
+    @classmethod
+    def clear(cls, disk=False):
+        with cls._lock:
+            cls._memory.clear()
+            cls._memory_bytes = 0
+            if disk:
+                cls._load_disk_index()
+                for key in list(cls._disk_index):
+                    try:
+                        os.remove(cls._path(key))
+                    except OSError:
+                        pass
+                cls._disk_index = {}
+                cls._disk_bytes = 0
+
+    @classmethod
+    def get_stats(cls):
+        with cls._lock:
+            cls._load_disk_index()
+            counters = dict(cls._counters)
+            hits = counters['memory_hits'] + counters['disk_hits']
+            lookups = hits + counters['misses']
+            return {
+                'enabled': Config.TTS_CACHE_ENABLED,
+                **counters,
+                'hit_ratio': round(hits / lookups, 3) if lookups else None,
+                'memory_entries': len(cls._memory),
+                'memory_bytes': cls._memory_bytes,
+                'memory_limit_bytes': Config.TTS_CACHE_MEMORY_BYTES,
+                'disk_entries': len(cls._disk_index),
+                'disk_bytes': cls._disk_bytes,
+                'disk_limit_bytes': Config.TTS_CACHE_DISK_BYTES
+            }
@@ -1,28 +1,30 @@
-from ..data.excel_handler import ExcelHandler, VEHICLE_COLUMNS
+from ..data.excel_handler import VEHICLE_COLUMNS
+from ..data.storage import storage
+from ..data.ids import IdGenerator
 from ..config import Config
 
 
 class VehicleService:
     @staticmethod
     def get_all():
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         return df.to_dict('records')
 
     @staticmethod
     def get_by_id(vehicle_id):
-        return ExcelHandler.get_by_id(
+        return storage.get_by_id(
             Config.VEHICLES_FILE, 'vehicle_id', vehicle_id, VEHICLE_COLUMNS
         )
 
     @staticmethod
     def get_by_model(model):
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         result = df[df['model'].str.lower() == model.lower()]
         return result.to_dict('records')
 
     @staticmethod
     def search(query):
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         query = query.lower()
         mask = (
             df['model'].str.lower().str.contains(query, na=False) |
@@ -33,25 +35,28 @@ class VehicleService:
 
     @staticmethod
     def get_by_fuel_type(fuel_type):
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         result = df[df['fuel_type'].str.lower() == fuel_type.lower()]
         return result.to_dict('records')
 
     @staticmethod
     def get_in_stock():
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         result = df[df['in_stock'] == True]
         return result.to_dict('records')
 
     @staticmethod
     def get_current_offers():
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         result = df[df['current_offer'].notna() & (df['current_offer'] != '')]
         return result.to_dict('records')
 
     @staticmethod
-    def create(data):
-        vehicle_id = f"VEH-{data.get('model', 'X').upper()[:3]}-{data.get('variant', 'X').upper()[:3]}"
+    def build(data):
+        """A new record from request data, with defaults filled in and a fresh id"""
+        vehicle_id = IdGenerator.generate(
+            f"VEH-{data.get('model', 'X').upper()[:3]}-{data.get('variant', 'X').upper()[:3]}"
+        )
         vehicle = {
             'vehicle_id': vehicle_id,
             'model': data.get('model', ''),
@@ -66,21 +71,25 @@ class VehicleService:
             'current_offer': data.get('current_offer', ''),
             'image_url': data.get('image_url', '')
         }
-        return ExcelHandler.append_row(Config.VEHICLES_FILE, vehicle, VEHICLE_COLUMNS)
+        return vehicle
+
+    @staticmethod
+    def create(data):
+        return storage.append_row(Config.VEHICLES_FILE, VehicleService.build(data), VEHICLE_COLUMNS)
 
     @staticmethod
     def update(vehicle_id, data):
-        return ExcelHandler.update_row(
+        return storage.update_row(
             Config.VEHICLES_FILE, 'vehicle_id', vehicle_id, data, VEHICLE_COLUMNS
         )
 
     @staticmethod
     def delete(vehicle_id):
-        ExcelHandler.delete_row(Config.VEHICLES_FILE, 'vehicle_id', vehicle_id, VEHICLE_COLUMNS)
+        storage.delete_row(Config.VEHICLES_FILE, 'vehicle_id', vehicle_id, VEHICLE_COLUMNS)
 
     @staticmethod
     def get_price_range():
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         if len(df) == 0:
             return {'min': 0, 'max': 0}
         return {
@@ -90,5 +99,5 @@ class VehicleService:
 
     @staticmethod
     def get_models_list():
-        df = ExcelHandler.read_excel(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
+        df = storage.read_table(Config.VEHICLES_FILE, VEHICLE_COLUMNS)
         return df['model'].unique().tolist()
@@ -0,0 +1,211 @@
+"""Local stand-ins for the ElevenLabs and OpenAI APIs, for testing TTS streaming,
+connection pooling and load without paid upstream calls.
+
+    python fake_upstreams.py --port 8765 --delay 0.4 --llm-delay 0.8
+    ELEVENLABS_API_URL=http://localhost:8765/v1 ELEVENLABS_API_KEY=test \
+    OPENAI_BASE_URL=http://localhost:8765/v1 python run.py
+
+Text to speech sleeps for --delay seconds (plus --per-char seconds per
+character) and returns deterministic bytes that start with an MP3 frame
+header and embed the requested text, so callers can check that sentences
+come back complete and in order. The server logs when each request starts
+and ends, which shows how many are in flight at once.
+
+Chat completions (plain or streamed) answer after --llm-delay seconds with
+a fixed Hinglish reply; a user message mentioning a price, a slot or test
+drive, or a manager asks for a tool first (TOOL_TRIGGERS), so turns
+exercise tool execution as well.
+Their usage mimics provider prompt caching: cached_tokens is the longest
+previously seen prefix (tools, then whole messages) of at least 1024
+tokens, in 128-token steps, at ~4 characters per token.
+"""
+import hashlib
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+settings = {'delay': 0.4, 'per_char': 0.0, 'fail': '', 'llm_delay': 0.8, 'token_delay': 0.02}
+_in_flight = 0
+_peak = 0
+_lock = threading.Lock()
+_seen_prefixes = set()
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz frame header
+MP3_HEADER = b'\xff\xfb\x90\x64'
+
+REPLY = ("Ji bilkul, Nexon ki ex-showroom price lagbhag 8 lakh se shuru hoti hai. "
+         "Aap test drive book karna chahenge? Main kal ka slot check kar sakti hoon.")
+
+# (words in the user message, function the fake model calls, its arguments)
+TOOL_TRIGGERS = [
+    (('price', 'kitne'), 'get_vehicle_info', {'model_name': 'Nexon'}),
+    (('slot', 'test drive'), 'check_appointment_slots', {'appointment_type': 'test_drive'}),
+    (('manager', 'senior'), 'request_human_takeover', {'reason': 'Customer asked for a senior executive'})
+]
+
+
+def _completion(payload):
+    """(content, tool_calls) the fake model answers with"""
+    messages = [m for m in payload.get('messages') or [] if m.get('role') != 'system']
+    last = messages[-1] if messages else {}
+    text = str(last.get('content') or '').lower()
+    if payload.get('tool_choice') == 'none' or last.get('role') != 'user':
+        return REPLY, None
+    for words, name, arguments in TOOL_TRIGGERS:
+        if any(word in text for word in words):
+            return None, [{
+                'id': f"call_{int(time.time() * 1000)}",
+                'type': 'function',
+                'function': {'name': name, 'arguments': json.dumps(arguments)}
+            }]
+    return REPLY, None
+
+
+def _usage(payload, content, tool_calls):
+    digest = hashlib.sha256(json.dumps(payload.get('tools') or [], sort_keys=True).encode())
+    chars = len(json.dumps(payload.get('tools') or []))
+    prefixes = []
+    for message in payload.get('messages') or []:
+        text = json.dumps(message, sort_keys=True)
+        digest.update(text.encode())
+        chars += len(text)
+        prefixes.append((digest.hexdigest(), chars // 4))
+    prompt_tokens = chars // 4
+    with _lock:
+        cached = max((tokens for key, tokens in prefixes if key in _seen_prefixes), default=0)
+        _seen_prefixes.update(key for key, tokens in prefixes if tokens >= 1024)
+    cached = cached // 128 * 128 if cached >= 1024 else 0
+    completion_tokens = len(json.dumps(tool_calls) if tool_calls else content or '') // 4
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': cached}
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send(200, {'in_flight': _in_flight, 'peak_in_flight': _peak})
+        else:
+            self._send(404, {'detail': 'Not found'})
+
+    def _chat(self, payload):
+        time.sleep(settings['llm_delay'])
+        content, tool_calls = _completion(payload)
+        base = {'id': 'chatcmpl-fake', 'created': int(time.time()), 'model': payload.get('model', 'fake')}
+        finish = 'tool_calls' if tool_calls else 'stop'
+        usage = _usage(payload, content, tool_calls)
+
+        if not payload.get('stream'):
+            message = {'role': 'assistant', 'content': content}
+            if tool_calls:
+                message['tool_calls'] = tool_calls
+            self._send(200, {
+                **base, 'object': 'chat.completion',
+                'choices': [{'index': 0, 'message': message, 'finish_reason': finish}],
+                'usage': usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def chunk(delta, finish_reason=None):
+            event = {**base, 'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+            data = f"data: {json.dumps(event)}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        if tool_calls:
+            chunk({'role': 'assistant', 'tool_calls': [dict(call, index=i) for i, call in enumerate(tool_calls)]})
+        else:
+            for word in content.split(' '):
+                chunk({'content': word + ' '})
+                time.sleep(settings['token_delay'])
+        chunk({}, finish)
+        if (payload.get('stream_options') or {}).get('include_usage'):
+            event = {**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage}
+            data = f"data: {json.dumps(event)}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        done = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        global _in_flight, _peak
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = self.rfile.read(length)
+        if self.path == '/v1/chat/completions':
+            self._chat(json.loads(payload or b'{}'))
+            return
+        prefix = '/v1/text-to-speech/'
+        if not self.path.startswith(prefix):
+            self._send(404, {'detail': 'Not found'})
+            return
+        if not self.headers.get('xi-api-key'):
+            self._send(401, {'detail': 'Missing xi-api-key'})
+            return
+        voice_id = self.path[len(prefix):]
+        text = (json.loads(payload or b'{}') or {}).get('text', '')
+        if settings['fail'] and settings['fail'] in text:
+            self._send(500, {'detail': 'Synthesis failed'})
+            return
+
+        with _lock:
+            _in_flight += 1
+            _peak = max(_peak, _in_flight)
+            current = _in_flight
+        print(f"[FakeTTS] start ({current} in flight): {text[:40]}")
+        try:
+            time.sleep(settings['delay'] + settings['per_char'] * len(text))
+        finally:
+            with _lock:
+                _in_flight -= 1
+        print(f"[FakeTTS] done: {text[:40]}")
+
+        self._send(200, MP3_HEADER + f"[{voice_id}] {text}\n".encode('utf-8'), 'audio/mpeg')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake ElevenLabs and OpenAI server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=settings['delay'], help='seconds per request')
+    parser.add_argument('--per-char', type=float, default=settings['per_char'],
+                        help='extra seconds per character of text')
+    parser.add_argument('--fail', default='', help='return 500 for texts containing this string')
+    parser.add_argument('--llm-delay', type=float, default=settings['llm_delay'],
+                        help='seconds before a chat completion starts answering')
+    parser.add_argument('--token-delay', type=float, default=settings['token_delay'],
+                        help='seconds between streamed words')
+    args = parser.parse_args()
+    settings.update(delay=args.delay, per_char=args.per_char, fail=args.fail,
+                    llm_delay=args.llm_delay, token_delay=args.token_delay)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), FakeUpstreamHandler)
+    print(f"[FakeUpstreams] Listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Bulk-load customers, leads or vehicles from a CSV, XLSX or NDJSON file.
+
+    python import_data.py customers dealer_customers.csv
+    python import_data.py leads campaign.xlsx --dry-run
+    python import_data.py vehicles catalog.ndjson
+
+Rows are validated against the table schema, deduplicated on phone
+(model/variant/fuel type for vehicles) and written in one batch.
+"""
+import argparse
+import sys
+
+from app.services.bulk_import import BulkImporter, BulkImportError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import CRM records')
+    parser.add_argument('entity', choices=sorted(BulkImporter.ENTITIES))
+    parser.add_argument('path', help='CSV, XLSX or NDJSON file')
+    parser.add_argument('--format', choices=BulkImporter.FORMATS,
+                        help='file format (default: from the file extension)')
+    parser.add_argument('--dry-run', action='store_true', help='validate and report without writing')
+    parser.add_argument('--show-errors', type=int, default=20, help='number of row errors to print')
+    args = parser.parse_args()
+
+    with open(args.path, 'rb') as f:
+        data = f.read()
+    fmt = args.format or BulkImporter.detect_format(args.path)
+    try:
+        report = BulkImporter.import_file(args.entity, data, fmt, dry_run=args.dry_run)
+    except BulkImportError as e:
+        print(f"Import failed: {e}")
+        sys.exit(1)
+
+    action = 'Validated' if args.dry_run else 'Imported'
+    print(f"{action} {report['imported']} of {report['received']} {args.entity} rows "
+          f"({report['duplicates']} duplicates, {report['error_count']} errors) "
+          f"in {report['elapsed_ms']:.0f} ms - {report['rows_per_second']} rows/s")
+    if report['ignored_columns']:
+        print(f"  Ignored columns: {', '.join(report['ignored_columns'])}")
+    for error in report['errors'][:args.show_errors]:
+        print(f"  - row {error['row']}: {error['error']}")
+    if report['error_count'] > args.show_errors:
+        print(f"  ... and {report['error_count'] - args.show_errors} more")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Measure how many concurrent calls one backend process can sustain.
+
+    python fake_upstreams.py --llm-delay 0.8 &
+    OPENAI_BASE_URL=http://localhost:8765/v1 python run.py &
+    python load_test.py --levels 1,10,25,50 --turns 3
+
+For each concurrency level, that many virtual callers each start a demo
+call, send --turns messages through /api/demo/message/stream (or
+/api/demo/message with --no-stream) and end the call. Meanwhile a probe
+requests GET / every 100 ms: its latency stays flat while the server keeps
+serving other work during LLM waits, and jumps when something blocks it.
+A level is sustained when it has no errors and its p95 turn latency stays
+within --slo times that of a single caller.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import httpx
+
+MESSAGES = [
+    "Nexon ki price kitne ki hai?",
+    "Kal subah test drive ho sakti hai kya?",
+    "Theek hai, dhanyawad. Main baad mein call karta hoon."
+]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_turn(client, call_id, message, stream):
+    """Returns (turn seconds, seconds to first sentence or None)"""
+    start = time.perf_counter()
+    if not stream:
+        response = client.post('/api/demo/message', json={'call_id': call_id, 'message': message})
+        response.raise_for_status()
+        return time.perf_counter() - start, None
+
+    first_sentence = None
+    event = None
+    with client.stream('POST', '/api/demo/message/stream',
+                       json={'call_id': call_id, 'message': message}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: ') and event == 'sentence' and first_sentence is None:
+                first_sentence = time.perf_counter() - start
+            elif line.startswith('data: ') and event == 'done' and json.loads(line[6:]).get('error'):
+                raise RuntimeError(json.loads(line[6:])['error'])
+    return time.perf_counter() - start, first_sentence
+
+
+def caller(base_url, turns, stream, results):
+    with httpx.Client(base_url=base_url, timeout=120.0) as client:
+        try:
+            response = client.post('/api/demo/start', json={'customer_name': 'Load Test'})
+            response.raise_for_status()
+            call_id = response.json()['call']['call_id']
+            for i in range(turns):
+                elapsed, first = run_turn(client, call_id, MESSAGES[i % len(MESSAGES)], stream)
+                results['turns'].append(elapsed)
+                if first is not None:
+                    results['first_sentence'].append(first)
+            client.post('/api/demo/end', json={'call_id': call_id, 'outcome': 'resolved'})
+        except Exception as e:
+            results['errors'].append(str(e))
+
+
+def probe(base_url, stop, samples):
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                client.get('/')
+                samples.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                pass
+            stop.wait(0.1)
+
+
+def run_level(base_url, callers, turns, stream):
+    results = {'turns': [], 'first_sentence': [], 'errors': []}
+    probe_samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(base_url, stop, probe_samples), daemon=True)
+    prober.start()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(base_url, turns, stream, results)) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    return {
+        'callers': callers,
+        'turns': len(results['turns']),
+        'errors': len(results['errors']),
+        'first_error': results['errors'][0] if results['errors'] else None,
+        'turns_per_second': len(results['turns']) / elapsed if elapsed else 0,
+        'p50': percentile(results['turns'], 0.5),
+        'p95': percentile(results['turns'], 0.95),
+        'first_sentence_p95': percentile(results['first_sentence'], 0.95),
+        'probe_p95': percentile(probe_samples, 0.95),
+        'probe_max': max(probe_samples) if probe_samples else None,
+        'probe_median': statistics.median(probe_samples) if probe_samples else None
+    }
+
+
+def fmt(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent call load test')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--levels', default='1,5,10,25,50', help='comma-separated concurrent caller counts')
+    parser.add_argument('--turns', type=int, default=3, help='messages per call')
+    parser.add_argument('--no-stream', action='store_true', help='use /api/demo/message instead of SSE')
+    parser.add_argument('--slo', type=float, default=2.0,
+                        help='sustained while p95 turn latency <= slo x the single-caller p95')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(',')]
+    baseline = None
+    sustained = None
+    print(f"{'callers':>7} {'turns':>6} {'errors':>6} {'turns/s':>8} {'p50':>8} {'p95':>8} "
+          f"{'1st sent':>9} {'probe p95':>10} {'probe max':>10}")
+    for callers in levels:
+        r = run_level(args.url, callers, args.turns, not args.no_stream)
+        print(f"{r['callers']:>7} {r['turns']:>6} {r['errors']:>6} {r['turns_per_second']:>8.2f} "
+              f"{fmt(r['p50']):>8} {fmt(r['p95']):>8} {fmt(r['first_sentence_p95']):>9} "
+              f"{fmt(r['probe_p95']):>10} {fmt(r['probe_max']):>10}")
+        if r['first_error']:
+            print(f"        first error: {r['first_error'][:120]}")
+        if baseline is None and r['p95']:
+            baseline = r['p95']
+        if not r['errors'] and r['p95'] and baseline and r['p95'] <= args.slo * baseline:
+            sustained = callers
+
+    if sustained:
+        print(f"\nSustained {sustained} concurrent calls (p95 within {args.slo}x of a single caller, no errors)")
+    else:
+        print("\nNo level met the latency target")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""One-shot migration between the Excel workbooks in data/ and the SQLite store.
+
+    python migrate_excel.py            # load every data/*.xlsx into SQLite
+    python migrate_excel.py --export   # write the SQLite tables back to data/*.xlsx
+"""
+import argparse
+import time
+
+from app.config import Config
+from app.data.storage import TABLES
+from app.data.sqlite_backend import SQLiteBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move CRM tables between Excel and SQLite')
+    parser.add_argument('--export', action='store_true',
+                        help='export SQLite tables to .xlsx instead of importing')
+    parser.add_argument('--db', default=Config.SQLITE_FILE, help='SQLite database path')
+    args = parser.parse_args()
+
+    backend = SQLiteBackend(args.db)
+    for name, (filepath, columns) in TABLES.items():
+        start = time.perf_counter()
+        if args.export:
+            rows = backend.export_excel(filepath, columns)
+        else:
+            rows = backend.import_excel(filepath, columns)
+        elapsed = (time.perf_counter() - start) * 1000
+        action = 'Exported' if args.export else 'Imported'
+        print(f"  - {name}: {action} {rows} rows ({elapsed:.0f} ms)")
+
+    print(f"Database: {args.db}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Synthesize the agent's fixed lines into the TTS cache, e.g. at deploy time.
+
+    python prewarm_tts.py                      # greetings + takeover line, default voice
+    python prewarm_tts.py --voice all          # ... for every voice
+    python prewarm_tts.py --phrases extra.txt  # plus one phrase per line from a file
+
+Phrases already cached are not synthesized again, so re-running is cheap.
+"""
+import argparse
+import sys
+import time
+
+from app.agent.prompts import FIXED_PHRASES
+from app.api.routes.tts import resolve_api_key
+from app.services.tts import TTSService
+from app.services.tts_cache import TTSCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-warm the TTS audio cache')
+    parser.add_argument('--voice', default=TTSService.DEFAULT_VOICE,
+                        help=f"voice name or 'all' ({', '.join(TTSService.get_available_voices())})")
+    parser.add_argument('--phrases', help='file with additional phrases, one per line')
+    args = parser.parse_args()
+
+    if not resolve_api_key():
+        print("ElevenLabs API key not configured")
+        sys.exit(1)
+
+    phrases = list(FIXED_PHRASES)
+    if args.phrases:
+        with open(args.phrases, encoding='utf-8') as f:
+            phrases += [line.strip() for line in f if line.strip()]
+    voices = TTSService.get_available_voices() if args.voice == 'all' else [args.voice]
+
+    start = time.perf_counter()
+    before = TTSCache.get_stats()
+    failed = 0
+    for voice in voices:
+        for chunk in TTSService.stream_speech(phrases, voice):
+            if chunk['audio'] is None:
+                failed += 1
+                print(f"  - [{voice}] {chunk['text'][:60]}: {chunk['error']}")
+    after = TTSCache.get_stats()
+
+    total = len(phrases) * len(voices)
+    print(f"Pre-warmed {total} clips for {len(voices)} voice(s) in {time.perf_counter() - start:.1f}s: "
+          f"{after['stores'] - before['stores']} synthesized, "
+          f"{total - failed - (after['stores'] - before['stores'])} already cached, {failed} failed")
+    print(f"  Disk cache: {after['disk_entries']} clips, {after['disk_bytes']} bytes")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
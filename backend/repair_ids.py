@@ -0,0 +1,83 @@
+"""Find records that share an ID and re-key the duplicates.
+
+IDs used to be PREFIX-YYYYmmddHHMMSS, so two records created in the same
+second got the same ID and every lookup/update by ID hit both. The first
+record keeps its ID; every later duplicate gets a fresh one derived from it
+(OLD-ID-<generated suffix>), so it can still be traced back.
+
+Other tables point at records by ID (appointments.customer_id,
+call_logs.customer_id, appointments.call_id, ...), and a reference to a
+duplicated ID can't tell which of the records it meant. Such references are
+listed and --apply refuses to run until they have been sorted out by hand.
+
+    python repair_ids.py           # report duplicates only
+    python repair_ids.py --apply   # re-key them
+"""
+import argparse
+import sys
+
+from app.data.storage import storage, TABLES
+from app.data.ids import IdGenerator
+
+
+def find_references(tables, id_column, ids):
+    """(table, row label, value) of every row in another table that points at one of ids"""
+    references = []
+    for name, (df, columns) in tables.items():
+        if id_column in columns[1:] and len(df):
+            for label in df.index[df[id_column].isin(ids)]:
+                references.append((name, label, df.at[label, id_column]))
+    return references
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-key duplicate record IDs')
+    parser.add_argument('--apply', action='store_true', help='write the new IDs (default: dry run)')
+    args = parser.parse_args()
+
+    tables = {name: (storage.read_table(filepath, columns), columns)
+              for name, (filepath, columns) in TABLES.items()}
+    rekeyed = {}
+    referenced = []
+    for name, (df, columns) in tables.items():
+        if len(df) == 0:
+            continue
+        id_column = columns[0]
+        duplicated = df[id_column].notna() & df.duplicated(id_column, keep='first')
+        if not duplicated.any():
+            continue
+
+        print(f"{name}: {int(duplicated.sum())} duplicate {id_column} values")
+        duplicate_ids = set(df.loc[duplicated, id_column])
+        for label in df.index[duplicated]:
+            old_id = df.at[label, id_column]
+            new_id = IdGenerator.generate(old_id)
+            print(f"  - row {label}: {old_id} -> {new_id}")
+            df.at[label, id_column] = new_id
+        rekeyed[name] = int(duplicated.sum())
+
+        for table, label, value in find_references(tables, id_column, duplicate_ids):
+            referenced.append((table, label, id_column, value))
+
+    total = sum(rekeyed.values())
+    if total == 0:
+        print("No duplicate IDs found")
+        return
+    if referenced:
+        print(f"{len(referenced)} rows refer to a duplicated ID, so it is unclear which record they mean:")
+        for table, label, column, value in referenced:
+            print(f"  - {table} row {label}: {column} = {value}")
+    if not args.apply:
+        print(f"Dry run: {total} records would be re-keyed (use --apply)")
+    elif referenced:
+        print("Not re-keying anything: point the rows above at the right record (or clear them) first")
+        sys.exit(1)
+    else:
+        for name in rekeyed:
+            df, columns = tables[name]
+            storage.replace_table(TABLES[name][0], df, columns)
+        print(f"Re-keyed {total} records")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Re-score the customer side of every stored transcript with the current
+sentiment and confusion lexicons, e.g. after adding terms to lexicon.py.
+
+    python rescore_transcripts.py                 # report only
+    python rescore_transcripts.py --csv out.csv   # plus per-call scores as CSV
+    python rescore_transcripts.py --apply         # write sentiment_score to the call logs
+
+All customer lines are scored in one pass over a pandas Series, and each
+call's score is the same rolling average the agent keeps during a call
+(SENTIMENT_SMOOTHING).
+"""
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+
+from app.agent.lexicon import SENTIMENT, UNCLEAR
+from app.config import Config
+from app.data.excel_handler import CALL_LOG_COLUMNS
+from app.data.storage import storage
+from app.data.transcripts import transcripts
+
+CUSTOMER_LINE = re.compile(r'^\[[\d:]+\] Customer: (.*)$')
+
+
+def load_customer_lines(directory):
+    rows = []
+    names = sorted(os.listdir(directory))
+    jsonl = {name[:-6] for name in names if name.endswith('.jsonl')}
+    for name in names:
+        if name.endswith('.jsonl'):
+            for message in transcripts.read(name[:-6]):
+                if message['role'] == 'user':
+                    rows.append((name[:-6], message['content']))
+        elif name.endswith('.txt') and name[:-4] not in jsonl:
+            # Calls from before transcripts were written as JSON Lines
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                for line in f:
+                    match = CUSTOMER_LINE.match(line.rstrip('\n'))
+                    if match:
+                        rows.append((name[:-4], match.group(1)))
+    return pd.DataFrame(rows, columns=['call_id', 'text'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score stored call transcripts')
+    parser.add_argument('--apply', action='store_true', help='update sentiment_score in the call logs')
+    parser.add_argument('--csv', help='write per-call scores to this file')
+    args = parser.parse_args()
+
+    if not os.path.isdir(Config.TRANSCRIPTS_DIR):
+        print(f"No transcripts in {Config.TRANSCRIPTS_DIR}")
+        return
+
+    start = time.perf_counter()
+    lines = load_customer_lines(Config.TRANSCRIPTS_DIR)
+    if lines.empty:
+        print("No customer lines found")
+        return
+    lines['sentiment'] = SENTIMENT.score_many(lines['text']).clip(-1.0, 1.0)
+    lines['unclear'] = UNCLEAR.score_many(lines['text'])
+    lines['rolling'] = lines.groupby('call_id')['sentiment'].transform(
+        lambda scores: scores.ewm(alpha=Config.SENTIMENT_SMOOTHING, adjust=False).mean()
+    )
+    calls = lines.groupby('call_id').agg(
+        turns=('text', 'size'),
+        sentiment_score=('rolling', 'last'),
+        min_turn_sentiment=('sentiment', 'min'),
+        unclear_turns=('unclear', lambda scores: int((scores > 0).sum()))
+    ).round(3)
+    elapsed = time.perf_counter() - start
+
+    print(f"Scored {len(lines)} customer lines from {len(calls)} calls in {elapsed:.2f}s")
+    print(f"  negative calls: {int((calls['sentiment_score'] < -0.2).sum())}, "
+          f"positive: {int((calls['sentiment_score'] > 0.2).sum())}, "
+          f"with unclear turns: {int((calls['unclear_turns'] > 0).sum())}")
+    worst = calls.sort_values('sentiment_score').head(5)
+    if len(worst):
+        print("  most negative:")
+        for call_id, row in worst.iterrows():
+            print(f"    {call_id}: {row['sentiment_score']:+.2f} over {row['turns']} turns")
+
+    if args.csv:
+        calls.to_csv(args.csv)
+        print(f"Wrote {args.csv}")
+
+    if args.apply:
+        logs = storage.read_table(Config.CALL_LOGS_FILE, CALL_LOG_COLUMNS).set_index('call_id')
+        merged = calls.join(logs['sentiment_score'].rename('stored'), how='inner')
+        stored = pd.to_numeric(merged['stored'], errors='coerce').fillna(0.0)
+        changed = merged[(merged['sentiment_score'] - stored).abs() > 0.001]
+        for call_id, row in changed.iterrows():
+            storage.update_row(Config.CALL_LOGS_FILE, 'call_id', call_id,
+                               {'sentiment_score': float(row['sentiment_score'])}, CALL_LOG_COLUMNS)
+        print(f"Updated sentiment_score for {len(changed)} of {len(merged)} logged calls")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,11 @@
+import os
+
+# Must run before anything else imports socket/threading: green sockets let a
+# slow OpenAI or ElevenLabs request wait without stalling every other call
+if os.getenv('ASYNC_MODE', 'eventlet') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
 from app.main import app, socketio
 
 if __name__ == '__main__':
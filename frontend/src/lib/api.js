@@ -88,6 +88,36 @@ export const demoAPI = {
   sendHumanMessage: (callId, message) => api.post('/demo/human-message', { call_id: callId, message }),
   endCall: (callId, outcome = 'resolved') => api.post('/demo/end', { call_id: callId, outcome }),
   getStatus: (callId) => api.get(`/demo/status/${callId}`),
+  // Streams the AI reply as Server-Sent Events; onEvent(type, payload) receives
+  // token / sentence / function events and finally `done` with the /message payload
+  streamMessage: async (callId, message, onEvent) => {
+    const response = await fetch(`${API_BASE}/demo/message/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ call_id: callId, message }),
+    });
+    if (!response.ok) {
+      const error = new Error(`Stream failed with status ${response.status}`);
+      error.response = { data: await response.json().catch(() => ({})) };
+      throw error;
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const type = block.match(/^event: (.*)$/m)?.[1];
+        const data = block.match(/^data: (.*)$/m)?.[1];
+        if (type && data) onEvent(type, JSON.parse(data));
+      }
+    }
+  },
 };
 
 export const ttsAPI = {
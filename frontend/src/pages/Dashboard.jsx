@@ -10,8 +10,18 @@ import {
   TrendingUp,
   Clock
 } from 'lucide-react';
+import { io } from 'socket.io-client';
 import { dashboardAPI } from '../lib/api';
 
+// Apply a dashboard_delta: nested sections are merged, scalars replaced
+function mergeDelta(stats, delta) {
+  const next = { ...stats };
+  Object.entries(delta).forEach(([key, value]) => {
+    next[key] = value && typeof value === 'object' ? { ...(stats?.[key] || {}), ...value } : value;
+  });
+  return next;
+}
+
 function StatCard({ icon: Icon, label, value, color, link }) {
   const content = (
     <div className={`bg-white rounded-xl shadow-sm p-6 border-l-4 ${color}`}>
@@ -39,8 +49,16 @@ function Dashboard() {
 
   useEffect(() => {
     fetchStats();
-    const interval = setInterval(fetchStats, 30000);
-    return () => clearInterval(interval);
+    // The server sends a full snapshot on connect and deltas after every change
+    const socket = io();
+    socket.on('dashboard_snapshot', (snapshot) => {
+      setStats(snapshot);
+      setLoading(false);
+    });
+    socket.on('dashboard_delta', (delta) => {
+      setStats((current) => mergeDelta(current, delta));
+    });
+    return () => socket.disconnect();
   }, []);
 
   const fetchStats = async () => {
@@ -76,10 +76,11 @@ function DemoCall() {
   }, []);
 
   // Fallback to browser speech synthesis
-  const speakWithBrowser = useCallback((text) => {
+  // queue=true lets speechSynthesis play it after what is already queued
+  const speakWithBrowser = useCallback((text, queue = false) => {
     if (!voiceEnabledRef.current || !text) return;
 
-    synthRef.current.cancel();
+    if (!queue) synthRef.current.cancel();
     setIsSpeaking(true);
 
     const utterance = new SpeechSynthesisUtterance(text);
@@ -121,6 +122,51 @@ function DemoCall() {
     }
   }, [speakWithBrowser]);
 
+  // Sentence queue for streamed replies: audio for each sentence is requested
+  // as soon as the sentence arrives, but played strictly in order
+  const speechQueueRef = useRef(Promise.resolve());
+  const speechGenerationRef = useRef(0);
+
+  const playAudioBlob = (audioBlob) => new Promise((resolve) => {
+    const audio = audioRef.current;
+    if (!audio) {
+      resolve();
+      return;
+    }
+    const url = URL.createObjectURL(audioBlob);
+    const finish = () => {
+      ['ended', 'error', 'pause'].forEach((name) => audio.removeEventListener(name, finish));
+      URL.revokeObjectURL(url);
+      resolve();
+    };
+    ['ended', 'error', 'pause'].forEach((name) => audio.addEventListener(name, finish));
+    audio.src = url;
+    audio.play().catch(finish);
+  });
+
+  const queueSpeech = useCallback((text) => {
+    if (!voiceEnabledRef.current || !text) return;
+    if (!useElevenLabsRef.current) {
+      speakWithBrowser(text, true);
+      return;
+    }
+    const generation = speechGenerationRef.current;
+    const audio = ttsAPI.speak(text, 'rachel');
+    audio.catch(() => {});
+    speechQueueRef.current = speechQueueRef.current.then(async () => {
+      if (generation !== speechGenerationRef.current) return;
+      try {
+        const audioBlob = await audio;
+        if (generation !== speechGenerationRef.current) return;
+        setIsSpeaking(true);
+        await playAudioBlob(audioBlob);
+      } catch (err) {
+        console.error('ElevenLabs TTS error:', err);
+        speakWithBrowser(text, true);
+      }
+    });
+  }, [speakWithBrowser]);
+
   // Main speak function
   const speakResponse = useCallback((text) => {
     if (useElevenLabsRef.current) {
@@ -151,22 +197,22 @@ function DemoCall() {
     try {
       console.log('Sending message:', voiceText, 'to call:', currentCallData.call_id);
 
-      const response = takenOverRef.current
-        ? await demoAPI.sendHumanMessage(currentCallData.call_id, voiceText)
-        : await demoAPI.sendMessage(currentCallData.call_id, voiceText);
-
-      console.log('Response received:', response.data);
-
-      setCallData(response.data.call);
-
-      // Get AI response and speak it
-      const lastMessage = response.data.call.transcript?.slice(-1)[0];
-      if (lastMessage && lastMessage.role === 'assistant') {
-        speakResponse(lastMessage.content);
-      }
-
-      if (response.data.takeover_requested) {
-        setTakenOver(true);
+      if (takenOverRef.current) {
+        const response = await demoAPI.sendHumanMessage(currentCallData.call_id, voiceText);
+        setCallData(response.data.call);
+      } else {
+        // Speak each sentence as soon as it is streamed instead of waiting for the whole reply
+        await demoAPI.streamMessage(currentCallData.call_id, voiceText, (type, payload) => {
+          if (type === 'sentence') {
+            queueSpeech(payload.text);
+          } else if (type === 'done') {
+            console.log('Response received:', payload);
+            setCallData(payload.call);
+            if (payload.takeover_requested) {
+              setTakenOver(true);
+            }
+          }
+        });
       }
     } catch (err) {
       console.error('Failed to send message:', err);
@@ -177,7 +223,7 @@ function DemoCall() {
     } finally {
       setLoading(false);
     }
-  }, [speakResponse]);
+  }, [queueSpeech]);
 
   // Initialize Speech Recognition
   useEffect(() => {
@@ -290,6 +336,8 @@ function DemoCall() {
 
   // Stop speaking
   const stopSpeaking = () => {
+    // Drop sentences still waiting in the queue
+    speechGenerationRef.current += 1;
     if (audioRef.current) {
       audioRef.current.pause();
       audioRef.current.currentTime = 0;
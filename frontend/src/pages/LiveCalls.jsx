@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import {
   Phone,
@@ -9,34 +9,84 @@ import {
   RefreshCw,
   Eye
 } from 'lucide-react';
+import { io } from 'socket.io-client';
 import { callsAPI } from '../lib/api';
 
+// Apply a call_summary_delta / call_delta's changed fields to one call in a list
+function patchCall(calls, callId, fields) {
+  return calls.map((call) => (call.call_id === callId ? { ...call, ...fields } : call));
+}
+
 function LiveCalls() {
   const [activeCalls, setActiveCalls] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedCall, setSelectedCall] = useState(null);
+  const socketRef = useRef(null);
 
   useEffect(() => {
-    fetchActiveCalls();
-    const interval = setInterval(fetchActiveCalls, 3000);
-    return () => clearInterval(interval);
+    // The server sends call summaries once, then only what changed
+    const socket = io();
+    socketRef.current = socket;
+    socket.on('connect', () => socket.emit('subscribe_calls'));
+    socket.on('active_calls', (calls) => {
+      setActiveCalls(calls);
+      setLoading(false);
+    });
+    socket.on('call_started', (call) => {
+      setActiveCalls((calls) => [...calls.filter((c) => c.call_id !== call.call_id), call]);
+    });
+    socket.on('call_summary_delta', ({ call_id, fields }) => {
+      setActiveCalls((calls) => {
+        const current = calls.find((c) => c.call_id === call_id);
+        if (fields.message_count !== undefined && current?.message_count > fields.message_count) {
+          // A later message was already shown
+          return calls;
+        }
+        return patchCall(calls, call_id, fields);
+      });
+    });
+    socket.on('call_ended', ({ call_id }) => {
+      setActiveCalls((calls) => calls.filter((c) => c.call_id !== call_id));
+      setSelectedCall((call) => (call?.call_id === call_id ? null : call));
+    });
+    // The selected call: full call_update on subscribe, then call_delta
+    socket.on('call_update', (call) => setSelectedCall(call));
+    socket.on('call_delta', ({ call_id, fields, messages, index }) => {
+      setSelectedCall((call) => {
+        if (!call || call.call_id !== call_id) return call;
+        if (!messages) return { ...call, ...fields };
+        // Place messages by their transcript index: deltas of two turns
+        // on the call can arrive in either order
+        const transcript = [...call.transcript];
+        messages.forEach((message, k) => {
+          transcript[index + k] = message;
+        });
+        if (call.transcript.includes(undefined) && transcript.includes(undefined)) {
+          // A gap from an earlier update is still open, so an update was missed;
+          // ask for the whole call again
+          socket.emit('subscribe_call', { call_id });
+        }
+        return { ...call, transcript };
+      });
+    });
+    return () => socket.disconnect();
   }, []);
 
-  const fetchActiveCalls = async () => {
-    try {
-      const response = await callsAPI.getActive();
-      setActiveCalls(response.data);
-    } catch (error) {
-      console.error('Failed to fetch active calls:', error);
-    } finally {
-      setLoading(false);
+  const selectCall = (call) => {
+    const socket = socketRef.current;
+    if (selectedCall) socket?.emit('unsubscribe_call', { call_id: selectedCall.call_id });
+    if (call) {
+      socket?.emit('subscribe_call', { call_id: call.call_id });
     }
+    setSelectedCall(call ? { ...call, transcript: [] } : null);
   };
 
+  // Re-sends the active_calls snapshot
+  const fetchActiveCalls = () => socketRef.current?.emit('subscribe_calls');
+
   const handleTakeover = async (callId) => {
     try {
       await callsAPI.takeover(callId, 'Manual takeover from live monitoring');
-      fetchActiveCalls();
     } catch (error) {
       console.error('Failed to takeover call:', error);
     }
@@ -45,7 +95,6 @@ function LiveCalls() {
   const handleEndCall = async (callId) => {
     try {
       await callsAPI.end(callId, 'ended_by_admin');
-      fetchActiveCalls();
     } catch (error) {
       console.error('Failed to end call:', error);
     }
@@ -147,14 +196,14 @@ function LiveCalls() {
                 </div>
 
                 {/* Last Message */}
-                {call.transcript?.length > 0 && (
+                {call.last_message && (
                   <div className="bg-gray-50 rounded-lg p-3 mb-3">
                     <p className="text-sm text-gray-600">
                       <span className="font-medium">
-                        {call.transcript[call.transcript.length - 1].role === 'user' ? 'Customer: ' : 'AI: '}
+                        {call.last_message.role === 'user' ? 'Customer: ' : 'AI: '}
                       </span>
-                      {call.transcript[call.transcript.length - 1].content.slice(0, 100)}
-                      {call.transcript[call.transcript.length - 1].content.length > 100 && '...'}
+                      {call.last_message.content.slice(0, 100)}
+                      {call.last_message.content.length > 100 && '...'}
                     </p>
                   </div>
                 )}
@@ -171,7 +220,7 @@ function LiveCalls() {
                 {/* Actions */}
                 <div className="flex gap-2">
                   <button
-                    onClick={() => setSelectedCall(call)}
+                    onClick={() => selectCall(call)}
                     className="flex items-center gap-1 px-3 py-1.5 bg-blue-50 text-blue-600 rounded hover:bg-blue-100 text-sm"
                   >
                     <Eye size={14} />
@@ -207,14 +256,14 @@ function LiveCalls() {
                   <p className="text-sm text-gray-500">{selectedCall.call_id}</p>
                 </div>
                 <button
-                  onClick={() => setSelectedCall(null)}
+                  onClick={() => selectCall(null)}
                   className="text-gray-400 hover:text-gray-600"
                 >
                   ×
                 </button>
               </div>
               <div className="flex-1 overflow-y-auto p-4 space-y-4 scrollbar-thin">
-                {selectedCall.transcript?.map((msg, index) => (
+                {selectedCall.transcript?.map((msg, index) => msg && (
                   <div
                     key={index}
                     className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}